@@ -0,0 +1,108 @@
+""" Compares the time it takes to load and dump large configuration files using
+the pure Python YAML implementation, and using the bindings to libyaml.
+
+A synthetic recipes file with many recipes is generated for each size. Loading
+is measured on the YAML layer only (the validated models are cached by cptk,
+and the cache is bypassed here), and dumping is measured on the whole
+'Configuration.yaml' method.
+
+    python benchmarks/config.py [--runs N] [--recipes N ...]
+"""
+from __future__ import annotations
+
+import argparse
+import statistics
+import sys
+import time
+from typing import Callable
+from unittest import mock
+
+import yaml
+
+from cptk.core.config import dump_yaml
+from cptk.core.config import load_yaml
+from cptk.local.problem import Recipe
+from cptk.local.problem import RecipesConfig
+from cptk.local.problem import TestRecipe
+
+
+def report(line: str = '') -> None:
+    sys.stdout.write(line + '\n')
+
+
+def create_config(recipes: int) -> RecipesConfig:
+    return RecipesConfig(
+        recipes=[
+            Recipe(
+                name=f'recipe{n}',
+                bake=[f'g++ -O2 -o solution{n} solution{n}.cpp'],
+                serve=f'./solution{n}',
+                test=TestRecipe(folder=f'tests{n}', timeout=n % 5 + 1),
+            )
+            for n in range(recipes)
+        ],
+    )
+
+
+def measure(func: Callable[[], object], runs: int) -> float:
+    """ Returns the median time it takes to call the given function, in
+    milliseconds. """
+
+    times = list()
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def pure_python():
+    """ Hides the libyaml bindings, so the pure Python classes are used. """
+    return mock.patch.multiple(
+        yaml,
+        CSafeLoader=yaml.SafeLoader,
+        CSafeDumper=yaml.SafeDumper,
+        create=True,
+    )
+
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument(
+        '--recipes', type=int, nargs='+', default=[100, 1000, 5000],
+    )
+    args = parser.parse_args(argv)
+
+    if not yaml.__with_libyaml__:
+        report('PyYAML was built without libyaml, nothing to compare')
+        return 1
+
+    for recipes in args.recipes:
+        config = create_config(recipes)
+        document = config.yaml()
+        data = config.dict(exclude_unset=True)
+
+        with pure_python():
+            # Both implementations should produce the same document.
+            assert config.yaml() == document
+            pure_load = measure(lambda: load_yaml(document), args.runs)
+            pure_dump = measure(lambda: dump_yaml(data), args.runs)
+
+        c_load = measure(lambda: load_yaml(document), args.runs)
+        c_dump = measure(lambda: dump_yaml(data), args.runs)
+
+        report(f'{recipes} recipes ({len(document) / 1024:.0f} KiB)')
+        for name, pure, c in (('load', pure_load, c_load),
+                              ('dump', pure_dump, c_dump)):
+            report(
+                f'  {name}: python {pure:8.2f} ms, libyaml {c:8.2f} ms'
+                f' ({pure / c:.1f}x faster)',
+            )
+        report()
+
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,247 @@
+""" Measures the startup latency of the cptk command line interface.
+
+For each benchmarked command, we measure the time between spawning cptk and
+the moment that the user's code starts running (or the moment that cptk exits,
+for commands that don't run user code). The time it takes to start the user's
+code on its own is measured separately and subtracted.
+
+Cold runs use an empty cptk cache directory, while warm runs reuse a cache that
+was populated by an earlier run. Note that cold runs still benefit from the
+page cache of the operating system.
+
+Budgets are checked against the overhead of cptk on top of starting a bare
+Python interpreter (which depends on the machine and the installed '.pth'
+files, and not on cptk), so the same budgets can be used on every machine.
+The script also prints a per-module import time breakdown of each command
+(using 'python -X importtime'), and exits with a nonzero code if the median
+overhead of a command exceeds its budget.
+
+    python benchmarks/startup.py [--runs N] [--budget COMMAND=MS ...]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import cptk.constants
+from cptk.local.problem import LocalProblem
+from cptk.local.problem import Recipe
+from cptk.local.problem import TestRecipe
+from cptk.local.project import LocalProject
+from cptk.scrape import Test
+
+COMMANDS = {
+    'help': ['--help'],
+    'test': ['test'],
+    'serve': ['serve'],
+}
+
+# Budgets for the median warm overhead, in milliseconds. Cold runs are allowed
+# to take COLD_FACTOR times longer. The overheads vary a lot between runs on
+# shared machines (the warm overhead of 'cptk test' was measured between 50
+# and 106 ms), so the budgets are about twice the largest overhead we measured.
+# Importing the scraping dependencies eagerly adds more than that.
+BUDGETS = {
+    'help': 100,
+    'test': 200,
+    'serve': 200,
+}
+COLD_FACTOR = 1.5
+
+STAMPS_FILE = 'stamps.txt'
+STAMP_SCRIPT = f"""
+import time
+with open({STAMPS_FILE!r}, 'a') as file:
+    file.write(repr(time.time()) + '\\n')
+"""
+
+
+def report(line: str = '') -> None:
+    sys.stdout.write(line + '\n')
+
+
+def create_project(root: str) -> LocalProblem:
+    """ Creates a project with a single problem, whose solution records the
+    time in which it has started running. """
+
+    proj = LocalProject.init(root, 'py')
+    location = os.path.join(root, 'problem')
+    os.makedirs(location)
+
+    with open(os.path.join(location, 'stamp.py'), 'w') as file:
+        file.write(STAMP_SCRIPT)
+
+    prob = LocalProblem.init(
+        location,
+        Recipe(
+            serve=f'{sys.executable} -S stamp.py',
+            test=TestRecipe(folder='tests'),
+        ),
+    )
+
+    prob.store_tests('tests', [Test('', '')])
+    proj.update_last(prob)
+    return prob
+
+
+def run_once(
+    cmd: list[str],
+    prob: LocalProblem,
+    env: dict[str, str] = None,
+) -> tuple[float, bool]:
+    """ Runs the given command once, and returns the latency in milliseconds
+    and whether the user's code has started running. """
+
+    stamps = os.path.join(prob.location, STAMPS_FILE)
+    if os.path.exists(stamps):
+        os.remove(stamps)
+
+    start = time.time()
+    subprocess.run(
+        cmd,
+        cwd=prob.location,
+        env=env,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        check=False,
+    )
+    end = time.time()
+
+    if not os.path.exists(stamps):
+        return (end - start) * 1000, False
+
+    with open(stamps) as file:
+        return (float(file.readline()) - start) * 1000, True
+
+
+def run_cptk(
+    args: list[str],
+    root: str,
+    prob: LocalProblem,
+    cache: str,
+    baseline: float,
+) -> float:
+    """ Runs cptk once and returns the latency in milliseconds. """
+
+    env = dict(os.environ)
+    env[cptk.constants.CACHE_DIR_ENV] = cache
+
+    cmd = [sys.executable, '-m', 'cptk', '-W', root, *args]
+    latency, started = run_once(cmd, prob, env)
+    return latency - baseline if started else latency
+
+
+def import_breakdown(args: list[str], root: str, top: int) -> list[str]:
+    """ Returns the modules that took the longest to import (excluding the
+    time it took to import their dependencies), formatted for printing. """
+
+    res = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-m', 'cptk', '-W', root, *args],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        encoding='utf8',
+        check=False,
+    )
+
+    rows = list()
+    for line in res.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        rows.append((int(self_us), int(cumulative_us), name.strip()))
+
+    rows.sort(reverse=True)
+    return [
+        f'    {self_us / 1000:7.2f} ms self {cumulative_us / 1000:7.2f} ms'
+        f' cumulative  {name}'
+        for self_us, cumulative_us, name in rows[:top]
+    ]
+
+
+def parse_budgets(values: list[str]) -> dict[str, float]:
+    budgets = dict(BUDGETS)
+    for value in values:
+        name, _, ms = value.partition('=')
+        if name not in COMMANDS:
+            raise SystemExit(f'Unknown command {name!r}')
+        budgets[name] = float(ms)
+    return budgets
+
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--budget', action='append', default=[])
+    parser.add_argument('commands', nargs='*', default=list(COMMANDS))
+    args = parser.parse_args(argv)
+
+    budgets = parse_budgets(args.budget)
+    failed = False
+
+    with tempfile.TemporaryDirectory() as temp:
+        root = os.path.join(temp, 'project')
+        warm_cache = os.path.join(temp, 'cache')
+        prob = create_project(root)
+
+        baseline = statistics.median(
+            run_once(prob.recipe.serve.split(), prob)[0]
+            for _ in range(args.runs)
+        )
+        interpreter = statistics.median(
+            run_once([sys.executable, '-c', 'pass'], prob)[0]
+            for _ in range(args.runs)
+        )
+        report(f'user code starts in {baseline:.2f} ms on its own')
+        report(f'a bare interpreter starts in {interpreter:.2f} ms')
+        report()
+
+        for name in args.commands:
+            cmd = COMMANDS[name]
+
+            cold = [
+                run_cptk(cmd, root, prob, tempfile.mkdtemp(dir=temp), baseline)
+                for _ in range(args.runs)
+            ]
+
+            run_cptk(cmd, root, prob, warm_cache, baseline)
+            warm = [
+                run_cptk(cmd, root, prob, warm_cache, baseline)
+                for _ in range(args.runs)
+            ]
+
+            budget = budgets[name]
+            results = (
+                ('cold', cold, budget * COLD_FACTOR),
+                ('warm', warm, budget),
+            )
+
+            report(f"cptk {' '.join(cmd)}")
+            for kind, times, limit in results:
+                median = statistics.median(times)
+                overhead = median - interpreter
+                ok = overhead <= limit
+                failed = failed or not ok
+                report(
+                    f'  {kind}: median {median:7.2f} ms, min {min(times):7.2f}'
+                    f' ms, overhead {overhead:7.2f} ms'
+                    f' (budget {limit:.0f} ms) {"OK" if ok else "EXCEEDED"}',
+                )
+
+            report('  slowest imports:')
+            for line in import_breakdown(cmd, root, args.top):
+                report(line)
+            report()
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
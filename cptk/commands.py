@@ -23,7 +23,7 @@ collector.global_argument(
     help='set the working directory (defaults to cwd)',
     dest='wd',
     metavar='DIRECTORY',
-    default=os.getcwd(),
+    default=None,
     type=cptk.utils.path_validator(
         dir_ok=True,
         file_ok=False,
@@ -51,6 +51,11 @@ collector.global_argument(
 
 @collector.preprocessor
 def preprocessor(namespace):
+    # Resolved here and not as the argument default, because the same parser
+    # is used to handle many requests (with different cwds) by the daemon.
+    if namespace.wd is None:
+        namespace.wd = os.getcwd()
+
     System.set_verbosity(namespace._verbosity)
     System.set_yes(namespace._yes_count)
     return namespace
@@ -80,21 +85,88 @@ def initialize(wd: str, template: str):
 )
 @collector.argument(
     'url',
-    help='the problem to be cloned',
+    nargs='?',
+    default=None,
+    help='the problem to be cloned (or the contest, with --at-start)',
     type=cptk.utils.url_validator,
 )
-def clone(url: str, wd: str):
+@collector.argument(
+    '-f', '--file',
+    default=None,
+    help='clone all problems in the given file, one URL per line',
+    type=cptk.utils.path_validator(dir_ok=False, must_exist=True),
+)
+@collector.argument(
+    '-j', '--jobs',
+    default=4,
+    type=int,
+    help='amount of pages to fetch concurrently when cloning from a file',
+)
+@collector.argument(
+    '--at-start',
+    action='store_true',
+    help='wait for the given contest to start, and clone all of its problems '
+    'as soon as they are published',
+)
+@collector.argument(
+    '-n', '--dry-run',
+    action='store_true',
+    help="show the files that will be created or overwritten, but don't "
+    'clone the problem',
+)
+def clone(
+    wd: str,
+    url: str = None,
+    file: str = None,
+    jobs: int = 4,
+    at_start: bool = False,
+    dry_run: bool = False,
+):
 
     from cptk.local.project import LocalProject
     from cptk.core.system import System
 
+    if (url is None) == (file is None):
+        System.error('Provide exactly one of a URL or a file (-f)')
+        System.abort(2)
+
+    if dry_run and (file is not None or at_start):
+        System.error('--dry-run can be used only when cloning a single URL')
+        System.abort(2)
+
+    if at_start and file is not None:
+        System.error('--at-start can be used only when cloning a contest URL')
+        System.abort(2)
+
     proj = LocalProject.find(wd)
+
+    if dry_run:
+        page = proj.fetcher.to_page(url)
+        plan = proj.plan_clone(proj.fetcher.page_to_problem(page))
+        _echo_plan(plan)
+        return
+
+    if file is not None:
+        proj.clone_urls(cptk.utils.read_urls(file), jobs=jobs)
+        return
+
+    if at_start:
+        for prob in proj.clone_contest(url, wait=True):
+            System.echo(prob.location)
+        return
+
     prob = proj.clone_url(url)
     proj.last = prob.location
 
     System.echo(prob.location)
 
 
+def _echo_plan(plan) -> None:
+    System.echo(plan.dst)
+    for file in plan.files:
+        System.echo(f'  {file.action:<9}  {file.path}')
+
+
 @collector.command(
     'move',
     aliases=['mv'],
@@ -146,7 +218,18 @@ def serve(wd: str, name: str = None):
 
 @collector.command('test')
 @collector.argument('name', nargs='?', default=None, type=str)
-def test(wd: str, name: str = None):
+@collector.argument(
+    '-j', '--jobs',
+    default=1,
+    type=int,
+    help='amount of tests to run concurrently',
+)
+@collector.argument(
+    '-s', '--save',
+    action='store_true',
+    help='save the outputs of failed tests next to them',
+)
+def test(wd: str, name: str = None, jobs: int = 1, save: bool = False):
 
     from cptk.local.project import LocalProject
     from cptk.local.problem import LocalProblem
@@ -154,4 +237,153 @@ def test(wd: str, name: str = None):
 
     proj = LocalProject.find(wd)
     prob = proj.last() if name is None else LocalProblem(wd, name)
-    Chef(prob).test()
+
+    passed, failed = Chef(prob).run_tests(jobs, save)
+    proj.record_test(prob, passed, failed)
+    System.abort(1 if failed else 0)
+
+
+tests = collector.group(
+    'tests',
+    help='manage the tests of a problem',
+    description='Manage the tests of a problem.',
+)
+
+
+@tests.command(
+    'import',
+    help='import tests from a test package archive',
+    description='Imports the tests in a zip test package (for example, from '
+                'Polygon or Kattis) into the test folder of the problem. '
+                'Inputs are matched with their expected outputs by name, and '
+                'stored using the .in and .out suffixes.',
+)
+@tests.argument(
+    'archive',
+    type=cptk.utils.path_validator(dir_ok=False, must_exist=True),
+)
+@tests.argument('name', nargs='?', default=None, type=str)
+@tests.argument(
+    '--link',
+    action='store_true',
+    help="don't copy the tests, and read them straight from the archive",
+)
+def tests_import(wd: str, archive: str, name: str = None, link: bool = False):
+
+    from cptk.local.project import LocalProject
+    from cptk.local.problem import LocalProblem
+    from cptk.local.packages import import_tests
+    from cptk.core.chef import NoTestConfigurationError
+
+    proj = LocalProject.find(wd)
+    prob = proj.last() if name is None else LocalProblem(wd, name)
+
+    recipe = prob.recipe
+    if recipe.test is None:
+        raise NoTestConfigurationError()
+
+    store = proj.store if proj.config.store.enabled else None
+    folder = os.path.join(prob.location, recipe.test.folder)
+    imported = import_tests(archive, folder, store=store, link=link)
+    System.success(f'Imported {len(imported)} tests into {folder!r}')
+
+
+@collector.command(
+    'daemon',
+    help='run a resident cptk server that executes commands faster',
+    description='Runs a resident cptk server in the foreground. While it is '
+                'running, cptk commands are forwarded to the server, which '
+                'keeps the imported modules and the loaded projects in memory.',
+)
+@collector.argument(
+    '--idle',
+    default=None,
+    type=float,
+    metavar='SECONDS',
+    help='stop after not receiving commands for the given amount of seconds',
+)
+@collector.argument(
+    '--stop',
+    action='store_true',
+    help='stop the running server',
+)
+def daemon(idle: float = None, stop: bool = False):
+
+    from cptk.core.daemon import Daemon
+    from cptk.core import client
+
+    if stop:
+        if not client.stop():
+            System.warn('The daemon is not running')
+        return
+
+    Daemon(client.socket_path(), idle=idle).serve_forever()
+
+
+def _echo_problems(proj, problems) -> None:
+    if not problems:
+        System.warn('No problems found')
+        return
+
+    for prob in problems:
+        location = os.path.relpath(prob.location, proj.location)
+        details = [
+            value for value in (prob.website, prob.name, prob.status)
+            if value is not None
+        ]
+        System.echo(
+            f"{location}  {System.DETAILS}{', '.join(details)}{System.RESET}",
+        )
+
+
+@collector.command(
+    'list',
+    aliases=['ls'],
+    help='lists the problems in the project',
+    description='Lists the problems in the project, using the project index. '
+                'Problems that are cloned, moved or tested are indexed '
+                'automatically.',
+)
+@collector.argument('--website', default=None, type=str)
+@collector.argument('--contest', default=None, type=str)
+@collector.argument('--status', default=None, choices=('passed', 'failed'))
+@collector.argument(
+    '--rebuild',
+    action='store_true',
+    help='rebuild the index by scanning the whole project first',
+)
+def list_problems(
+    wd: str,
+    website: str = None,
+    contest: str = None,
+    status: str = None,
+    rebuild: bool = False,
+):
+
+    from cptk.local.project import LocalProject
+
+    proj = LocalProject.find(wd)
+    if rebuild:
+        proj.reindex()
+
+    problems = proj.index.query(
+        website=website,
+        contest=contest,
+        status=status,
+    )
+    _echo_problems(proj, problems)
+
+
+@collector.command(
+    'find',
+    help='searches the problems in the project',
+    description='Searches for the given text in the locations, names, URLs '
+                'and contests of the problems in the project index.',
+)
+@collector.argument('text', type=str)
+def find(wd: str, text: str):
+
+    from cptk.local.project import LocalProject
+
+    proj = LocalProject.find(wd)
+    _echo_problems(proj, proj.index.query(text))
@@ -2,16 +2,30 @@ from __future__ import annotations
 
 RECIPE_FILE = 'recipes.cptk.yaml'
 PROJECT_FILE = '.cptk/project.cptk.yaml'
+METADATA_FILE = '.cptk/problem.cptk.json'
 LAST_FILE = '.cptk/stayaway/last.cptk.txt'
+INDEX_FILE = '.cptk/stayaway/index.cptk.db'
+STORE_DIR = '.cptk/store'
 
 MOVE_FILE = '.cptk/moves.cptk.txt'
+MOVES_CACHE_FILE = '.cptk/stayaway/moves.cptk.json'
 MOVE_FILE_SEPERATOR = '::'
 MOVE_SAFES = ['./', '**/.cptk/**']
 
 LAST_FILE_SEPERATOR = '::'
 
+CACHE_DIR_ENV = 'CPTK_CACHE_DIR'
+PROJECT_ENV = 'CPTK_PROJECT'
+RECORD_ENV = 'CPTK_RECORD'
+REPLAY_ENV = 'CPTK_REPLAY'
+DAEMON_SOCKET_ENV = 'CPTK_DAEMON_SOCKET'
+NO_DAEMON_ENV = 'CPTK_NO_DAEMON'
+
 INPUT_FILE_SUFFIX = '.in'
 OUTPUT_FILE_SUFFIX = '.out'
+ANSWER_FILE_SUFFIX = '.ans'
+ACTUAL_FILE_SUFFIX = '.actual'
+REF_FILE_SUFFIX = '.ref'
 
 
 def TEST_NAME_GENERATOR():
@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import warnings
+import zipfile
+from dataclasses import dataclass
+from dataclasses import field
+from typing import TYPE_CHECKING
+
+import cptk.constants
+from cptk.core.transport import FetchError
+from cptk.core.transport import Transport
+
+if TYPE_CHECKING:
+    from requests import Response
+    from cptk.core.transport import TransportSettings
+
+
+@dataclass
+class ArchivedResponse:
+    """ A page that was loaded from an archive. Provides the subset of the
+    'requests.Response' interface that is used by cptk. """
+
+    url: str
+    status_code: int
+    headers: dict = field(default_factory=dict)
+    content: bytes = field(default=b'', repr=False)
+
+    @property
+    def text(self) -> str:
+        return self.content.decode('utf8', errors='replace')
+
+
+class PageArchive:
+    """ A compressed zip archive of fetched pages. Each page is stored as two
+    members: a JSON file with the requested URL, the final URL (after
+    redirects), the status code and the headers, and the raw page body. """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(url: str) -> str:
+        return hashlib.sha1(url.encode('utf8')).hexdigest()
+
+    def store(self, url: str, res: Response) -> None:
+        key = self._key(url)
+        meta = {
+            'url': url,
+            'final_url': res.url,
+            'status_code': res.status_code,
+            'headers': dict(res.headers),
+        }
+
+        with self._lock:
+            folder = os.path.dirname(self.path)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+
+            # Pages that are fetched again replace the older version. The zip
+            # format doesn't support removing members, so we add a duplicate
+            # and rely on the fact that the last member with the name wins.
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore', UserWarning)
+                with zipfile.ZipFile(
+                    self.path, 'a', compression=zipfile.ZIP_DEFLATED,
+                ) as archive:
+                    archive.writestr(f'{key}.json', json.dumps(meta))
+                    archive.writestr(f'{key}.body', res.content)
+
+    def load(self, url: str) -> ArchivedResponse:
+        key = self._key(url)
+
+        try:
+            with zipfile.ZipFile(self.path) as archive:
+                meta = json.loads(archive.read(f'{key}.json'))
+                content = archive.read(f'{key}.body')
+        except (FileNotFoundError, KeyError):
+            raise FetchError(url, f'page not found in archive {self.path!r}')
+
+        return ArchivedResponse(
+            url=meta['final_url'],
+            status_code=meta['status_code'],
+            headers=meta['headers'],
+            content=content,
+        )
+
+    def urls(self) -> list[str]:
+        """ Returns the requested URLs of all pages in the archive. """
+
+        with zipfile.ZipFile(self.path) as archive:
+            names = {n for n in archive.namelist() if n.endswith('.json')}
+            return sorted(json.loads(archive.read(n))['url'] for n in names)
+
+
+class RecordingTransport(Transport):
+    """ A transport that stores every page that it fetches in an archive. """
+
+    def __init__(
+        self,
+        archive: PageArchive,
+        settings: TransportSettings = None,
+    ) -> None:
+        self.archive = archive
+        super().__init__(settings)
+
+    def get(self, url: str, **kwargs) -> Response:
+        res = super().get(url, **kwargs)
+        self.archive.store(url, res)
+        return res
+
+
+class ReplayTransport:
+    """ A transport that serves pages from an archive, without accessing the
+    network at all. """
+
+    def __init__(
+        self,
+        archive: PageArchive,
+        settings: TransportSettings = None,
+    ) -> None:
+        self.archive = archive
+        self.settings = settings
+
+    def warm(self, url: str) -> None:
+        pass
+
+    def get(self, url: str, **kwargs) -> ArchivedResponse:
+        return self.archive.load(url)
+
+
+def transport_from_env(
+    settings: TransportSettings = None,
+) -> Transport | ReplayTransport:
+    """ Returns a transport with the given settings. If the 'CPTK_REPLAY'
+    environment variable is set, pages are served from the archive in the
+    given path. Otherwise, if 'CPTK_RECORD' is set, fetched pages are recorded
+    into the archive in the given path. """
+
+    replay = os.environ.get(cptk.constants.REPLAY_ENV)
+    if replay:
+        return ReplayTransport(PageArchive(replay), settings)
+
+    record = os.environ.get(cptk.constants.RECORD_ENV)
+    if record:
+        return RecordingTransport(PageArchive(record), settings)
+
+    return Transport(settings)
@@ -1,21 +1,42 @@
 from __future__ import annotations
 
+import io
 import os
+import shutil
 import subprocess
 import sys
+import tempfile
 import time
+from contextlib import closing
 from dataclasses import dataclass
+from dataclasses import field
+from threading import Thread
 from threading import Timer
+from typing import IO
+from typing import TextIO
+from typing import TYPE_CHECKING
 from typing import TypeVar
 
 import cptk.constants
 import cptk.utils
 from cptk.core.system import System
 from cptk.local.problem import LocalProblem
-from cptk.scrape import Test
+from cptk.local.testcases import discover_tests
+from cptk.local.testcases import group_tests
+
+if TYPE_CHECKING:
+    from typing import Generator
+    from typing import Iterable
+    from cptk.local.store import BlobStore
+    from cptk.local.testcases import LocalTest
 
 T = TypeVar('T')
 
+# The size of the chunks that are written into the input of processes, and
+# that are read from their outputs.
+INPUT_CHUNK_SIZE = 1 << 16
+OUTPUT_CHUNK_SIZE = 1 << 16
+
 
 @dataclass
 class RunnerResult:
@@ -26,6 +47,13 @@ class RunnerResult:
     errs: str | None = None
 
 
+@dataclass
+class Verdict:
+    passed: bool
+    message: str
+    details: list[str] = field(default_factory=list)
+
+
 class Nothing:
     def __getattribute__(self: T, *_) -> T:
         return self
@@ -48,6 +76,25 @@ class NoTestConfigurationError(cptk.utils.cptkException):
         super().__init__("Testing workflow isn't configured for the problem")
 
 
+def _feed(stdin: TextIO, input: TextIO) -> None:
+    """ Writes the input stream into the input of a process, in chunks, and
+    closes it. Stops quietly if the process exits without reading all of its
+    input. """
+
+    try:
+        for chunk in iter(lambda: input.read(INPUT_CHUNK_SIZE), ''):
+            stdin.write(chunk)
+        stdin.close()
+    except (BrokenPipeError, OSError, ValueError):
+        pass
+
+
+def _drain(stream: TextIO, parts: list[str]) -> None:
+    """ Reads an output of a process while it runs, so the process doesn't
+    block when the pipe is full. """
+    parts.extend(iter(lambda: stream.read(OUTPUT_CHUNK_SIZE), ''))
+
+
 class Runner:
     def __init__(self, env: dict = None) -> None:
         self.env = env if env is not None else os.environ
@@ -55,24 +102,34 @@ class Runner:
     def exec(
         self,
         cmd: str,
-        input: str = None,
+        input: str | TextIO = None,
         timeout: float = None,
         redirect: bool = True,
         wd: str = None,
+        output: IO = None,
     ) -> RunnerResult:
         """ Executes the given command, and returns a 'RunnerResult' instance
         that describes the result of the execution.
-        If input is provided, it is piped into the input of the subprocess.
+        If input is provided (as a string or a text stream), it is piped into
+        the input of the subprocess while it runs. Streams are read in chunks,
+        and aren't loaded into memory at once.
+        If output is provided (a file), the standard output of the subprocess
+        is written straight into it, and isn't captured.
         If timeout is provided, the execution of the process will get
         terminated after the provided amount of seconds. """
 
+        stdout = sys.stdout
+        if redirect:
+            stdout = output if output is not None else subprocess.PIPE
+
         proc = subprocess.Popen(
             cmd.split(),
             cwd=wd,
             env=self.env,
             encoding='utf8',
+            errors='replace',
             stdin=subprocess.PIPE if redirect else sys.stdin,
-            stdout=subprocess.PIPE if redirect else sys.stdout,
+            stdout=stdout,
             stderr=subprocess.PIPE if redirect else sys.stderr,
         )
 
@@ -82,21 +139,45 @@ class Runner:
 
         timer = Timer(timeout, proc.kill) if timeout is not None else Nothing()
 
-        if input is not None:
-            proc.stdin.write(input)
-            proc.stdin.flush()
+        feeder = None
+        if input is not None and redirect:
+            if isinstance(input, str):
+                input = io.StringIO(input)
+            feeder = Thread(target=_feed, args=(proc.stdin, input), daemon=True)
+            feeder.start()
+
+        # The outputs are read while the process runs. Reading them only after
+        # it exits deadlocks once the process fills the pipe buffer.
+        outs, errs = list(), list()
+        drainers = [
+            Thread(target=_drain, args=(stream, parts), daemon=True)
+            for stream, parts in ((proc.stdout, outs), (proc.stderr, errs))
+            if stream is not None
+        ]
+        for drainer in drainers:
+            drainer.start()
 
         try:
             timer.start()
             proc.wait()
+        except BaseException:
+            # For example, a KeyboardInterrupt that was forwarded to the
+            # daemon. The process isn't in the foreground process group of the
+            # terminal, and won't receive the interrupt on its own.
+            proc.kill()
+            raise
         finally:
             timed_out = False if timeout is None else not timer.is_alive()
             timer.cancel()
+            if feeder is not None:
+                feeder.join()
+            for drainer in drainers:
+                drainer.join()
 
         return RunnerResult(
             runner=self,
-            outs=proc.stdout.read() if redirect else None,
-            errs=proc.stderr.read() if redirect else None,
+            outs=''.join(outs) if proc.stdout is not None else None,
+            errs=''.join(errs) if proc.stderr is not None else None,
             code=proc.returncode,
             timed_out=timed_out,
         )
@@ -151,92 +232,239 @@ class Chef:
         res = self._runner.exec(cmd, wd=location, redirect=False)
         System.abort(res.code)
 
-    def _load_tests(self) -> dict[str, Test]:
-        """ Returns a list of tests where the keys are their names and the
-        values are the test details. """
+    @cptk.utils.cached_property
+    def _store(self) -> BlobStore:
+        from cptk.local.project import LocalProject
+        return LocalProject.find(self._problem.location).store
 
-        # TODO: the ideal solution will provide a way for the user to fully
-        # configure the way that the test inputs end expectations are stored.
-        # For now, we force a standard that uses treats all .in files inside
-        # the folder as input files, and all .out files as the expected outputs
+    def _tests(self) -> list[LocalTest]:
+        """ Returns the tests of the problem. The data of the tests isn't
+        loaded until they run. """
 
-        folder = os.path.join(
-            self._problem.location,
-            self._problem.recipe.test.folder,
+        recipe = self._problem.recipe.test
+        folder = os.path.join(self._problem.location, recipe.folder)
+        return discover_tests(
+            folder, lambda: self._store,
+            inputs=recipe.inputs, outputs=recipe.outputs,
         )
-        if not os.path.isdir(folder):
-            return dict()
-        files = [
-            item for item in os.listdir(
-                folder,
-            ) if os.path.isfile(os.path.join(folder, item))
-        ]
 
-        inputs = {
-            filename[:-len(cptk.constants.INPUT_FILE_SUFFIX)]
-            for filename in files
-            if filename.endswith(cptk.constants.INPUT_FILE_SUFFIX)
-        }
-
-        outputs = {
-            filename[:-len(cptk.constants.OUTPUT_FILE_SUFFIX)]
-            for filename in files
-            if filename.endswith(cptk.constants.OUTPUT_FILE_SUFFIX)
-        }
-
-        res = dict()
-        for name in inputs.intersection(outputs):
-            inpp = os.path.join(folder, name + cptk.constants.INPUT_FILE_SUFFIX)
-            with open(inpp, 'r', encoding='utf8') as file:
-                inp = file.read()
-            outp = os.path.join(folder, name + cptk.constants.OUTPUT_FILE_SUFFIX)
-            with open(outp, 'r', encoding='utf8') as file:
-                out = file.read()
-            res[name] = Test(inp, out)
-
-        return res
-
-    def test(self) -> None:
+    def _timeout(self) -> float | None:
+        """ Returns the timeout of a single test. If it isn't configured in
+        the recipe, defaults to the time limit of the original problem. """
+
+        timeout = self._problem.recipe.test.timeout
+        if timeout is not None:
+            return float(timeout)
+
+        metadata = self._problem.metadata
+        return metadata.time_limit if metadata is not None else None
+
+    def test(self, jobs: int = 1, save: bool = False) -> None:
         """ Bakes (if a baking recipe is provided) and serves the local tests
-        that are linked to the problem. """
+        that are linked to the problem, and exits with a nonzero code if any
+        of them fails. """
 
-        if self._problem.recipe.test is None:
-            raise NoTestConfigurationError()
+        _, failed = self.run_tests(jobs, save)
+        System.abort(1 if failed else 0)
+
+    def _judge(
+        self,
+        test: LocalTest,
+        res: RunnerResult,
+        output: IO[bytes],
+    ) -> Verdict:
+        if res.timed_out:
+            return Verdict(False, 'Execution timed out')
+        if res.code:
+            return Verdict(False, f'Nonzero exit code {res.code}')
+
+        output.seek(0)
+        text = io.TextIOWrapper(output, encoding='utf8', errors='replace')
+        try:
+            mismatch = test.compare(text)
+        finally:
+            text.detach()
+
+        if mismatch is None:
+            return Verdict(True, 'Output matches expectations')
+
+        expected, actual = mismatch.context
+        return Verdict(
+            False,
+            f'Output differs from expectation in {mismatch}',
+            details=[f'expected: {expected}', f'actual:   {actual}'],
+        )
+
+    def _save_output(
+        self,
+        test: LocalTest,
+        output: IO[bytes],
+        verdict: Verdict,
+    ) -> None:
+        """ Saves the output of a failed test next to the test, and removes the
+        output that was saved when the test failed before, if it passes. """
+
+        path = test.actual
+        if verdict.passed:
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            return
+
+        output.seek(0)
+        with open(path, 'wb') as file:
+            shutil.copyfileobj(output, file, OUTPUT_CHUNK_SIZE)
+        verdict.details.append(f'Output saved to {path!r}')
+
+    def _run_test(
+        self,
+        test: LocalTest,
+        cmd: str,
+        timeout: float | None,
+        save: bool = False,
+    ) -> Verdict:
+        """ Runs a single test. Its input is streamed into the solution, its
+        output is written into a temporary file, and the expected output is
+        compared with it only after the solution exits. If 'save' is True,
+        the output of a failed test is saved next to the test. """
+
+        with tempfile.TemporaryFile() as output:
+            with test.open_input() as file:
+                res = self._runner.exec(
+                    cmd, wd=self._problem.location, input=file,
+                    redirect=True, timeout=timeout, output=output,
+                )
+
+            verdict = self._judge(test, res, output)
+            if save:
+                self._save_output(test, output, verdict)
+
+        return verdict
+
+    def _verdicts(
+        self,
+        tests: Iterable[LocalTest],
+        jobs: int = 1,
+        save: bool = False,
+    ) -> Generator[tuple[LocalTest, Verdict], None, None]:
+        """ Runs the tests and yields their verdicts, in order. If 'jobs' is
+        larger than one, up to 'jobs' tests run concurrently, and no more than
+        that are in flight at any time. """
 
-        self.bake()
         cmd = self._problem.recipe.serve
-        location = self._problem.location
-        timeout = self._problem.recipe.test.timeout
+        timeout = self._timeout()
+
+        if jobs <= 1:
+            for test in tests:
+                yield test, self._run_test(test, cmd, timeout, save)
+            return
 
-        tests = self._load_tests()
+        from collections import deque
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            window = deque()
+            try:
+                for test in tests:
+                    future = pool.submit(
+                        self._run_test, test, cmd, timeout, save,
+                    )
+                    window.append((test, future))
+                    if len(window) >= jobs:
+                        test, future = window.popleft()
+                        yield test, future.result()
+
+                while window:
+                    test, future = window.popleft()
+                    yield test, future.result()
+
+            finally:
+                # If the caller stops early, tests that haven't started yet
+                # are not run at all.
+                for _, future in window:
+                    future.cancel()
+
+    def _report(self, test: LocalTest, verdict: Verdict) -> None:
+        if verdict.passed:
+            System.success(verdict.message, title=test.name)
+        else:
+            System.error(verdict.message, title=test.name)
+        for line in verdict.details:
+            System.echo(System.DETAILS + line + System.RESET)
+
+    def run_tests(self, jobs: int = 1, save: bool = False) -> tuple[int, int]:
+        """ Bakes (if a baking recipe is provided) and serves the local tests
+        that are linked to the problem. Returns the amount of passed and failed
+        tests. Tests are loaded, run and released one at a time, or 'jobs' at
+        a time if 'jobs' is larger than one. If 'save' is True, the outputs
+        of failed tests are saved next to them (see 'LocalTest.actual').
+        If the recipe splits the tests into groups, the remaining tests of a
+        group are skipped once one of them fails, and so are the groups that
+        depend on it. Skipped tests are counted as failed, and the score (the
+        points of the groups that passed) is reported. Groups without tests
+        never pass, and score no points. """
+
+        recipe = self._problem.recipe.test
+        if recipe is None:
+            raise NoTestConfigurationError()
+
+        self.bake()
+        tests = self._tests()
 
         LogFunc = System.title if tests else System.warn
         LogFunc(f'Found {len(tests)} tests')
 
-        passed = 0
+        passed = skipped = 0
+        score = 0.0
+        completed = set()
         start = time.time()
 
-        for name, test in sorted(tests.items()):
-            res = self._runner.exec(
-                cmd, wd=location, input=test.input,
-                redirect=True, timeout=timeout,
-            )
-
-            if res.timed_out:
-                System.error('Execution timed out', title=name)
-            elif res.code:
-                System.error(f'Nonzero exit code {res.code}', title=name)
-            elif test.expected is not None and res.outs != test.expected:
-                System.error('Output differs from expectation', title=name)
-            else:
-                System.success('Output matches expectations', title=name)
-                passed += 1
+        for group, members in group_tests(tests, recipe.groups):
+            if group is not None:
+                System.title(f'Group {group.name!r} ({group.points:g} points)')
+                blocking = [d for d in group.depends if d not in completed]
+                if blocking:
+                    System.warn(
+                        f'Skipped {len(members)} tests, since group '
+                        f"{blocking[0]!r} didn't pass",
+                    )
+                    skipped += len(members)
+                    continue
+
+                if not members:
+                    System.warn(f'No tests in group {group.name!r}')
+                    continue
+
+            ran = group_passed = 0
+            with closing(self._verdicts(members, jobs, save)) as verdicts:
+                for test, verdict in verdicts:
+                    self._report(test, verdict)
+                    ran += 1
+                    group_passed += verdict.passed
+                    if group is not None and not verdict.passed:
+                        break
+
+            passed += group_passed
+            if group is None:
+                continue
+
+            if ran < len(members):
+                System.warn(f'Skipped the remaining {len(members) - ran} tests')
+                skipped += len(members) - ran
+            elif group_passed == len(members):
+                completed.add(group.name)
+                score += group.points
 
         seconds = time.time() - start
-        failed = len(tests) - passed
-        System.title(
-            f'{passed} passed and {failed} failed'
-            f' in {seconds:.2f} seconds',
-        )
+        failed = len(tests) - passed - skipped
+        summary = f'{passed} passed and {failed} failed'
+        if skipped:
+            summary = f'{passed} passed, {failed} failed and {skipped} skipped'
+        System.title(f'{summary} in {seconds:.2f} seconds')
 
-        System.abort(1 if failed else 0)
+        if recipe.groups:
+            total = sum(group.points for group in recipe.groups)
+            System.title(f'Score: {score:g}/{total:g}')
+
+        return passed, failed + skipped
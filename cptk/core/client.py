@@ -0,0 +1,187 @@
+""" A thin client that forwards commands to a running cptk daemon. This module
+is imported on every invocation of cptk, so it must only use the standard
+library and import as little as possible. """
+from __future__ import annotations
+
+import array
+import json
+import os
+import socket
+import struct
+import sys
+
+import cptk.constants
+
+HEADER = struct.Struct('!I')
+EXIT_CODE = struct.Struct('!i')
+INTERRUPT = b'\x03'
+
+# The daemon replies to each request with one of these, before it runs the
+# command. A busy daemon doesn't run the command at all.
+ACCEPTED = b'\x06'
+BUSY = b'\x15'
+STREAMS = (0, 1, 2)  # stdin, stdout and stderr
+
+
+def supported() -> bool:
+    return hasattr(socket, 'AF_UNIX') and hasattr(socket, 'SCM_RIGHTS')
+
+
+def socket_path() -> str:
+    """ Returns the path of the socket of the daemon. By default, the socket
+    is stored in a private directory of the current user (see 'private_dir'),
+    since the standard streams and the environment variables of each command
+    are sent over it. """
+
+    path = os.environ.get(cptk.constants.DAEMON_SOCKET_ENV)
+    if path:
+        return path
+
+    folder = os.environ.get('XDG_RUNTIME_DIR') or os.environ.get('TMPDIR')
+    folder = os.path.join(folder or '/tmp', f'cptk-{os.getuid()}')
+    return os.path.join(folder, 'daemon.sock')
+
+
+def _owned(st: os.stat_result) -> bool:
+    return st.st_uid == os.getuid()
+
+
+def private_dir(path: str) -> bool:
+    """ Creates the directory of the given socket path, that only the current
+    user can access (unless it already exists). Returns True if no other
+    user can replace files in the directory. """
+
+    folder = os.path.dirname(path) or os.curdir
+    try:
+        os.makedirs(folder, mode=0o700, exist_ok=True)
+        st = os.stat(folder)
+    except OSError:
+        return False
+    return _owned(st) and not st.st_mode & 0o022
+
+
+def is_private(path: str) -> bool:
+    """ Returns True if the given socket, and the directory that contains it,
+    are owned by the current user, and no other user can replace the
+    socket. """
+
+    try:
+        st = os.stat(path)
+        parent = os.stat(os.path.dirname(path) or os.curdir)
+    except OSError:
+        return False
+    return _owned(st) and _owned(parent) and not parent.st_mode & 0o022
+
+
+def peer_uid(sock: socket.socket) -> int | None:
+    """ Returns the user ID of the process on the other end of the given
+    connection, or None if the platform can't tell. """
+
+    if not hasattr(socket, 'SO_PEERCRED'):
+        return None
+
+    creds = struct.Struct('3i')
+    data = sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, creds.size)
+    _, uid, _ = creds.unpack(data)
+    return uid
+
+
+def recv_exactly(sock: socket.socket, size: int) -> bytes:
+    data = b''
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError('connection closed unexpectedly')
+        data += chunk
+    return data
+
+
+def send_request(sock: socket.socket, request: dict, fds: list[int]) -> None:
+    """ Sends the given request to the daemon, together with the given file
+    descriptors (which are duplicated into the daemon process). """
+
+    payload = json.dumps(request).encode('utf8')
+    sock.sendmsg(
+        [HEADER.pack(len(payload)) + payload],
+        [(socket.SOL_SOCKET, socket.SCM_RIGHTS, array.array('i', fds))],
+    )
+
+
+def connect(path: str = None) -> socket.socket | None:
+    """ Returns a connection to the daemon that listens on the given path (by
+    default, the path returned by 'socket_path'), or None if there isn't
+    one. Sockets that may belong to other users are never connected to,
+    since they would receive the environment and the terminal of the
+    command. """
+
+    if not supported():
+        return None
+
+    path = socket_path() if path is None else path
+    if not is_private(path):
+        return None
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+        uid = peer_uid(sock)
+    except OSError:
+        sock.close()
+        return None
+
+    if uid is not None and uid != os.getuid():
+        sock.close()
+        return None
+    return sock
+
+
+def forward(args: list[str] = None) -> int | None:
+    """ Runs the given command line in the daemon, with the standard streams of
+    the current process. Returns the exit code of the command, or None if the
+    command should run locally (no daemon is running, it is busy running
+    another command, or it is disabled using the 'CPTK_NO_DAEMON' environment
+    variable). """
+
+    argv = sys.argv[1:] if args is None else list(args)
+    if os.environ.get(cptk.constants.NO_DAEMON_ENV) or 'daemon' in argv:
+        return None
+
+    sock = connect()
+    if sock is None:
+        return None
+
+    with sock:
+        request = {'argv': argv, 'cwd': os.getcwd(), 'env': dict(os.environ)}
+        send_request(sock, request, list(STREAMS))
+
+        try:
+            if recv_exactly(sock, len(BUSY)) == BUSY:
+                return None
+        except ConnectionError:
+            return 70  # os.EX_SOFTWARE
+
+        while True:
+            try:
+                return EXIT_CODE.unpack(recv_exactly(sock, EXIT_CODE.size))[0]
+            except KeyboardInterrupt:
+                # The daemon isn't in our process group, so it doesn't get the
+                # interrupt from the terminal. We forward it ourselves.
+                sock.sendall(INTERRUPT)
+            except ConnectionError:
+                return 70  # os.EX_SOFTWARE
+
+
+def stop() -> bool:
+    """ Asks the running daemon to stop. Returns False if there isn't one. """
+
+    sock = connect()
+    if sock is None:
+        return False
+
+    with sock:
+        send_request(sock, {'stop': True}, list())
+        try:
+            recv_exactly(sock, len(ACCEPTED) + EXIT_CODE.size)
+        except ConnectionError:
+            pass
+    return True
@@ -12,7 +12,10 @@ F = TypeVar('F')
 class CommandCollector:
 
     def __init__(self, *args, **kwargs) -> None:
-        self._parser = argparse.ArgumentParser(*args, **kwargs)
+        self._setup(argparse.ArgumentParser(*args, **kwargs))
+
+    def _setup(self, parser: argparse.ArgumentParser) -> None:
+        self._parser = parser
         self._subparsers = self._parser.add_subparsers()
         self._args: dict[Callable, list[tuple]] = defaultdict(list)
 
@@ -21,6 +24,15 @@ class CommandCollector:
         # Print the default help message if no command is provided
         self._parser.set_defaults(func=self._parser.print_help)
 
+    def group(self, *args, **kwargs) -> CommandCollector:
+        """ Creates a new subcommand that has subcommands of its own (for
+        example, 'cptk tests import'), and returns a collector that collects
+        them. Accepts the same arguments as the command method. """
+
+        group = CommandCollector.__new__(CommandCollector)
+        group._setup(self._subparsers.add_parser(*args, **kwargs))
+        return group
+
     def global_argument(self, *args, **kwargs) -> None:
         return self._parser.add_argument(*args, **kwargs)
 
@@ -1,20 +1,38 @@
 from __future__ import annotations
 
+import hashlib
 import os
+import pickle
+import time
+from typing import Any
+from typing import TextIO
 from typing import TYPE_CHECKING
 
 from pydantic import BaseModel
 from pydantic.error_wrappers import ValidationError
-from yaml import dump
-from yaml import safe_load
-from yaml import YAMLError
 
+import cptk
+import cptk.utils
 from cptk.utils import cptkException
 if TYPE_CHECKING:
     from typing import TypeVar
 
     T = TypeVar('T')
 
+    Stamp = tuple[int, int, int]
+
+# Parsed configuration files are cached in memory and on disk (in the user-wide
+# cache directory). The cache is validated using the modification time, size
+# and inode of the file.
+CACHE_FOLDER = 'configs'
+
+# Files that were modified less than this amount of nanoseconds ago are not
+# cached, since they can be modified again without changing the modification
+# time on filesystems with a coarse timestamp resolution.
+RACY_NS = 2_000_000_000
+
+_cache: dict[tuple[type, str], tuple[Stamp, Configuration]] = dict()
+
 
 class ConfigFileError(cptkException):
     """ Base cptkException for all errors thrown from the 'load_config_file'
@@ -59,10 +77,50 @@ class ConfigFileParsingError(ConfigFileError):
 
     def __generate_error_message(self) -> str:
         s = f"Error while parsing {self.path!r}\n"
-        s += f"Under line {self.position[0]}: {self.error}"
+        if self.position is None:
+            return s + self.error
+
+        line, column = self.position
+        s += f"Under line {line}, column {column}: {self.error}"
         return s
 
 
+def load_yaml(stream: str | TextIO) -> Any:
+    """ Parses the given YAML document safely. Uses the bindings to the libyaml
+    C library if they are available. """
+
+    import yaml
+    loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+    return yaml.load(stream, Loader=loader)
+
+
+def dump_yaml(data: Any) -> str:
+    """ Converts the given data into a YAML document safely. Uses the bindings
+    to the libyaml C library if they are available. """
+
+    import yaml
+    dumper = getattr(yaml, 'CSafeDumper', yaml.SafeDumper)
+    return yaml.dump(data, Dumper=dumper, sort_keys=False)
+
+
+def _stamp(path: str) -> Stamp | None:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+def _is_racy(stamp: Stamp) -> bool:
+    return time.time_ns() - stamp[0] < RACY_NS
+
+
+def _cache_path(cls: type, path: str) -> str:
+    key = f'{cls.__module__}:{cls.__qualname__}:{path}'
+    name = hashlib.sha1(key.encode('utf8')).hexdigest() + '.pickle'
+    return os.path.join(cptk.utils.cache_dir(), CACHE_FOLDER, name)
+
+
 class Configuration(BaseModel):
 
     @classmethod
@@ -70,17 +128,78 @@ class Configuration(BaseModel):
         """ Load information from a YAML configuration file and dump it into a
         pydantic model. Raises relevent expections if the given file path isn't
         found, the YAML file can't be parsed, or the data doesn't match the
-        pydantic model. """
+        pydantic model.
+        Parsed files are cached, and parsed again only if they are modified.
+        Each call returns a new copy that can be modified freely. """
+
+        stamp = _stamp(path)
+        if stamp is None:
+            raise ConfigFileNotFound(path)
+
+        key = (cls, os.path.abspath(path))
+        config = cls._cached(key, stamp)
+
+        if config is None:
+            config = cls._parse(path)
+            if not _is_racy(stamp):
+                cls._remember(key, stamp, config)
+
+        return config.copy(deep=True)
+
+    @classmethod
+    def _cached(cls: type[T], key: tuple[type, str], stamp: Stamp) -> T | None:
+        cached = _cache.get(key)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+
+        try:
+            with open(_cache_path(*key), 'rb') as file:
+                version, cached_stamp, config = pickle.load(file)
+        except Exception:
+            # The persistent cache is just an optimization. It can be missing,
+            # corrupted, or written by an incompatible version of cptk.
+            return None
+
+        if version != cptk.__version__ or cached_stamp != stamp:
+            return None
+
+        _cache[key] = (stamp, config)
+        return config
+
+    @classmethod
+    def _remember(
+        cls,
+        key: tuple[type, str],
+        stamp: Stamp,
+        config: Configuration,
+    ) -> None:
+        _cache[key] = (stamp, config)
+        try:
+            cptk.utils.atomic_write(
+                _cache_path(*key),
+                pickle.dumps((cptk.__version__, stamp, config)),
+            )
+        except (OSError, pickle.PicklingError):
+            pass
+
+    @classmethod
+    def _parse(cls: type[T], path: str) -> T:
+        from yaml import YAMLError
 
         try:
             with open(path, encoding='utf8') as file:
-                data = safe_load(file)
+                data = load_yaml(file)
 
         except FileNotFoundError:
             raise ConfigFileNotFound(path)
 
         except YAMLError as err:
-            mark = err.problem_mark
+            # Errors that are raised while reading the stream (for example,
+            # because of an unprintable character) don't have a mark.
+            mark = getattr(err, 'problem_mark', None)
+            if mark is None:
+                raise ConfigFileParsingError(path, str(err))
+
             pos = (mark.line + 1, mark.column + 1)
             raise ConfigFileParsingError(path, err.problem, pos)
 
@@ -97,7 +216,7 @@ class Configuration(BaseModel):
     def yaml(self) -> str:
         """ Converts the object into a YAML string. """
 
-        return dump(self.dict(exclude_unset=True), sort_keys=False)
+        return dump_yaml(self.dict(exclude_unset=True))
 
     def dump(self, path: str) -> None:
         """ Dumps the pydantic model into the given file in YAML format. """
@@ -105,3 +224,5 @@ class Configuration(BaseModel):
         os.makedirs(os.path.dirname(path), exist_ok=True)
         with open(path, 'w', encoding='utf8') as file:
             file.write(self.yaml())
+
+        _cache.pop((type(self), os.path.abspath(path)), None)
@@ -0,0 +1,326 @@
+""" A resident cptk server. Commands are executed in the server process, with
+the standard streams, the working directory and the environment variables of
+the client that requested them. Modules are imported once, and objects that
+are cached between commands (like the network session of the fetcher) stay
+warm. """
+from __future__ import annotations
+
+import _thread
+import array
+import json
+import os
+import queue
+import socket
+import sys
+import threading
+from importlib import import_module
+from typing import TextIO
+
+import cptk.utils
+from cptk.core import client
+from cptk.core.system import System
+
+# Modules that are imported by most commands, and are imported ahead of time.
+PRELOAD = (
+    'cptk.commands',
+    'cptk.local.project',
+    'cptk.local.problem',
+    'cptk.core.chef',
+    'cptk.core.preprocessor',
+    'cptk.core.fetcher',
+    'cptk.core.archive',
+)
+
+
+class DaemonError(cptk.utils.cptkException):
+    """ Raised if the daemon can't be started. """
+
+
+class DaemonUnsupported(DaemonError):
+    def __init__(self) -> None:
+        super().__init__(
+            'The daemon requires Unix domain sockets, which are not supported '
+            'by this platform',
+        )
+
+
+class DaemonInsecure(DaemonError):
+    def __init__(self, path: str) -> None:
+        self.path = path
+        super().__init__(
+            f'The directory of {path!r} can be modified by other users. '
+            'Set the CPTK_DAEMON_SOCKET environment variable to a path in a '
+            'private directory',
+        )
+
+
+class DaemonRunning(DaemonError):
+    def __init__(self, path: str) -> None:
+        self.path = path
+        super().__init__(f'A daemon is already listening on {path!r}')
+
+
+def _exit_code(code) -> int:
+    """ Converts the argument of a SystemExit to an exit code, like the
+    interpreter does. """
+
+    if code is None:
+        return 0
+    if isinstance(code, int):
+        return code
+    print(code, file=sys.stderr)  # noqa: T001
+    return 1
+
+
+def _open_streams() -> tuple[TextIO, TextIO, TextIO]:
+    # We don't reuse the original stream objects, since they can contain
+    # buffered data of a previous client, and their buffering mode is
+    # determined by the original streams of the daemon.
+    return (
+        open(0, 'r', closefd=False),
+        open(1, 'w', closefd=False, buffering=1 if os.isatty(1) else -1),
+        open(2, 'w', closefd=False, buffering=1),
+    )
+
+
+class Daemon:
+    """ Commands are received by a background thread, and run one at a time
+    by the main thread (so they can be interrupted). While a command runs,
+    other requests are answered with 'client.BUSY', and their clients run
+    the command by themselves instead of waiting. """
+
+    def __init__(self, path: str, idle: float = None) -> None:
+        self.path = path
+        self.idle = idle
+        self._running = False
+        self._busy = threading.Lock()
+        self._requests = queue.Queue()
+
+    def _preload(self) -> None:
+        for module in PRELOAD:
+            import_module(module)
+
+    def _reset(self) -> None:
+        # The project configuration is cached for the lifetime of the process,
+        # but it can be edited between commands.
+        from cptk.local.project import LocalProject
+        LocalProject.config.fget.cache_clear()
+
+    def _listen(self) -> socket.socket:
+        if client.connect(self.path) is not None:
+            raise DaemonRunning(self.path)
+
+        if not client.private_dir(self.path):
+            raise DaemonInsecure(self.path)
+        if os.path.exists(self.path):
+            os.remove(self.path)  # left behind by a daemon that was killed
+
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        umask = os.umask(0o177)  # only the current user can connect
+        try:
+            server.bind(self.path)
+        finally:
+            os.umask(umask)
+
+        server.listen()
+        return server
+
+    def serve_forever(self) -> None:
+        """ Serves commands until a stop request is received, or until no
+        commands are received for 'idle' seconds. """
+
+        if not client.supported():
+            raise DaemonUnsupported()
+
+        self._preload()
+        server = self._listen()
+        self._running = True
+        System.log(f'Listening on {self.path}')
+
+        acceptor = threading.Thread(target=self._accept, args=(server,))
+        acceptor.daemon = True
+        acceptor.start()
+
+        try:
+            while True:
+                try:
+                    conn, request, fds = self._requests.get(timeout=self.idle)
+                except queue.Empty:
+                    break
+
+                if conn is None:
+                    break  # a stop request
+
+                with conn:
+                    try:
+                        System.log(f"Running {' '.join(request['argv'])!r}")
+                        code = self._execute(conn, request, fds)
+                    finally:
+                        self._busy.release()
+                    self._reply(conn, client.EXIT_CODE.pack(code))
+
+        finally:
+            self._running = False
+            try:
+                server.shutdown(socket.SHUT_RDWR)  # wakes the acceptor
+            except OSError:
+                pass
+            server.close()
+            os.remove(self.path)
+
+    def _accept(self, server: socket.socket) -> None:
+        while True:
+            try:
+                conn, _ = server.accept()
+            except OSError:
+                return  # the server is closed
+
+            conn.settimeout(None)
+            if not self._handle(conn):
+                conn.close()
+
+    def _receive(self, conn: socket.socket) -> tuple[dict, list[int]]:
+        fds = array.array('i')
+        data, ancdata, _, _ = conn.recvmsg(
+            client.HEADER.size,
+            socket.CMSG_SPACE(len(client.STREAMS) * fds.itemsize),
+        )
+
+        for level, kind, cdata in ancdata:
+            if level == socket.SOL_SOCKET and kind == socket.SCM_RIGHTS:
+                fds.frombytes(cdata[:len(cdata) - len(cdata) % fds.itemsize])
+
+        data += client.recv_exactly(conn, client.HEADER.size - len(data))
+        size, = client.HEADER.unpack(data)
+        request = json.loads(client.recv_exactly(conn, size))
+        return request, list(fds)
+
+    @staticmethod
+    def _reply(conn: socket.socket, data: bytes) -> bool:
+        try:
+            conn.sendall(data)
+        except OSError:
+            return False  # the client was terminated
+        return True
+
+    def _handle(self, conn: socket.socket) -> bool:
+        """ Handles a new connection. Returns True if a command is queued to
+        run on it, and otherwise the connection can be closed. """
+
+        try:
+            uid = client.peer_uid(conn)
+            if uid is not None and uid != os.getuid():
+                return False  # commands run as the current user only
+            request, fds = self._receive(conn)
+        except (OSError, ValueError):
+            return False  # not a valid client
+
+        stop = bool(request.get('stop'))
+        if stop or len(fds) != len(client.STREAMS):
+            for fd in fds:
+                os.close(fd)
+            if stop:
+                self._running = False
+                self._requests.put((None, None, None))
+
+            code = 0 if stop else 70
+            self._reply(conn, client.ACCEPTED + client.EXIT_CODE.pack(code))
+            return False
+
+        if not self._running or not self._busy.acquire(blocking=False):
+            for fd in fds:
+                os.close(fd)
+            self._reply(conn, client.BUSY)
+            return False
+
+        if not self._reply(conn, client.ACCEPTED):
+            for fd in fds:
+                os.close(fd)
+            self._busy.release()
+            return False
+
+        self._requests.put((conn, request, fds))
+        return True
+
+    def _watch(self, conn: socket.socket, done: threading.Event) -> None:
+        """ Interrupts the running command if the client asks to, or if the
+        client is terminated. """
+
+        while True:
+            try:
+                data = conn.recv(1)
+            except OSError:
+                data = b''
+
+            if done.is_set():
+                return
+
+            if data in (client.INTERRUPT, b''):
+                _thread.interrupt_main()
+
+            if not data:
+                return
+
+    def _execute(
+        self,
+        conn: socket.socket,
+        request: dict,
+        fds: list[int],
+    ) -> int:
+        # Imported here because the daemon itself is started by a command.
+        from cptk.main import run
+
+        saved_fds = [os.dup(fd) for fd in client.STREAMS]
+        saved_streams = (sys.stdin, sys.stdout, sys.stderr)
+        saved_cwd = os.getcwd()
+        saved_env = dict(os.environ)
+        saved_system = (System._verbosity, System._yes_stack)
+        streams = saved_streams
+
+        done = threading.Event()
+        watcher = threading.Thread(target=self._watch, args=(conn, done))
+        watcher.daemon = True
+
+        try:
+            for src, dst in zip(fds, client.STREAMS):
+                os.dup2(src, dst)
+            streams = _open_streams()
+            sys.stdin, sys.stdout, sys.stderr = streams
+
+            os.environ.clear()
+            os.environ.update(request['env'])
+            os.chdir(request['cwd'])
+            self._reset()
+
+            watcher.start()
+            return _exit_code(run(request['argv']))
+
+        except KeyboardInterrupt:
+            return 130  # 128 + SIGINT
+
+        finally:
+            done.set()
+            sys.stdin, sys.stdout, sys.stderr = saved_streams
+            for stream in streams:
+                if stream not in saved_streams:
+                    try:
+                        stream.close()
+                    except OSError:
+                        pass  # failed to flush, the client is gone
+
+            for src, dst in zip(saved_fds, client.STREAMS):
+                os.dup2(src, dst)
+                os.close(src)
+            for fd in fds:
+                os.close(fd)
+
+            os.chdir(saved_cwd)
+            os.environ.clear()
+            os.environ.update(saved_env)
+            System._verbosity, System._yes_stack = saved_system
+
+            # Wakes the watcher thread, if it is still waiting for the client.
+            try:
+                conn.shutdown(socket.SHUT_RD)
+            except OSError:
+                pass
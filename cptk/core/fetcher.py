@@ -1,17 +1,18 @@
 from __future__ import annotations
 
 from typing import TYPE_CHECKING
+from urllib.parse import urlparse
 
-import pkg_resources
-from bs4 import BeautifulSoup
-from requests import session
-
+from cptk.core.plugins import WebsiteRegistry
 from cptk.scrape import PageInfo
-from cptk.scrape import Website
 from cptk.utils import cptkException
 
 if TYPE_CHECKING:
+    from typing import Iterator
+    from cptk.core.transport import Transport
+    from cptk.scrape import Contest
     from cptk.scrape import Problem
+    from cptk.scrape import Website
 
 
 class InvalidClone(cptkException):
@@ -34,24 +35,27 @@ class UnknownWebsite(cptkException):
 
 class Fetcher:
 
-    def __init__(self) -> None:
-        self.session = session()
-        self._load_websites()
-
-    def _load_websites(self) -> list[type[Website]]:
-        self._websites = [
-            point.load()()
-            for point in pkg_resources.iter_entry_points('cptk_sites')
-        ]
-
-        self._domain_to_website = dict()
-        for website in self._websites:
-            domain = website.domain
-            if isinstance(domain, str):
-                self._domain_to_website[domain] = website
-            else:
-                for cur in domain:
-                    self._domain_to_website[cur] = website
+    def __init__(self, transport: Transport = None) -> None:
+        if transport is None:
+            from cptk.core.transport import Transport
+            transport = Transport()
+
+        self.transport = transport
+        self.websites = WebsiteRegistry()
+
+    def _candidates(self, info: PageInfo) -> Iterator[Website]:
+        """ Yields the websites that may handle the given page. The website
+        that is registered with the domain of the page is yielded first, and
+        only then all other websites are loaded and yielded. """
+
+        host = urlparse(info.url).hostname
+        first = self.websites.for_host(host) if host else None
+        if first is not None:
+            yield first
+
+        for website in self.websites.all():
+            if website is not first:
+                yield website
 
     def page_to_problem(self, info: PageInfo) -> Problem:
         """ Recives an arbitrary page info instance and tries to match it with
@@ -59,18 +63,40 @@ class Fetcher:
         doesn't find a way to parse the given webpage, it raises the
         'InvalidClone' exception. """
 
-        for website in self._websites:
+        for website in self._candidates(info):
             if website.is_problem(info):
                 return website.to_problem(info)
         raise InvalidClone(info)
 
+    def page_to_contest(self, info: PageInfo) -> Contest:
+        """ Recives an arbitrary page info instance and tries to match it with
+        a Website class that knows how to parse it as a contest page. If cptk
+        doesn't find a way to parse the given webpage, it raises the
+        'InvalidClone' exception. """
+
+        for website in self._candidates(info):
+            if website.is_contest(info):
+                return website.to_contest(info)
+        raise InvalidClone(info)
+
+    def contest_problems(self, info: PageInfo) -> list[str]:
+        """ Returns the URLs of the problems that are listed in the given
+        contest page. """
+
+        for website in self._candidates(info):
+            if website.is_contest(info):
+                return website.contest_problems(info)
+        raise InvalidClone(info)
+
     def to_page(self, url: str) -> PageInfo:
         """ Makes an get http/s request to the given URL and returns the result
         as a PageInfo instance. """
 
+        from bs4 import BeautifulSoup
+
         if not url.startswith('http'):
             url = f'http://{url}'
 
-        res = self.session.get(url)
+        res = self.transport.get(url)
         data = BeautifulSoup(res.content, 'lxml')
         return PageInfo(url, data)
@@ -0,0 +1,207 @@
+""" Records which files of a template directory actually need to be rendered,
+so cloning a problem doesn't decode, render and rewrite files that contain no
+template syntax (or that aren't text at all). """
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+
+from cptk.core.config import RACY_NS
+from cptk.utils import atomic_write
+
+# Increment when the format of the manifest files changes.
+MANIFEST_VERSION = 1
+
+# The strings that start a block, a variable and a comment in the templates.
+MARKERS = ('{%', '{{', '{#')
+
+
+def has_markers(text: str) -> bool:
+    return any(marker in text for marker in MARKERS)
+
+
+def decode(raw: bytes) -> str | None:
+    """ Decodes the contents of a template file, the same way a file that is
+    opened in text mode is decoded (including universal newlines). Returns
+    None if the file is binary. """
+
+    if b'\0' in raw:
+        return None
+
+    try:
+        text = raw.decode('utf8')
+    except UnicodeDecodeError:
+        return None
+
+    return text.replace('\r\n', '\n').replace('\r', '\n')
+
+
+def encode(text: str) -> bytes:
+    """ Encodes rendered text, the same way it is encoded when it is written
+    to a file that is opened in text mode. """
+    return text.replace('\n', os.linesep).encode('utf8')
+
+
+def render_plain(text: str) -> str:
+    """ Returns the result of rendering text without template markers, without
+    actually rendering it. The template engine removes a single trailing
+    newline. """
+    return text[:-1] if text.endswith('\n') else text
+
+
+@dataclass
+class ManifestEntry:
+    """ 'name' is True if the name of the file contains template markers, and
+    'markers' is True if its contents do. 'verbatim' is True if rendering
+    the file doesn't change it, which is the case for binary files and for
+    some files without markers. """
+
+    name: bool
+    markers: bool = False
+    verbatim: bool = False
+
+
+def inspect_file(path: str) -> ManifestEntry:
+    with open(path, 'rb') as file:
+        raw = file.read()
+
+    name = has_markers(os.path.basename(path))
+    text = decode(raw)
+    if text is None:
+        return ManifestEntry(name, verbatim=True)
+
+    if has_markers(text):
+        return ManifestEntry(name, markers=True)
+
+    return ManifestEntry(name, verbatim=encode(render_plain(text)) == raw)
+
+
+def _stamp(st: os.stat_result) -> list[int] | None:
+    """ Returns the stamp of a file with the given stat, or None if the file
+    was modified too recently to be trusted (see 'RACY_NS'), in which case it
+    is inspected again on the next update. """
+
+    if time.time_ns() - st.st_mtime_ns < RACY_NS:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+
+class TemplateManifest:
+    """ Maps the paths of the files in a template directory (relative to it,
+    before rendering) to their manifest entries. Files are inspected again
+    only when they are modified. If a cache file is given, the manifest is
+    stored in it, so other processes don't have to inspect files again.
+    'dirs' lists the (sorted) directories of the template, as of the last
+    update. """
+
+    def __init__(self, root: str, cache_file: str = None) -> None:
+        self.root = root
+        self.cache_file = cache_file
+        self.entries: dict[str, ManifestEntry] = dict()
+        self.dirs: list[str] = list()
+        self._stamps: dict[str, list[int] | None] = dict()
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self) -> None:
+        if self.cache_file is None:
+            return
+
+        try:
+            with open(self.cache_file, encoding='utf8') as file:
+                data = json.load(file)
+            if data['version'] != MANIFEST_VERSION:
+                return
+            for rel, (stamp, entry) in data['entries'].items():
+                self._stamps[rel] = stamp
+                self.entries[rel] = ManifestEntry(*entry)
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            self.entries, self._stamps = dict(), dict()
+
+    def _save(self) -> None:
+        if self.cache_file is None:
+            return
+
+        data = {
+            'version': MANIFEST_VERSION,
+            'entries': {
+                rel: [
+                    self._stamps[rel],
+                    [entry.name, entry.markers, entry.verbatim],
+                ]
+                for rel, entry in self.entries.items()
+            },
+        }
+
+        try:
+            atomic_write(self.cache_file, json.dumps(data))
+        except OSError:
+            pass  # The cache is just an optimization, it is ok to lose it.
+
+    def update(self) -> None:
+        """ Inspects files that were added or modified since the last update,
+        and drops the entries of removed files. """
+
+        with self._lock:
+            seen = set()
+            dirs = list()
+            changed = False
+
+            stack = [''] if os.path.isdir(self.root) else []
+            while stack:
+                rel_dir = stack.pop()
+                with os.scandir(os.path.join(self.root, rel_dir)) as it:
+                    for item in it:
+                        rel = os.path.join(rel_dir, item.name)
+                        if item.is_dir():
+                            stack.append(rel)
+                            dirs.append(rel)
+                            continue
+
+                        seen.add(rel)
+                        stamp = _stamp(item.stat())
+                        if stamp is None or self._stamps.get(rel) != stamp:
+                            self.entries[rel] = inspect_file(item.path)
+                            self._stamps[rel] = stamp
+                            changed = True
+
+            for rel in set(self.entries) - seen:
+                del self.entries[rel]
+                del self._stamps[rel]
+                changed = True
+
+            self.dirs = sorted(dirs)
+            if changed:
+                self._save()
+
+    def get(self, rel: str) -> ManifestEntry | None:
+        return self.entries.get(rel)
+
+
+_manifests: dict[tuple[str, str | None], TemplateManifest] = dict()
+_manifests_lock = threading.Lock()
+
+
+def get_manifest(root: str, cache_dir: str = None) -> TemplateManifest:
+    """ Returns the up to date manifest of the template in the given directory.
+    Manifests are kept in memory for the whole process, and stored in the
+    given cache directory (if there is one). """
+
+    root = os.path.abspath(root)
+    cache_file = None
+    if cache_dir is not None:
+        digest = hashlib.sha1(root.encode('utf8')).hexdigest()
+        cache_file = os.path.join(cache_dir, f'manifest-{digest}.json')
+
+    with _manifests_lock:
+        key = (root, cache_file)
+        if key not in _manifests:
+            _manifests[key] = TemplateManifest(root, cache_file)
+        manifest = _manifests[key]
+
+    manifest.update()
+    return manifest
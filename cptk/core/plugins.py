@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sys
+from importlib import import_module
+from typing import TYPE_CHECKING
+
+import cptk
+import cptk.utils
+
+if TYPE_CHECKING:
+    from cptk.scrape import Website
+
+
+WEBSITES_GROUP = 'cptk_sites'
+MANIFEST_NAME = 'plugins.json'
+
+
+def _entry_points(group: str) -> list[tuple[str, str]]:
+    """ Returns the (name, value) pairs of all installed entry points of the
+    given group, without importing any of them. """
+
+    try:
+        from importlib.metadata import entry_points
+    except ImportError:  # Python 3.7
+        import pkg_resources
+        return [
+            (point.name, f"{point.module_name}:{'.'.join(point.attrs)}")
+            for point in pkg_resources.iter_entry_points(group)
+        ]
+
+    points = entry_points()
+    if hasattr(points, 'select'):  # Python 3.10 and newer
+        points = points.select(group=group)
+    else:
+        points = points.get(group, [])
+    return [(point.name, point.value) for point in points]
+
+
+def _load(value: str) -> Website:
+    module, _, attrs = value.partition(':')
+    obj = import_module(module)
+    for attr in attrs.split('.'):
+        obj = getattr(obj, attr)
+    return obj()
+
+
+def _fingerprint() -> str:
+    """ Identifies the current set of installed distributions, without reading
+    their metadata. Installing or removing a distribution modifies the
+    directory it is installed into, which is one of the 'sys.path' entries. """
+
+    parts = [cptk.__version__, sys.version]
+    for path in sys.path:
+        try:
+            parts.append(f'{path}:{os.stat(path or os.curdir).st_mtime_ns}')
+        except OSError:
+            parts.append(path)
+    return hashlib.sha1('\n'.join(parts).encode('utf8')).hexdigest()
+
+
+class WebsiteRegistry:
+    """ Discovers the installed websites lazily. The entry points and the
+    domains of all websites are cached in a manifest file, and a website module
+    is imported only when a page of one of its domains is handled. """
+
+    def __init__(self, group: str = WEBSITES_GROUP) -> None:
+        self.group = group
+        self._manifest: list[dict] | None = None
+        self._loaded: dict[str, Website] = dict()
+
+    @property
+    def _manifest_path(self) -> str:
+        return os.path.join(cptk.utils.cache_dir(), MANIFEST_NAME)
+
+    def _read_manifest(self, fingerprint: str) -> list[dict] | None:
+        try:
+            with open(self._manifest_path, encoding='utf8') as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return None
+
+        if not isinstance(data, dict) or data.get('fingerprint') != fingerprint:
+            return None
+        return data.get(self.group)
+
+    def _write_manifest(self, fingerprint: str, plugins: list[dict]) -> None:
+        try:
+            cptk.utils.atomic_write(
+                self._manifest_path,
+                json.dumps({'fingerprint': fingerprint, self.group: plugins}),
+            )
+        except OSError:
+            pass  # The manifest is just a cache, it is ok to lose it.
+
+    def _build_manifest(self) -> list[dict]:
+        plugins = list()
+        for name, value in _entry_points(self.group):
+            website = self._loaded[name] = _load(value)
+            domain = website.domain
+            domains = [domain] if isinstance(domain, str) else list(domain)
+            plugins.append({'name': name, 'value': value, 'domains': domains})
+        return plugins
+
+    @property
+    def manifest(self) -> list[dict]:
+        if self._manifest is None:
+            fingerprint = _fingerprint()
+            self._manifest = self._read_manifest(fingerprint)
+            if self._manifest is None:
+                self._manifest = self._build_manifest()
+                self._write_manifest(fingerprint, self._manifest)
+        return self._manifest
+
+    def _get(self, plugin: dict) -> Website:
+        name = plugin['name']
+        if name not in self._loaded:
+            self._loaded[name] = _load(plugin['value'])
+        return self._loaded[name]
+
+    def for_host(self, host: str) -> Website | None:
+        """ Returns the website that handles the given host name, or None if
+        the host isn't registered by any website. Subdomains (like 'www.') of
+        registered domains are matched too. """
+
+        host = host.lower().rstrip('.')
+        for plugin in self.manifest:
+            for domain in plugin['domains']:
+                if host == domain or host.endswith('.' + domain):
+                    return self._get(plugin)
+        return None
+
+    def all(self) -> list[Website]:
+        """ Returns all installed websites. Imports all of them. """
+        return [self._get(plugin) for plugin in self.manifest]
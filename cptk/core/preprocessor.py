@@ -1,21 +1,58 @@
 from __future__ import annotations
 
+import filecmp
+import hashlib
+import io
 import os
 import platform
+import stat
+import threading
 from abc import ABC
 from abc import abstractmethod
+from dataclasses import dataclass
+from dataclasses import field
 from datetime import datetime
+from functools import lru_cache
+from typing import Callable
 from typing import TYPE_CHECKING
 
 import jinja2
 from slugify import slugify
 
 if TYPE_CHECKING:
+    from cptk.core.manifest import ManifestEntry
     from cptk.scrape import Problem
     from typing import TypeVar
     T = TypeVar('T')
 
+import cptk.utils
+from cptk.core.manifest import decode
+from cptk.core.manifest import encode
+from cptk.core.manifest import get_manifest
+from cptk.core.manifest import has_markers
+from cptk.core.manifest import render_plain
+from cptk.utils import atomic_write
+from cptk.utils import copy_file
 from cptk.utils import cptkException
+from cptk.utils import link_file
+from cptk.utils import path_matches
+from cptk.utils import write_file
+
+# The maximal amount of compiled templates kept in memory by each compiler.
+COMPILED_CACHE_SIZE = 1024
+
+# The folder inside the user cache directory in which the bytecode of compiled
+# templates and the manifests of templates are stored. Bytecode is executed
+# when it is loaded, so it is never stored inside (possibly shared) projects.
+CACHE_FOLDER = 'templates'
+
+# Directories with fewer files to render are rendered without a worker pool.
+PARALLEL_THRESHOLD = 8
+
+# The actions of files in a template plan.
+NEW = 'new'
+OVERWRITE = 'overwrite'
+UNCHANGED = 'unchanged'
 
 
 class PreprocessError(cptkException, ABC):
@@ -51,6 +88,24 @@ class PreprocessFileError(PreprocessError):
         return cls(err.jinja_error, path)
 
 
+class PreprocessFilesError(PreprocessFileError):
+    """ Raised when rendering the names or the contents of more than one file
+    fails. The errors of all files are available in 'errors'. """
+
+    def __init__(
+        self,
+        errors: list[PreprocessFileError | PreprocessNameError],
+    ) -> None:
+        self.errors = errors
+        first = errors[0]
+        path = first.name if isinstance(first, PreprocessNameError) else first.path
+        super().__init__(first.jinja_error, path)
+
+    def _generate_error_message(self) -> str:
+        title = f'Failed to render {len(self.errors)} files:'
+        return '\n'.join([title, *(str(err) for err in self.errors)])
+
+
 class PreprocessNameError(PreprocessError):
     def __init__(self, error: Exception, name: str) -> None:
         self.name = name
@@ -68,36 +123,209 @@ class PreprocessNameError(PreprocessError):
         return cls(err.jinja_error, name)
 
 
+def _defined(v) -> bool:
+    return not isinstance(v, jinja2.Undefined) and v is not None
+
+
+def _undefined(v) -> bool:
+    return isinstance(v, jinja2.Undefined) or v is None
+
+
+def _create_environment() -> jinja2.Environment:
+    env = jinja2.Environment(undefined=jinja2.StrictUndefined)
+
+    # Slug is a global to allow the "slug(...)" syntax,
+    # and a filter to allow the "... | slug" syntax.
+    env.globals.update({'slug': slugify})
+    env.filters.update({'slug': slugify})
+
+    # Cptk considers None values as undefined.
+    # This means that scopes like {% if v is defined %} where v is None
+    # won't be executed.
+    env.tests.update({'defined': _defined, 'undefined': _undefined})
+
+    return env
+
+
+class _BytecodeCache(jinja2.FileSystemBytecodeCache):
+    """ A bytecode cache that replaces cache files atomically, so processes
+    that clone problems concurrently never load a partially written file. """
+
+    def dump_bytecode(self, bucket: jinja2.bccache.Bucket) -> None:
+        data = io.BytesIO()
+        bucket.write_bytecode(data)
+        try:
+            atomic_write(self._get_cache_filename(bucket), data.getvalue())
+        except OSError:
+            pass  # The cache is just an optimization, it is ok to lose it.
+
+
+class TemplateCompiler:
+    """ Compiles template sources into Jinja templates. Each source is compiled
+    once: compiled templates are kept in an in-memory LRU cache, and their
+    bytecode is stored in the given cache directory (if there is one), so
+    other processes can load it instead of compiling the source again.
+    Templates don't hold any state of a specific problem: the context is
+    passed when they are rendered. """
+
+    def __init__(self, cache_dir: str = None) -> None:
+        self.env = _create_environment()
+        self.cache_dir = cache_dir
+        if cache_dir is not None:
+            self.env.bytecode_cache = _BytecodeCache(cache_dir)
+
+        self.compile = lru_cache(COMPILED_CACHE_SIZE)(self._compile)
+
+    def _compile(self, source: str) -> jinja2.Template:
+        # The bytecode of a template is keyed by its name, so the name is a
+        # digest of the source.
+        name = hashlib.sha1(source.encode('utf8')).hexdigest()
+
+        bcc = self.env.bytecode_cache
+        code = bucket = None
+        if bcc is not None:
+            try:
+                bucket = bcc.get_bucket(self.env, name, None, source)
+                code = bucket.code
+            except Exception:
+                bucket = None  # unreadable cache files are ignored
+
+        if code is None:
+            code = self.env.compile(source, name)
+            if bucket is not None:
+                bucket.code = code
+                bcc.set_bucket(bucket)
+
+        return self.env.template_class.from_code(
+            self.env, code, self.env.make_globals(None),
+        )
+
+
+_compilers: dict[str | None, TemplateCompiler] = dict()
+_compilers_lock = threading.Lock()
+
+
+def templates_cache_dir() -> str:
+    return os.path.join(cptk.utils.cache_dir(), CACHE_FOLDER)
+
+
+def get_compiler(cache_dir: str = None) -> TemplateCompiler:
+    """ Returns the template compiler that stores its bytecode in the given
+    directory. Compilers are shared by all preprocessors in the process, so
+    templates that are rendered for many problems are compiled once. """
+
+    if cache_dir is not None:
+        cache_dir = os.path.abspath(cache_dir)
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+        except OSError:
+            cache_dir = None
+
+    with _compilers_lock:
+        if cache_dir not in _compilers:
+            _compilers[cache_dir] = TemplateCompiler(cache_dir)
+        return _compilers[cache_dir]
+
+
+@dataclass
+class PlannedFile:
+    """ A file of a template, as it will be created in the destination. 'path'
+    is relative to the destination (after rendering), and 'source' is the
+    path of the template file. 'data' holds the rendered contents, or is None
+    if the template file is copied (or linked) as is. """
+
+    path: str
+    source: str
+    link: bool = False
+    data: bytes | None = None
+    action: str = NEW
+
+
+@dataclass
+class TemplatePlan:
+    """ The result of rendering a template directory into a destination
+    directory, computed without writing anything. Applying the plan creates
+    the new files and overwrites the changed ones. Unchanged files are not
+    touched. """
+
+    src: str
+    dst: str
+    dirs: list[str] = field(default_factory=list)
+    files: list[PlannedFile] = field(default_factory=list)
+
+    def _paths(self, action: str) -> list[str]:
+        return [file.path for file in self.files if file.action == action]
+
+    @property
+    def new(self) -> list[str]:
+        return self._paths(NEW)
+
+    @property
+    def overwritten(self) -> list[str]:
+        return self._paths(OVERWRITE)
+
+    @property
+    def unchanged(self) -> list[str]:
+        return self._paths(UNCHANGED)
+
+    def apply(self) -> None:
+        os.makedirs(self.dst, exist_ok=True)
+        for path in self.dirs:
+            os.makedirs(os.path.join(self.dst, path), exist_ok=True)
+
+        for file in self.files:
+            target = os.path.join(self.dst, file.path)
+            if file.action == UNCHANGED:
+                continue
+            elif file.link:
+                link_file(file.source, target)
+            elif file.data is None:
+                copy_file(file.source, target)
+            else:
+                write_file(target, file.data)
+
+
+def _planned_action(target: str, file: PlannedFile) -> str:
+    try:
+        st = os.stat(target)
+    except OSError:
+        return NEW
+
+    if not stat.S_ISREG(st.st_mode):
+        return OVERWRITE
+
+    if file.link:
+        same = os.path.samestat(st, os.stat(file.source))
+
+    elif file.data is None:
+        same = filecmp.cmp(file.source, target, shallow=False)
+
+    else:
+        same = st.st_size == len(file.data)
+        if same:
+            with open(target, 'rb') as existing:
+                same = existing.read() == file.data
+
+    return UNCHANGED if same else OVERWRITE
+
+
 class Preprocessor:
 
-    def __init__(self, problem: Problem) -> None:
-        self._env = jinja2.Environment(undefined=jinja2.StrictUndefined)
-        self._env.globals.update({
+    def __init__(self, problem: Problem, cache_dir: str = None) -> None:
+        """ Renders templates with the information of the given problem. If a
+        'cache_dir' is provided, the bytecode of compiled templates is stored
+        in it and reused by other processes. """
+
+        self._compiler = get_compiler(cache_dir)
+        self._context = {
             key: val
             for key, val in {
                 'problem': problem,
                 'now': datetime.now(),
-                'slug': slugify,
                 'system': platform.system(),
                 'user': self.__try(os.getlogin),
             }.items() if val is not None
-        })
-
-        # Slug is a global to allow the "slug(...)" syntax,
-        # and a filter to allow the "... | slug" syntax.
-        self._env.filters.update({'slug': slugify})
-
-        # Cptk considers None values as undefined.
-        # This means that scopes like {% if v is defined %} where v is None
-        # won't be executed.
-
-        def defined(v):
-            return not isinstance(v, jinja2.Undefined) and v is not None
-
-        def undefined(v):
-            return isinstance(v, jinja2.Undefined) or v is None
-
-        self._env.tests.update({'defined': defined, 'undefined': undefined})
+        }
 
     @staticmethod
     def __try(fun, default=None):
@@ -108,35 +336,225 @@ class Preprocessor:
 
     def parse_string(self, string: str) -> str:
         try:
-            return self._env.from_string(string).render()
+            return self._compiler.compile(string).render(self._context)
         except Exception as err:
             raise PreprocessStringError(err)
 
     def parse_file_contents(self, path: str) -> None:
-        with open(path, encoding='utf8') as file:
-            data = file.read()
+        """ Renders the contents of the file in the given path. Binary files
+        are not rendered, files without template markers are not passed to
+        the template engine, and the file is written only if its contents
+        changed. """
+
+        with open(path, 'rb') as file:
+            raw = file.read()
+
+        new = self._render_contents(path, raw, None)
+        if new is not None and new != raw:
+            with open(path, 'wb') as file:
+                file.write(new)
+
+    def _render_contents(
+        self,
+        path: str,
+        raw: bytes,
+        entry: ManifestEntry | None,
+    ) -> bytes | None:
+        """ Returns the rendered contents of the file in the given path, or
+        None if the file is binary (binary files are never rendered). """
+
+        data = decode(raw)
+        if data is None:
+            return None
+
+        markers = entry.markers if entry is not None else has_markers(data)
+        if not markers:
+            return encode(render_plain(data))
 
         try:
-            new = self.parse_string(data)
+            return encode(self.parse_string(data))
         except PreprocessStringError as err:
             raise PreprocessFileError.from_string_err(path, err)
 
-        with open(path, 'w', encoding='utf8') as file:
-            file.write(new)
-
-    def parse_directory(self, path: str) -> None:
-        for item in os.listdir(path):
+    def parse_directory(
+        self,
+        path: str,
+        static: list[str] = (),
+        jobs: int = None,
+    ) -> None:
+        """ Renders the names and the contents of all files in the directory,
+        recursively. The contents of files that match one of the 'static'
+        patterns (relative to the directory, before rendering) are not
+        rendered. Templates are cloned with 'plan_directory', which also
+        uses the manifest of the template to skip files that don't have to
+        be rendered without reading them.
+
+        Names are rendered first, and then the contents of the files are
+        rendered by a pool of 'jobs' workers (one per core by default).
+        Errors in names and contents of files don't stop the other files from
+        being rendered, and are raised together afterwards. """
+
+        files, errors = list(), list()
+        self._parse_names(path, '', static, files, errors)
+        errors += self._map_files(self.parse_file_contents, files, jobs)
+        self._raise_errors(errors)
+
+    def _parse_names(
+        self,
+        path: str,
+        rel: str,
+        static: list[str],
+        files: list[tuple[str]],
+        errors: list[PreprocessNameError],
+    ) -> None:
+        """ Renders the names of all entries in the directory, recursively,
+        and collects the files whose contents should be rendered. Entries
+        whose names fail to render are skipped, and their errors are
+        collected. """
+
+        for item in sorted(os.listdir(path)):
             old = os.path.join(path, item)
+            item_rel = os.path.join(rel, item)
 
-            try:
-                new = os.path.join(path, self.parse_string(item))
-            except PreprocessStringError as err:
-                raise PreprocessNameError.from_string_err(old, err)
+            new = old
+            if has_markers(item):
+                try:
+                    new = os.path.join(path, self.parse_string(item))
+                except PreprocessStringError as err:
+                    errors.append(PreprocessNameError.from_string_err(old, err))
+                    continue
 
-            os.rename(src=old, dst=new)
+                if new != old:
+                    os.rename(src=old, dst=new)
 
             if os.path.isdir(new):
-                self.parse_directory(new)
+                self._parse_names(new, item_rel, static, files, errors)
 
             elif os.path.isfile(new):
-                self.parse_file_contents(new)
+                if not any(path_matches(p, item_rel) for p in static):
+                    files.append((new,))
+
+    @staticmethod
+    def _map_files(
+        func: Callable[..., None],
+        files: list[tuple],
+        jobs: int = None,
+    ) -> list[PreprocessFileError]:
+        """ Calls the function with the arguments of each file, using a pool
+        of 'jobs' workers (one per core by default). Errors in the contents
+        of files are collected and returned after all files are handled. """
+
+        errors = list()
+        if jobs is None:
+            jobs = os.cpu_count() or 1
+
+        if jobs == 1 or len(files) < PARALLEL_THRESHOLD:
+            for args in files:
+                try:
+                    func(*args)
+                except PreprocessFileError as err:
+                    errors.append(err)
+
+        else:
+            from concurrent.futures import ThreadPoolExecutor
+            with ThreadPoolExecutor(max_workers=jobs) as pool:
+                futures = [pool.submit(func, *args) for args in files]
+
+            for future in futures:
+                err = future.exception()
+                if isinstance(err, PreprocessFileError):
+                    errors.append(err)
+                elif err is not None:
+                    raise err
+
+        return errors
+
+    @staticmethod
+    def _raise_errors(
+        errors: list[PreprocessFileError | PreprocessNameError],
+    ) -> None:
+        """ Raises a single error as is, and multiple errors together. """
+
+        if len(errors) == 1:
+            raise errors[0]
+        if errors:
+            raise PreprocessFilesError(errors)
+
+    def plan_directory(
+        self,
+        src: str,
+        dst: str,
+        static: list[str] = (),
+        jobs: int = None,
+    ) -> TemplatePlan:
+        """ Renders the template in the source directory into memory, and
+        returns a plan for writing it into the destination directory. The
+        names of all files are rendered, so files that already exist in the
+        destination are detected even if their name is a template. The
+        manifest of the template tells which names and contents have to be
+        rendered, so the other files are not read or passed to the template
+        engine. Files that match one of the 'static' patterns (relative to the
+        source, before rendering) are hard linked as is. The contents of files
+        are rendered by a pool of 'jobs' workers. Errors in names and contents
+        of files are raised together, before anything is written. """
+
+        manifest = get_manifest(src, self._compiler.cache_dir)
+        plan = TemplatePlan(src, dst)
+        targets = {'': ''}
+        errors = list()
+
+        def target(rel: str, markers: bool = None) -> str | None:
+            parent, name = os.path.split(rel)
+            if parent not in targets:
+                return None  # the name of the parent failed to render
+
+            if markers is None:
+                markers = has_markers(name)
+
+            if markers:
+                try:
+                    name = self.parse_string(name)
+                except PreprocessStringError as err:
+                    path = os.path.join(src, rel)
+                    errors.append(PreprocessNameError.from_string_err(path, err))
+                    return None
+
+            return os.path.join(targets[parent], name)
+
+        for rel in manifest.dirs:
+            path = target(rel)
+            if path is not None:
+                targets[rel] = path
+                plan.dirs.append(path)
+
+        files = list()
+        for rel in sorted(manifest.entries):
+            entry = manifest.get(rel)
+            path = target(rel, entry.name)
+            if path is None:
+                continue
+
+            file = PlannedFile(
+                path=path,
+                source=os.path.join(src, rel),
+                link=any(path_matches(p, rel) for p in static),
+            )
+            plan.files.append(file)
+            files.append((file, entry, dst))
+
+        errors += self._map_files(self._plan_file, files, jobs)
+        self._raise_errors(errors)
+        return plan
+
+    def _plan_file(
+        self,
+        file: PlannedFile,
+        entry: ManifestEntry,
+        dst: str,
+    ) -> None:
+        if not file.link and not entry.verbatim:
+            with open(file.source, 'rb') as source:
+                raw = source.read()
+            file.data = self._render_contents(file.source, raw, entry)
+
+        file.action = _planned_action(os.path.join(dst, file.path), file)
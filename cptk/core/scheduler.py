@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import time
+from datetime import datetime
+from datetime import timezone
+from typing import TYPE_CHECKING
+
+from cptk.core.system import System
+from cptk.utils import cptkException
+
+if TYPE_CHECKING:
+    from cptk.core.fetcher import Fetcher
+    from cptk.scrape import Contest
+
+
+class NoContestProblems(cptkException):
+    """ Raised when the problems of a contest aren't published, even after
+    polling the contest page for a long time. """
+
+    def __init__(self, url: str) -> None:
+        self.url = url
+        super().__init__(f"No problems were published in {url!r}")
+
+
+class ContestScheduler:
+    """ Waits for the start of a contest, and polls the contest page until its
+    problems are visible. All durations are in seconds. """
+
+    def __init__(
+        self,
+        fetcher: Fetcher,
+        warmup: float = 30,
+        poll: float = 0.5,
+        max_poll: float = 5,
+        give_up: float = 600,
+    ) -> None:
+        self.fetcher = fetcher
+        self.warmup = warmup
+        self.poll = poll
+        self.max_poll = max_poll
+        self.give_up = give_up
+
+    @staticmethod
+    def _seconds_until(moment: datetime) -> float:
+        """ Returns the amount of seconds until the given moment. Moments
+        without a timezone are in local time. """
+
+        if moment.tzinfo is None:
+            moment = moment.astimezone()
+        return (moment - datetime.now(timezone.utc)).total_seconds()
+
+    @classmethod
+    def _sleep_until(cls, moment: datetime, margin: float = 0) -> None:
+        # We sleep in short chunks rather than all at once, so that changes
+        # in the system clock (or a suspended laptop) don't throw us off.
+        remaining = cls._seconds_until(moment) - margin
+        while remaining > 0:
+            time.sleep(min(remaining, 60))
+            remaining = cls._seconds_until(moment) - margin
+
+    def wait(self, contest: Contest) -> None:
+        """ Blocks until the given contest starts. Shortly before the start,
+        warms up the connection to the contest website. """
+
+        if contest.start_time is None:
+            return
+
+        seconds = self._seconds_until(contest.start_time)
+        if seconds > 0:
+            System.log(
+                f'Waiting {seconds:.0f} seconds for {contest.name!r} to start',
+            )
+
+        self._sleep_until(contest.start_time, margin=self.warmup)
+        self.fetcher.transport.warm(contest.url)
+        self._sleep_until(contest.start_time)
+
+    def problems(self, url: str) -> list[str]:
+        """ Polls the given contest page with an increasing delay until at
+        least one problem is listed, and returns the URLs of the problems. """
+
+        delay = self.poll
+        deadline = time.monotonic() + self.give_up
+
+        while True:
+            page = self.fetcher.to_page(url)
+            urls = self.fetcher.contest_problems(page)
+            if urls:
+                return urls
+
+            if time.monotonic() + delay > deadline:
+                raise NoContestProblems(url)
+
+            System.details(f'No problems yet, retrying in {delay:.1f} seconds')
+            time.sleep(delay)
+            delay = min(delay * 1.5, self.max_poll)
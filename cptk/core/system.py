@@ -27,6 +27,7 @@ class System:
 
     _verbosity = 0
     _yes_stack = 0
+    _progress = False
 
     @classmethod
     def run(
@@ -135,6 +136,7 @@ class System:
                 for answer in option:
                     answers[answer] = value
 
+        cls._clear_progress()
         question = f'{question}? [{"/".join(titles)}]: '
         query = f"{cls.CMD}{question}{cls.RESET}"
         res = input(query).strip()
@@ -147,10 +149,37 @@ class System:
     def abort(cls, code: int = 1) -> None:
         raise SystemExit(code)
 
+    @classmethod
+    def _clear_progress(cls) -> None:
+        # The progress line is redrawn by the next progress update.
+        if cls._progress:
+            print(colorama.ansi.clear_line() + '\r', end='')  # noqa: T001
+            cls._progress = False
+
     @classmethod
     def echo(cls, msg: str) -> None:
+        cls._clear_progress()
         print(msg)  # noqa: T001
 
+    @classmethod
+    def progress(cls, done: int, total: int, seconds: float, msg: str) -> None:
+        """ Displays the progress of a long operation. If the output is a
+        terminal, the progress is displayed in a single line that is updated
+        in place. """
+
+        rate = done / seconds if seconds > 0 else 0
+        line = f'{cls.TITLE}[{done}/{total}]{cls.RESET} {rate:.2f}/s {msg}'
+
+        if done >= total or not sys.stdout.isatty():
+            cls.echo(line)
+            return
+
+        print(  # noqa: T001
+            colorama.ansi.clear_line() + '\r' + line,
+            end='', flush=True,
+        )
+        cls._progress = True
+
     @classmethod
     def title(cls, msg: str) -> None:
         cls.echo(cls.TITLE + msg)
@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import random
+import socket
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import TYPE_CHECKING
+from urllib.parse import urlparse
+
+from pydantic import BaseModel
+from pydantic import conint
+
+from cptk.utils import cptkException
+
+if TYPE_CHECKING:
+    from typing import Iterator
+    from requests import Response
+
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class FetchError(cptkException):
+    """ Raised when a page can't be fetched, even after retrying. """
+
+    def __init__(self, url: str, reason: str) -> None:
+        self.url = url
+        self.reason = reason
+        super().__init__(f"Failed to fetch {url!r}: {reason}")
+
+
+class TransportSettings(BaseModel):
+    """ Configures the HTTP transport that is shared by all scrapers. Rates are
+    in requests per second, and all durations are in seconds. """
+
+    pool_size: int = 10
+    host_concurrency: int = 4
+    rate: float = 2.0
+    burst: int = 4
+    retries: conint(ge=0) = 5
+    backoff: float = 0.5
+    max_backoff: float = 30.0
+    timeout: float = 15.0
+
+
+class TokenBucket:
+    """ A thread safe token bucket. Each 'acquire' call consumes a single token,
+    and blocks until one is available. """
+
+    def __init__(self, rate: float, capacity: int) -> None:
+        self.rate = rate
+        self.capacity = max(capacity, 1)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self._updated = now
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+
+    def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class Transport:
+    """ A pooled HTTP client that limits the amount of concurrent requests and
+    the request rate for each host, and retries failed requests with an
+    exponential backoff. """
+
+    def __init__(self, settings: TransportSettings = None) -> None:
+        # requests is imported here, and not globally, so that commands that
+        # don't access the network won't pay for importing it.
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.settings = settings if settings is not None else TransportSettings()
+
+        adapter = HTTPAdapter(
+            pool_connections=self.settings.pool_size,
+            pool_maxsize=self.settings.pool_size,
+            max_retries=0,  # retries are handled by the transport itself
+        )
+
+        self.session = requests.session()
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self._lock = threading.Lock()
+        self._slots: dict[str, threading.Semaphore] = dict()
+        self._buckets: dict[str, TokenBucket] = defaultdict(self._new_bucket)
+
+    def _new_bucket(self) -> TokenBucket:
+        return TokenBucket(self.settings.rate, self.settings.burst)
+
+    @contextmanager
+    def _host(self, host: str) -> Iterator[None]:
+        """ Waits for a free slot and a rate token of the given host. """
+
+        with self._lock:
+            if host not in self._slots:
+                self._slots[host] = threading.BoundedSemaphore(
+                    max(self.settings.host_concurrency, 1),
+                )
+            slot = self._slots[host]
+            bucket = self._buckets[host]
+
+        with slot:
+            bucket.acquire()
+            yield
+
+    def _delay(self, attempt: int, res: Response | None) -> float:
+        """ Returns the amount of seconds to wait before the next attempt,
+        using exponential backoff with full jitter. A 'Retry-After' header sent
+        by the server is respected, as long as it isn't too long. """
+
+        cap = min(self.settings.max_backoff, self.settings.backoff * 2 ** attempt)
+        delay = random.uniform(0, cap)
+
+        if res is not None:
+            try:
+                after = float(res.headers.get('Retry-After', 0))
+            except ValueError:
+                after = 0
+            delay = max(delay, min(after, self.settings.max_backoff))
+
+        return delay
+
+    def warm(self, url: str) -> None:
+        """ Resolves the host of the given URL and opens a pooled connection to
+        it ahead of time, so the following requests to the host won't pay for
+        the DNS lookup and the TLS handshake. Failures are silently ignored. """
+
+        import requests
+
+        parts = urlparse(url)
+        port = parts.port or (443 if parts.scheme == 'https' else 80)
+
+        try:
+            socket.getaddrinfo(parts.hostname, port)
+            with self._host(parts.netloc):
+                self.session.head(
+                    url,
+                    timeout=self.settings.timeout,
+                    allow_redirects=False,
+                )
+        except (OSError, requests.RequestException):
+            pass
+
+    def get(self, url: str, **kwargs) -> Response:
+        """ Makes a GET request to the given URL. Connection errors, timeouts
+        and server side errors are retried, and if all attempts fail, a
+        'FetchError' is raised. """
+
+        import requests
+
+        host = urlparse(url).netloc
+        kwargs.setdefault('timeout', self.settings.timeout)
+
+        for attempt in range(self.settings.retries + 1):
+            res = None
+
+            with self._host(host):
+                try:
+                    res = self.session.get(url, **kwargs)
+                except (requests.ConnectionError, requests.Timeout) as err:
+                    reason = type(err).__name__
+
+            if res is not None:
+                if res.status_code not in RETRY_STATUSES:
+                    return res
+                reason = f'status code {res.status_code}'
+
+            if attempt < self.settings.retries:
+                time.sleep(self._delay(attempt, res))
+
+        raise FetchError(url, reason)
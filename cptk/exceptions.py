@@ -6,13 +6,21 @@ from cptk.core.config import ConfigFileError
 from cptk.core.config import ConfigFileNotFound
 from cptk.core.config import ConfigFileParsingError
 from cptk.core.config import ConfigFileValueError
+from cptk.core.daemon import DaemonError
+from cptk.core.daemon import DaemonInsecure
+from cptk.core.daemon import DaemonRunning
+from cptk.core.daemon import DaemonUnsupported
 from cptk.core.fetcher import InvalidClone
 from cptk.core.fetcher import UnknownWebsite
 from cptk.core.preprocessor import PreprocessError
 from cptk.core.preprocessor import PreprocessFileError
+from cptk.core.preprocessor import PreprocessFilesError
 from cptk.core.preprocessor import PreprocessNameError
 from cptk.core.preprocessor import PreprocessStringError
+from cptk.core.scheduler import NoContestProblems
 from cptk.core.system import SystemRunError
+from cptk.core.transport import FetchError
+from cptk.local.packages import InvalidTestPackage
 from cptk.local.problem import NoRecipesFound
 from cptk.local.problem import RecipeNameNotFound
 from cptk.local.problem import RecipeNotFoundError
@@ -20,7 +28,9 @@ from cptk.local.project import InvalidMoveDest
 from cptk.local.project import InvalidMovePath
 from cptk.local.project import InvalidMoveSource
 from cptk.local.project import ProjectNotFound
+from cptk.local.store import StoreError
 from cptk.utils import cptkException
+from cptk.utils import InvalidURLFile
 
 __all__ = [
     # cptk.core.chef
@@ -33,6 +43,12 @@ __all__ = [
     'ConfigFileParsingError',
     'ConfigFileValueError',
 
+    # cptk.core.daemon
+    'DaemonError',
+    'DaemonInsecure',
+    'DaemonRunning',
+    'DaemonUnsupported',
+
     # cptk.core.integrator
     'InvalidClone',
     'UnknownWebsite',
@@ -40,12 +56,22 @@ __all__ = [
     # cptk.core.preprocessor
     'PreprocessError',
     'PreprocessFileError',
+    'PreprocessFilesError',
     'PreprocessNameError',
     'PreprocessStringError',
 
+    # cptk.core.scheduler
+    'NoContestProblems',
+
     # cptk.core.system
     'SystemRunError',
 
+    # cptk.core.transport
+    'FetchError',
+
+    # cptk.local.packages
+    'InvalidTestPackage',
+
     # cptk.local.problem
     'NoRecipesFound',
     'RecipeNameNotFound',
@@ -57,6 +83,10 @@ __all__ = [
     'InvalidMoveSource',
     'ProjectNotFound',
 
+    # cptk.local.store
+    'StoreError',
+
     # cptk.utils
     'cptkException',
+    'InvalidURLFile',
 ]
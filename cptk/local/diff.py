@@ -0,0 +1,121 @@
+""" Finds where the output of a solution first differs from the expected output.
+Both outputs are read as streams, a line (or a long line's segment) at a
+time, so outputs of any size are compared in bounded memory. """
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import TextIO
+
+# The maximal amount of characters that are read from an output at once. Longer
+# lines are compared in segments of this size.
+SEGMENT_SIZE = 1 << 16
+
+# The amount of characters that are shown around the first difference, and the
+# maximal length of the tokens that are shown.
+CONTEXT_SIZE = 30
+TOKEN_SIZE = 20
+
+
+def _shorten(text: str, size: int) -> str:
+    return text if len(text) <= size else text[:size] + '...'
+
+
+def _describe(segment: str, index: int) -> str:
+    """ Describes the character in the given index of the segment: the token
+    that contains it, a whitespace character or the end of the output. """
+
+    if index >= len(segment):
+        return 'the end of the output'
+    if segment[index] == '\n':
+        return 'the end of the line'
+    if segment[index].isspace():
+        return repr(segment[index])
+
+    start = index
+    while start > 0 and not segment[start - 1].isspace():
+        start -= 1
+    end = index
+    while end < len(segment) and not segment[end].isspace():
+        end += 1
+
+    return repr(_shorten(segment[start:end], TOKEN_SIZE))
+
+
+def _context(segment: str, index: int) -> str:
+    start = max(0, index - CONTEXT_SIZE)
+    text = segment[start:index + CONTEXT_SIZE].rstrip('\n')
+    prefix = '...' if start > 0 else ''
+    suffix = '...' if index + CONTEXT_SIZE < len(segment.rstrip('\n')) else ''
+    return prefix + text + suffix
+
+
+def _tokens(text: str, in_token: bool) -> tuple[int, bool]:
+    """ Returns the amount of tokens that start in the given text, and whether
+    it ends inside a token. 'in_token' tells whether the text continues a
+    token. """
+
+    count = 0
+    for char in text:
+        if char.isspace():
+            in_token = False
+        elif not in_token:
+            count += 1
+            in_token = True
+    return count, in_token
+
+
+@dataclass
+class Mismatch:
+    """ The first difference between an expected output and an actual output.
+    'line', 'column' and 'token' are 1-based positions in the expected
+    output. 'expected' and 'actual' describe what each output contains in
+    that position, and 'context' holds the text of both lines around it. """
+
+    line: int
+    column: int
+    token: int
+    expected: str
+    actual: str
+    context: tuple[str, str]
+
+    def __str__(self) -> str:
+        return (
+            f'line {self.line}, token {self.token}: '
+            f'expected {self.expected}, got {self.actual}'
+        )
+
+
+def find_mismatch(expected: TextIO, actual: TextIO) -> Mismatch | None:
+    """ Returns the first difference between the given outputs, or None if
+    they are equal. """
+
+    line, column, tokens, in_token = 1, 0, 0, False
+
+    while True:
+        exp = expected.readline(SEGMENT_SIZE)
+        act = actual.readline(SEGMENT_SIZE)
+
+        if exp != act:
+            index = 0
+            while index < min(len(exp), len(act)) and exp[index] == act[index]:
+                index += 1
+
+            count, _ = _tokens(exp[:index + 1], in_token)
+            return Mismatch(
+                line=line,
+                column=column + index + 1,
+                token=max(1, tokens + count),
+                expected=_describe(exp, index),
+                actual=_describe(act, index),
+                context=(_context(exp, index), _context(act, index)),
+            )
+
+        if not exp:
+            return None
+
+        if exp.endswith('\n'):
+            line, column, tokens, in_token = line + 1, 0, 0, False
+        else:
+            count, in_token = _tokens(exp, in_token)
+            column += len(exp)
+            tokens += count
@@ -0,0 +1,289 @@
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable
+from typing import Generator
+from typing import Iterable
+from typing import TYPE_CHECKING
+
+import cptk.constants
+
+if TYPE_CHECKING:
+    from cptk.scrape import Problem
+
+
+# Increment when the schema changes. Indices with an older schema are
+# recreated (empty), and can be filled again by rebuilding them.
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS problems (
+    location TEXT PRIMARY KEY,
+    recipes TEXT NOT NULL,
+    name TEXT,
+    url TEXT,
+    website TEXT,
+    contest TEXT,
+    time_limit REAL,
+    memory_limit REAL,
+    status TEXT,
+    passed INTEGER,
+    failed INTEGER,
+    tested_at REAL
+);
+CREATE INDEX IF NOT EXISTS problems_website ON problems (website);
+CREATE INDEX IF NOT EXISTS problems_contest ON problems (contest);
+CREATE INDEX IF NOT EXISTS problems_status ON problems (status);
+"""
+
+PASSED = 'passed'
+FAILED = 'failed'
+
+COLUMNS = (
+    'location', 'recipes', 'name', 'url', 'website', 'contest',
+    'time_limit', 'memory_limit', 'status', 'passed', 'failed', 'tested_at',
+)
+
+
+@dataclass
+class IndexedProblem:
+    """ A problem, as it is recorded in the project index. The location is
+    an absolute path. Problems that were cloned without scraped information
+    have only a location and recipes. """
+
+    location: str
+    recipes: list[str | None]
+    name: str | None = None
+    url: str | None = None
+    website: str | None = None
+    contest: str | None = None
+    time_limit: float | None = None
+    memory_limit: float | None = None
+    status: str | None = None
+    passed: int | None = None
+    failed: int | None = None
+    tested_at: float | None = None
+
+
+def _escape_like(text: str) -> str:
+    return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+class ProblemIndex:
+    """ A SQLite database that records the problems of a project, so they can
+    be listed and searched without walking the project tree. Locations are
+    stored relative to the project root, so the project itself can be moved
+    freely. """
+
+    def __init__(self, root: str) -> None:
+        self.root = root
+        self.path = os.path.join(root, cptk.constants.INDEX_FILE)
+
+    def _relative(self, location: str) -> str:
+        rel = os.path.relpath(os.path.abspath(location), self.root)
+        return rel.replace(os.sep, '/')
+
+    def _absolute(self, location: str) -> str:
+        return os.path.normpath(os.path.join(self.root, location))
+
+    @contextmanager
+    def _connect(self) -> Generator[sqlite3.Connection, None, None]:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            version, = conn.execute('PRAGMA user_version').fetchone()
+            if version != SCHEMA_VERSION:
+                conn.execute('DROP TABLE IF EXISTS problems')
+                conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+            conn.executescript(SCHEMA)
+
+            with conn:  # commits, or rolls back on errors
+                yield conn
+        finally:
+            conn.close()
+
+    def _row(
+        self,
+        location: str,
+        recipes: list[str | None],
+        problem: Problem | None,
+    ) -> dict:
+        contest = problem.contest if problem is not None else None
+        return {
+            'location': self._relative(location),
+            'recipes': json.dumps(recipes),
+            'name': problem.name if problem else None,
+            'url': problem.url if problem else None,
+            'website': problem.website.name if problem else None,
+            'contest': contest.name if contest else None,
+            'time_limit': problem.time_limit if problem else None,
+            'memory_limit': problem.memory_limit if problem else None,
+        }
+
+    @staticmethod
+    def _insert(conn: sqlite3.Connection, row: dict) -> None:
+        keys = ', '.join(row)
+        values = ', '.join(f':{key}' for key in row)
+        conn.execute(
+            f'INSERT OR REPLACE INTO problems ({keys}) VALUES ({values})',
+            row,
+        )
+
+    def add(
+        self,
+        location: str,
+        recipes: list[str | None],
+        problem: Problem = None,
+    ) -> None:
+        """ Records the problem in the given location, or updates its record if
+        it is already indexed. The test status of the problem is reset. """
+
+        with self._connect() as conn:
+            self._insert(conn, self._row(location, recipes, problem))
+
+    def rebuild(
+        self,
+        problems: Iterable[tuple[str, list[str | None], Problem | None]],
+    ) -> None:
+        """ Replaces the whole index with the given (location, recipes,
+        problem) records. Test statuses of problems that are still indexed are
+        kept. """
+
+        status_columns = ('status', 'passed', 'failed', 'tested_at')
+
+        with self._connect() as conn:
+            statuses = {
+                row[0]: row[1:] for row in conn.execute(
+                    f"SELECT location, {', '.join(status_columns)} "
+                    'FROM problems',
+                )
+            }
+
+            conn.execute('DELETE FROM problems')
+            for location, recipes, problem in problems:
+                row = self._row(location, recipes, problem)
+                status = statuses.get(row['location'])
+                if status is not None:
+                    row.update(zip(status_columns, status))
+                self._insert(conn, row)
+
+    def remove(self, location: str) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                'DELETE FROM problems WHERE location = ?',
+                (self._relative(location),),
+            )
+
+    def move(
+        self,
+        src: str,
+        dst: str,
+        apply: Callable[[], object] = None,
+    ) -> None:
+        """ Updates the locations of all problems inside the source directory
+        (including the source itself) to be inside the destination. Records in
+        the destination, which are left from problems that no longer exist,
+        are replaced. If given, 'apply' is called to move the files on disk
+        before the update is committed, and the update is rolled back if it
+        fails. """
+
+        src, dst = self._relative(src), self._relative(dst)
+
+        with self._connect() as conn:
+            if src != '.':  # the project root can't be moved
+                conn.execute(
+                    'DELETE FROM problems '
+                    "WHERE location = ? OR location LIKE ? ESCAPE '\\'",
+                    (dst, _escape_like(dst) + '/%'),
+                )
+                conn.execute(
+                    'UPDATE problems SET location = ? || substr(location, ?) '
+                    "WHERE location = ? OR location LIKE ? ESCAPE '\\'",
+                    (dst, len(src) + 1, src, _escape_like(src) + '/%'),
+                )
+
+            if apply is not None:
+                apply()
+
+    def record_test(
+        self,
+        location: str,
+        recipes: list[str | None],
+        passed: int,
+        failed: int,
+    ) -> None:
+        """ Records the result of the last test run of the problem. Problems
+        that aren't indexed yet are added to the index. """
+
+        location = self._relative(location)
+        status = (FAILED if failed else PASSED, passed, failed, time.time())
+
+        # An upsert ('ON CONFLICT DO UPDATE') requires SQLite 3.24, which isn't
+        # bundled with every supported Python version.
+        with self._connect() as conn:
+            updated = conn.execute(
+                'UPDATE problems SET status = ?, passed = ?, failed = ?, '
+                'tested_at = ? WHERE location = ?',
+                (*status, location),
+            ).rowcount
+
+            if not updated:
+                conn.execute(
+                    'INSERT INTO problems (location, recipes, status, passed, '
+                    'failed, tested_at) VALUES (?, ?, ?, ?, ?, ?)',
+                    (location, json.dumps(recipes), *status),
+                )
+
+    def query(
+        self,
+        text: str = None,
+        website: str = None,
+        contest: str = None,
+        status: str = None,
+    ) -> list[IndexedProblem]:
+        """ Returns the indexed problems that match all of the given filters,
+        sorted by their location. 'text' is searched (case insensitively) in
+        the location, name, URL and contest of the problems. The other filters
+        must match exactly (case insensitively). """
+
+        conditions, params = list(), list()
+
+        if text:
+            pattern = '%' + _escape_like(text) + '%'
+            conditions.append(
+                '(' + ' OR '.join(
+                    f"{column} LIKE ? ESCAPE '\\'"
+                    for column in ('location', 'name', 'url', 'contest')
+                ) + ')',
+            )
+            params += [pattern] * 4
+
+        for column, value in (
+            ('website', website),
+            ('contest', contest),
+            ('status', status),
+        ):
+            if value is not None:
+                conditions.append(f'{column} = ? COLLATE NOCASE')
+                params.append(value)
+
+        where = ' WHERE ' + ' AND '.join(conditions) if conditions else ''
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM problems{where} "
+                'ORDER BY location',
+                params,
+            ).fetchall()
+
+        problems = list()
+        for row in rows:
+            data = dict(zip(COLUMNS, row))
+            data['location'] = self._absolute(data['location'])
+            data['recipes'] = json.loads(data['recipes'])
+            problems.append(IndexedProblem(**data))
+        return problems
@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import os
+
+Parts = tuple
+
+
+def _split(path: str) -> Parts:
+    return tuple(os.path.normpath(os.path.abspath(path)).split(os.sep))
+
+
+def _join(parts: Parts) -> str:
+    return os.sep.join(parts) or os.sep
+
+
+class _Node:
+    __slots__ = ('children', 'target')
+
+    def __init__(self) -> None:
+        self.children: dict[str, _Node] = dict()
+        self.target: Parts | None = None
+
+
+class MoveTable:
+    """ The composition of a sequence of directory moves, as a mapping from
+    source directories to destination directories. A path is rewritten by the
+    deepest source directory that contains it. The sources are stored in a
+    trie of path components, so rewriting a path takes time that is linear in
+    its depth, regardless of the amount of moves. The targets are indexed
+    (by themselves and by all of their prefixes), so composing a move only
+    visits the rules that it affects. """
+
+    def __init__(self, moves: list[tuple[str, str]] = None) -> None:
+        self._rules: dict[Parts, Parts] = dict()
+        self._by_prefix: dict[Parts, set[Parts]] = dict()
+        self._by_target: dict[Parts, set[Parts]] = dict()
+        self._root: _Node | None = None
+
+        for src, dst in moves or list():
+            self.add(src, dst)
+
+    def __len__(self) -> int:
+        return len(self._rules)
+
+    @property
+    def rules(self) -> dict[Parts, Parts]:
+        return self._rules
+
+    @classmethod
+    def from_rules(cls, rules: dict[Parts, Parts]) -> MoveTable:
+        """ Creates a table from the rules of another table (see 'rules'),
+        without composing the moves again. """
+
+        table = cls()
+        for source, target in rules.items():
+            table._set(source, target)
+        return table
+
+    def _set(self, source: Parts, target: Parts) -> None:
+        old = self._rules.get(source)
+        if old is not None:
+            for depth in range(len(old) + 1):
+                self._by_prefix[old[:depth]].discard(source)
+            self._by_target[old].discard(source)
+
+        self._rules[source] = target
+        self._by_target.setdefault(target, set()).add(source)
+        for depth in range(len(target) + 1):
+            self._by_prefix.setdefault(target[:depth], set()).add(source)
+        self._root = None
+
+    def _trie(self) -> _Node:
+        if self._root is None:
+            self._root = _Node()
+            for src, dst in self._rules.items():
+                node = self._root
+                for part in src:
+                    node = node.children.setdefault(part, _Node())
+                node.target = dst
+        return self._root
+
+    def _has_rule_between(self, parent: Parts, path: Parts) -> bool:
+        """ Returns True if there is a rule whose source is strictly inside
+        the given parent, and contains the given path (or is the path). """
+        return any(
+            path[:depth] in self._rules
+            for depth in range(len(parent) + 1, len(path) + 1)
+        )
+
+    def add(self, src: str, dst: str) -> None:
+        """ Composes the table with another move of the source directory to
+        the destination, that happens after all moves that are already in the
+        table. """
+
+        src, dst = _split(src), _split(dst)
+        updates = list()
+
+        # Paths that are moved into the moved directory are moved again.
+        for source in self._by_prefix.get(src, ()):
+            target = self._rules[source]
+            updates.append((source, dst + target[len(src):]))
+
+        # Paths that are moved into a parent of the moved directory, and end
+        # up inside it, are moved again. Paths that are captured by a deeper
+        # rule are handled by that rule.
+        for depth in range(len(src)):
+            for source in self._by_target.get(src[:depth], ()):
+                moved = source + src[depth:]
+                if not self._has_rule_between(source, moved):
+                    updates.append((moved, dst))
+
+        # Paths that weren't moved before, and are inside the moved directory.
+        if not self._has_rule_between((), src):
+            updates.append((src, dst))
+
+        for source, target in updates:
+            self._set(source, target)
+
+    def apply(self, path: str) -> str:
+        """ Returns the path after all moves in the table. Paths that are not
+        affected by the moves are returned as is. """
+
+        parts = _split(path)
+        node = self._trie()
+        target, depth = None, 0
+        for index, part in enumerate(parts):
+            node = node.children.get(part)
+            if node is None:
+                break
+            if node.target is not None:
+                target, depth = node.target, index + 1
+
+        if target is None:
+            return path
+        return _join(target + parts[depth:])
@@ -0,0 +1,155 @@
+""" Imports tests from test packages: zip archives that are produced by problem
+preparation systems, like Polygon (where an input file 'tests/01' is answered
+by 'tests/01.a') and Kattis (where 'data/secret/1.in' is answered by
+'data/secret/1.ans'). Entries are streamed out of the archive one by one, so
+packages of any size are imported in bounded memory. """
+from __future__ import annotations
+
+import os
+import posixpath
+import shutil
+import zipfile
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+import cptk.constants
+from cptk.local.store import CHUNK_SIZE
+from cptk.local.store import write_archive_ref
+from cptk.local.store import write_ref
+from cptk.utils import cptkException
+
+if TYPE_CHECKING:
+    from cptk.local.store import BlobStore
+
+INPUT_SUFFIXES = ('.in',)
+OUTPUT_SUFFIXES = ('.out', '.ans')
+
+# Polygon packages store the answer of the input 'tests/01' in 'tests/01.a'.
+POLYGON_ANSWER_SUFFIX = '.a'
+
+
+class InvalidTestPackage(cptkException):
+    def __init__(self, path: str, msg: str) -> None:
+        self.path = path
+        super().__init__(f'Invalid test package {path!r}: {msg}')
+
+
+@dataclass
+class PackagedTest:
+    """ A test in a test package. 'input' and 'output' are names of entries
+    in the archive. """
+
+    name: str
+    input: str
+    output: str
+
+
+def _ignored(name: str) -> bool:
+    return any(
+        part.startswith('.') or part == '__MACOSX'
+        for part in name.split('/')
+    )
+
+
+def find_tests(names: list[str]) -> list[PackagedTest]:
+    """ Pairs the inputs and expected outputs in the given archive entry names,
+    and returns the tests sorted by their names. Tests are named by the path
+    of their input, relative to the deepest directory that contains all of
+    the tests. Inputs without an expected output are ignored. """
+
+    files = {name for name in names if not name.endswith('/')}
+    inputs, outputs = dict(), dict()
+
+    for name in sorted(files):
+        if _ignored(name):
+            continue
+
+        stem, suffix = posixpath.splitext(name)
+        if suffix in INPUT_SUFFIXES:
+            inputs[stem] = name
+        elif suffix in OUTPUT_SUFFIXES:
+            outputs[stem] = name
+        elif suffix == POLYGON_ANSWER_SUFFIX and stem in files:
+            inputs[stem] = stem
+            outputs[stem] = name
+
+    stems = sorted(inputs.keys() & outputs.keys())
+    if not stems:
+        return list()
+
+    common = posixpath.commonpath([posixpath.dirname(s) or '.' for s in stems])
+    common = '' if common == '.' else common
+
+    return [
+        PackagedTest(
+            name=posixpath.relpath(stem, common or '.').replace('/', '-'),
+            input=inputs[stem],
+            output=outputs[stem],
+        )
+        for stem in stems
+    ]
+
+
+def _import_entry(
+    archive: zipfile.ZipFile,
+    entry: str,
+    path: str,
+    store: BlobStore | None,
+) -> None:
+    with archive.open(entry) as src:
+        if store is not None:
+            write_ref(path + cptk.constants.REF_FILE_SUFFIX, store.put(src))
+        else:
+            with open(path, 'wb') as dst:
+                shutil.copyfileobj(src, dst, CHUNK_SIZE)
+
+
+def _remove_test_file(path: str) -> None:
+    """ Removes a test file, whether it is a plain file or a ref, so it isn't
+    shadowed by the old version. """
+
+    for old in (path, path + cptk.constants.REF_FILE_SUFFIX):
+        try:
+            os.unlink(old)
+        except FileNotFoundError:
+            pass
+
+
+def import_tests(
+    path: str,
+    folder: str,
+    store: BlobStore = None,
+    link: bool = False,
+) -> list[PackagedTest]:
+    """ Imports the tests in the test package in the given path into the
+    given folder, using the '.in' and '.out' suffixes. If a store is given,
+    the tests are stored in it and the folder contains references to them.
+    If 'link' is True, the tests are not copied at all: the folder contains
+    references to the entries in the archive, and the tests are read
+    straight from it. Returns the imported tests. """
+
+    try:
+        archive = zipfile.ZipFile(path)
+    except (OSError, zipfile.BadZipFile) as err:
+        raise InvalidTestPackage(path, str(err))
+
+    with archive:
+        tests = find_tests(archive.namelist())
+        if not tests:
+            raise InvalidTestPackage(path, 'no tests found')
+
+        os.makedirs(folder, exist_ok=True)
+        for test in tests:
+            for entry, suffix in (
+                (test.input, cptk.constants.INPUT_FILE_SUFFIX),
+                (test.output, cptk.constants.OUTPUT_FILE_SUFFIX),
+            ):
+                dst = os.path.join(folder, test.name + suffix)
+                _remove_test_file(dst)
+                if link:
+                    ref = dst + cptk.constants.REF_FILE_SUFFIX
+                    write_archive_ref(ref, path, entry)
+                else:
+                    _import_entry(archive, entry, dst, store)
+
+    return tests
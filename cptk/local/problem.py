@@ -18,9 +18,12 @@ from cptk.core.config import ConfigFileError
 from cptk.core.config import ConfigFileNotFound
 from cptk.core.config import Configuration
 from cptk.core.system import System
+from cptk.local.testcases import INPUT_PATTERNS
+from cptk.local.testcases import OUTPUT_PATTERNS
 
 if TYPE_CHECKING:
     from cptk.core.preprocessor import Preprocessor
+    from cptk.local.store import BlobStore
 
 T = TypeVar('T')
 
@@ -48,9 +51,78 @@ class NoRecipesFound(RecipeNotFoundError):
         )
 
 
+class TestGroup(pydantic.BaseModel):
+    """ A group of tests (a subtask) that is worth the given amount of points
+    if all of its tests pass. 'tests' are glob patterns of the names of the
+    tests in the group, and default to the tests in the directory that is
+    named after the group. A group is tested only if all the groups it
+    depends on pass, and once one of its tests fails, the rest are
+    skipped. """
+
+    name: str
+    points: float = 0
+    tests: Optional[List[str]] = None
+    depends: List[str] = []
+
+    @pydantic.validator('tests', 'depends', pre=True)
+    @classmethod
+    def string_to_list(cls, val) -> List[str]:
+        if isinstance(val, str):
+            return [val]
+        return val
+
+    @pydantic.validator('tests', always=True)
+    @classmethod
+    def default_tests(cls, val: List[str] | None, values: dict) -> List[str]:
+        if val is None and 'name' in values:
+            return [values['name'] + '/*']
+        return val
+
+
 class TestRecipe(pydantic.BaseModel):
+    """ Configures the tests of a problem. 'inputs' and 'outputs' are glob
+    patterns of the input files and the expected output files, relative to
+    the test folder. Patterns that contain directories or '**' (like
+    '**/*.in') discover tests in nested directories, which are named by
+    their paths (like 'group1/1'). Scraped tests are always stored using
+    the '.in' and '.out' suffixes. 'groups' split the tests into subtasks
+    (see 'TestGroup'). """
+
     folder: str
     timeout: Union[float, str, None] = None
+    inputs: List[str] = list(INPUT_PATTERNS)
+    outputs: List[str] = list(OUTPUT_PATTERNS)
+    groups: List[TestGroup] = []
+
+    @pydantic.validator('inputs', 'outputs', pre=True)
+    @classmethod
+    def string_to_patterns(cls, val) -> List[str]:
+        if isinstance(val, str):
+            return [val]
+        return val
+
+    @pydantic.validator('inputs', 'outputs')
+    @classmethod
+    def not_empty(cls, val: List[str]) -> List[str]:
+        if not val:
+            raise ValueError('at least one pattern is required')
+        return val
+
+    @pydantic.validator('groups')
+    @classmethod
+    def valid_dependencies(cls, val: List[TestGroup]) -> List[TestGroup]:
+        names = set()
+        for group in val:
+            if group.name in names:
+                raise ValueError(f'group {group.name!r} is defined twice')
+            for dependency in group.depends:
+                if dependency not in names:
+                    raise ValueError(
+                        f'group {group.name!r} depends on {dependency!r}, '
+                        'which must be defined before it',
+                    )
+            names.add(group.name)
+        return val
 
     def preprocess(self: T, processor: Preprocessor) -> type[T]:
         def parse_str(v):
@@ -64,6 +136,14 @@ class TestRecipe(pydantic.BaseModel):
             'timeout': parse_str(self.timeout),
         }
 
+        # Patterns are dumped into the recipes of cloned problems only if
+        # they are configured, to keep the recipes short.
+        for key in ('inputs', 'outputs'):
+            if key in self.__fields_set__:
+                kwargs[key] = [parse_str(v) for v in getattr(self, key)]
+        if 'groups' in self.__fields_set__:
+            kwargs['groups'] = [group.copy() for group in self.groups]
+
         return type(self)(**kwargs)
 
 
@@ -108,18 +188,42 @@ class LocalProblem:
     name: str | None = field(compare=True, default=None)
 
     @staticmethod
-    def _store_test(folder: str, name: str, test: cptk.scrape.Test) -> None:
+    def _store_test_file(path: str, data: str, store: BlobStore = None) -> None:
+        if store is None:
+            with open(path, 'w', encoding='utf8') as file:
+                file.write(data)
+            return
+
+        from cptk.local.store import write_ref
+        digest = store.put_bytes(data.encode('utf8'))
+        write_ref(path + cptk.constants.REF_FILE_SUFFIX, digest)
+
+    @classmethod
+    def _store_test(
+        cls,
+        folder: str,
+        name: str,
+        test: cptk.scrape.Test,
+        store: BlobStore = None,
+    ) -> None:
 
         inp = os.path.join(folder, name + cptk.constants.INPUT_FILE_SUFFIX)
-        with open(inp, 'w', encoding='utf8') as file:
-            file.write(test.input)
+        cls._store_test_file(inp, test.input, store)
 
         out = os.path.join(folder, name + cptk.constants.OUTPUT_FILE_SUFFIX)
         if test.expected is not None:
-            with open(out, 'w', encoding='utf8') as file:
-                file.write(test.expected)
+            cls._store_test_file(out, test.expected, store)
+
+    def store_tests(
+        self,
+        folder: str,
+        tests: list[cptk.scrape.Test],
+        store: BlobStore = None,
+    ) -> None:
+        """ Stores the tests in the given folder (relative to the problem). If a
+        test store is provided, the tests are stored in it, and the folder
+        contains references to them. """
 
-    def store_tests(self, folder: str, tests: list[cptk.scrape.Test]) -> None:
         if not tests:
             return
         gen = cptk.constants.TEST_NAME_GENERATOR()
@@ -127,7 +231,39 @@ class LocalProblem:
         os.makedirs(folder, exist_ok=True)
         for test in tests:
             name = next(gen)
-            self._store_test(folder, name, test)
+            self._store_test(folder, name, test, store)
+
+    def store_metadata(self, problem: cptk.scrape.Problem) -> None:
+        """ Stores the scraped problem (including its contest and limits) next
+        to the local problem, so it can be used without scraping the problem
+        again. The tests are stored in the test folder, and aren't stored in
+        the metadata again. """
+
+        from dataclasses import replace
+        from cptk.scrape.serialize import dumps
+
+        path = os.path.join(self.location, cptk.constants.METADATA_FILE)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf8') as file:
+            file.write(dumps(replace(problem, tests=[])))
+
+    @property
+    def metadata(self) -> cptk.scrape.Problem | None:
+        """ The scraped problem that was stored when the problem was cloned.
+        If the problem wasn't cloned, or was cloned by an older version of
+        cptk, returns None. """
+
+        from cptk.scrape.serialize import loads
+
+        path = os.path.join(self.location, cptk.constants.METADATA_FILE)
+        try:
+            with open(path, encoding='utf8') as file:
+                return loads(file.read())
+        except FileNotFoundError:
+            return None
+        except (ValueError, KeyError, TypeError, ImportError, AttributeError):
+            System.warn(f'Ignoring invalid problem metadata file {path!r}')
+            return None
 
     @classmethod
     def init(cls: type[T], location: str, recipe: Recipe) -> T:
@@ -1,33 +1,57 @@
 from __future__ import annotations
 
+import json
 import os
 import shutil
+import time
 from dataclasses import dataclass
 from dataclasses import field
-from glob import iglob
+from typing import List
 from typing import TYPE_CHECKING
 
 from pydantic import BaseModel
 
 import cptk.constants
 import cptk.utils
+from cptk.core.config import ConfigFileError
 from cptk.core.config import ConfigFileParsingError
 from cptk.core.config import Configuration
-from cptk.core.fetcher import Fetcher
-from cptk.core.preprocessor import Preprocessor
 from cptk.core.system import System
 from cptk.core.templates import DEFAULT_TEMPLATES
+from cptk.core.transport import TransportSettings
+from cptk.local.moves import MoveTable
 from cptk.local.problem import LocalProblem
 from cptk.local.problem import Recipe
+from cptk.local.problem import RecipesConfig
+from cptk.local.store import BlobStore
+from cptk.local.store import StoreSettings
 
 
 if TYPE_CHECKING:
+    from typing import Iterator
     from typing import TypeVar
     from cptk.scrape import Problem
+    from cptk.core.fetcher import Fetcher
+    from cptk.local.index import ProblemIndex
+    from cptk.core.preprocessor import Preprocessor
+    from cptk.core.preprocessor import TemplatePlan
     from cptk.core.templates import Template
     T = TypeVar('T')
 
 
+# Compiled move tables, by the path of the moves file. Each entry holds the
+# stat stamp of the file when it was compiled, and the table.
+_move_tables: dict[str, tuple[tuple | None, MoveTable]] = dict()
+
+
+def _file_stamp(path: str) -> tuple[int, int, int] | None:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
 class ProjectNotFound(cptk.utils.cptkException):
     def __init__(self) -> None:
         super().__init__("Couldn't find a cptk project recursively")
@@ -58,6 +82,10 @@ class CloneSettings(BaseModel):
     path: str
     recipe: Recipe
 
+    # Template files (patterns, relative to the template) that are hard linked
+    # into cloned problems instead of copied, and are not preprocessed.
+    static: List[str] = []
+
     def dict(self, **kwargs) -> dict:
         kwargs.update({"exclude_unset": False})
         return super().dict(**kwargs)
@@ -65,6 +93,8 @@ class CloneSettings(BaseModel):
 
 class ProjectConfig(Configuration):
     clone: CloneSettings
+    fetch: TransportSettings = TransportSettings()
+    store: StoreSettings = StoreSettings()
 
 
 @dataclass(unsafe_hash=True)
@@ -76,7 +106,21 @@ class LocalProject:
 
     @cptk.utils.cached_property
     def fetcher(self) -> Fetcher:
-        return Fetcher()
+        # Imported here to avoid importing the scraping machinery in commands
+        # that don't access the network.
+        from cptk.core.archive import transport_from_env
+        from cptk.core.fetcher import Fetcher
+        return Fetcher(transport_from_env(self.config.fetch))
+
+    @cptk.utils.cached_property
+    def index(self) -> ProblemIndex:
+        from cptk.local.index import ProblemIndex
+        return ProblemIndex(self.location)
+
+    @property
+    def store(self) -> BlobStore:
+        """ The test store of the project. """
+        return BlobStore(self.location, self.config.store.compression)
 
     @classmethod
     def is_project(cls, location: str) -> bool:
@@ -87,18 +131,56 @@ class LocalProject:
 
     @classmethod
     def find(cls: type[T], location: str) -> T:
-        """ Recursively searches if the given location is part of a cptk
-        project, and if so, returns an instance of the project. If a project
-        isn't found, an error is thrown. """
+        """ Searches if the given location is part of a cptk project, and if
+        so, returns an instance of the project. If a project isn't found, an
+        error is thrown.
+        The 'CPTK_PROJECT' environment variable can be set to the root of a
+        project, to skip the search for locations inside that project. Found
+        projects are cached, and the search doesn't cross filesystem
+        boundaries. """
+
+        from cptk.local.roots import roots
+
+        location = os.path.abspath(location)
 
-        if cls.is_project(location):
-            return cls(location)
+        root = os.environ.get(cptk.constants.PROJECT_ENV)
+        if root:
+            root = os.path.abspath(root)
+            if cls._is_subpath(root, location) and cls.is_project(root):
+                return cls(root)
 
-        parent = os.path.dirname(location)
-        if parent == location:
-            raise ProjectNotFound()
+        root = roots.get(location)
+        if root is None:
+            root = cls._search(location)
+            roots.remember(location, root)
 
-        return cls.find(parent)
+        return cls(root)
+
+    @classmethod
+    def _search(cls, location: str) -> str:
+        """ Returns the closest ancestor of the given absolute location (or the
+        location itself) that is a project root. Stops at the root of the
+        filesystem that contains the location. """
+
+        device = None
+        while True:
+            try:
+                current = os.stat(location).st_dev
+            except OSError:
+                current = None  # doesn't exist (yet), check its parent
+
+            if current is not None:
+                if device is not None and current != device:
+                    raise ProjectNotFound()
+                device = current
+
+                if cls.is_project(location):
+                    return location
+
+            parent = os.path.dirname(location)
+            if parent == location:
+                raise ProjectNotFound()
+            location = parent
 
     @classmethod
     def init(cls: type[T], location: str, template: str) -> T:
@@ -111,7 +193,8 @@ class LocalProject:
             raise InvalidTemplate(f'Invalid template name {template!r}')
 
         template: Template = avaliable_templates.get(template)
-        commons = cptk.utils.find_common_files(location, template.path)
+        plan = cptk.utils.plan_tree_copy(template.path, location)
+        commons = plan.commons
 
         if commons:
             System.warn(
@@ -125,7 +208,13 @@ class LocalProject:
             if not ans:
                 System.abort()
 
-        cptk.utils.soft_tree_copy(src=template.path, dst=location)
+        plan.apply()
+
+        # Directories inside the new project could be cached as part of an
+        # enclosing project.
+        from cptk.local.roots import roots
+        roots.forget(os.path.abspath(location))
+
         return cls(location)
 
     @cptk.utils.cached_property
@@ -168,29 +257,71 @@ class LocalProject:
         sub = os.path.abspath(sub)
         return os.path.commonpath([parent, sub]) == parent
 
-    def _single_move(self, path: str, src: str, dst: str) -> str:
-        """ If the given path shares a prefix with the move source, updates
-        the path with by replacing the prefix with the destination prefix
-        accordingly. If a prefix isn't shared, returns the original path
-        without modifications. """
+    def _move_table(self) -> MoveTable:
+        """ Returns the composition of all registered moves. The table is
+        cached in memory, and is compiled again only if the moves file is
+        modified by another process. """
+
+        path = self.relative(cptk.constants.MOVE_FILE)
+        stamp = _file_stamp(path)
+
+        cached = _move_tables.get(path)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+
+        table = self._load_move_table(stamp)
+        if table is None:
+            table = MoveTable([
+                (self.relative(src), self.relative(dst))
+                for src, dst in self._load_moves()
+            ])
+            self._save_move_table(stamp, table)
+
+        _move_tables[path] = (stamp, table)
+        return table
+
+    def _load_move_table(self, stamp: tuple | None) -> MoveTable | None:
+        """ Returns the table that was compiled by another process, if the
+        moves file wasn't modified since. """
 
-        if not self._is_subpath(src, path):
-            return path
-        rel = os.path.relpath(path, src)
-        return os.path.normpath(os.path.join(dst, rel))
+        # The cache is stored in JSON (and not pickled) since the project
+        # folder can be shared, and loading it must never run code.
+        path = self.relative(cptk.constants.MOVES_CACHE_FILE)
+        try:
+            with open(path, encoding='utf8') as file:
+                data = json.load(file)
+            if data['key'] != self._move_table_key(stamp):
+                return None
+            return MoveTable.from_rules({
+                tuple(source): tuple(target)
+                for source, target in data['rules']
+            })
+        except (OSError, ValueError, KeyError, TypeError):
+            # The cache is just an optimization. It can be missing, corrupted,
+            # or written by an incompatible version of cptk.
+            return None
+
+    def _move_table_key(self, stamp: tuple | None) -> list:
+        return [cptk.__version__, str(self.location), list(stamp or ())]
+
+    def _save_move_table(self, stamp: tuple | None, table: MoveTable) -> None:
+        data = {
+            'key': self._move_table_key(stamp),
+            'rules': [list(rule) for rule in table.rules.items()],
+        }
+        try:
+            cptk.utils.atomic_write(
+                self.relative(cptk.constants.MOVES_CACHE_FILE),
+                json.dumps(data),
+            )
+        except OSError:
+            pass
 
     def move_relative(self, path: str) -> str:
         """ Applies all registered move transformations to the given path, and
         returns the new path, as an abs path. """
 
-        path = self.relative(path)
-        for src, dst in self._load_moves():
-            path = self._single_move(
-                path,
-                self.relative(src),
-                self.relative(dst),
-            )
-        return path
+        return self._move_table().apply(self.relative(path))
 
     def relative(self, path: str) -> str:
         """ If the given path is not absolute, returns the absolute path relative
@@ -208,22 +339,111 @@ class LocalProject:
         problem = self.fetcher.page_to_problem(page)
         return self.clone_problem(problem)
 
+    def _fetch_problem(self, url: str) -> Problem:
+        page = self.fetcher.to_page(url)
+        return self.fetcher.page_to_problem(page)
+
+    def clone_urls(self, urls: list[str], jobs: int = 4) -> list[LocalProblem]:
+        """ Clones all problems in the given URLs. Pages are fetched and parsed
+        concurrently by a pool of workers, while the problems are written to
+        the project as soon as they are ready. Problems that are already
+        cloned are skipped, and errors are reported per URL without stopping
+        the other clones. Returns the newly cloned problems. """
+
+        from concurrent.futures import as_completed
+        from concurrent.futures import ThreadPoolExecutor
+
+        urls = list(dict.fromkeys(urls))  # remove duplicates, keep order
+        cloned = list()
+        done = failed = 0
+        start = time.time()
+
+        with ThreadPoolExecutor(max_workers=max(jobs, 1)) as pool:
+            futures = {pool.submit(self._fetch_problem, u): u for u in urls}
+
+            for future in as_completed(futures):
+                url = futures[future]
+                done += 1
+
+                try:
+                    problem = future.result()
+                    processor = self._preprocessor(problem)
+                    if LocalProblem.is_problem(self._clone_dst(processor)):
+                        msg = f'Skipped {url!r} (already cloned)'
+                    else:
+                        prob = self.clone_problem(problem)
+                        cloned.append(prob)
+                        msg = prob.location
+
+                except Exception as err:
+                    if isinstance(err, cptk.utils.cptkException):
+                        System.error(err, title='FAILED')
+                    else:
+                        System.unexpected_error(err)
+                    failed += 1
+                    msg = f'Failed {url!r}'
+
+                System.progress(done, len(urls), time.time() - start, msg)
+
+        if failed:
+            System.warn(f'Failed to clone {failed} out of {len(urls)} problems')
+
+        return cloned
+
+    def clone_contest(self, url: str, wait: bool = False) -> list[LocalProblem]:
+        """ Clones all problems of the contest in the given URL. If 'wait' is
+        True, waits for the contest to start and clones the problems as soon
+        as they are published. """
+
+        page = self.fetcher.to_page(url)
+        contest = self.fetcher.page_to_contest(page)
+
+        if wait:
+            from cptk.core.scheduler import ContestScheduler
+            scheduler = ContestScheduler(self.fetcher)
+            scheduler.wait(contest)
+            urls = scheduler.problems(url)
+        else:
+            urls = self.fetcher.contest_problems(page)
+
+        return [self.clone_url(problem_url) for problem_url in urls]
+
+    def _preprocessor(self, problem: Problem) -> Preprocessor:
+        """ Returns a preprocessor that renders templates for the given
+        problem, and caches compiled templates in the user cache directory. """
+
+        from cptk.core.preprocessor import Preprocessor
+        from cptk.core.preprocessor import templates_cache_dir
+        return Preprocessor(problem, cache_dir=templates_cache_dir())
+
+    def _clone_dst(self, processor: Preprocessor) -> str:
+        """ Returns the location that a problem is cloned into. """
+        return self.move_relative(processor.parse_string(self.config.clone.path))
+
+    def _plan_clone(self, processor: Preprocessor) -> TemplatePlan:
+        src = self.relative(self.config.clone.template)
+        dst = self._clone_dst(processor)
+        static = self.config.clone.static
+        return processor.plan_directory(src, dst, static=static)
+
+    def plan_clone(self, problem: Problem) -> TemplatePlan:
+        """ Returns the plan of cloning the given problem: the files of the
+        template that will be created, overwritten or left unchanged. Nothing
+        is written. """
+        return self._plan_clone(self._preprocessor(problem))
+
     def clone_problem(self, problem: Problem) -> LocalProblem:
         """ Clones the given problem instance and stores a local problem inside
         the current cptk project. """
 
-        processor = Preprocessor(problem)
-
-        src = self.relative(self.config.clone.template)
-        dst = self.move_relative(processor.parse_string(self.config.clone.path))
-        commons = cptk.utils.find_common_files(src, dst)
-        # TODO: won't find common files that include preprocessing in filename
+        processor = self._preprocessor(problem)
+        plan = self._plan_clone(processor)
 
-        if commons:
+        if plan.overwritten:
             System.warn(
                 '\n'.join((
                     'The following files will be overwritten:',
-                    *commons,
+                    *plan.overwritten,
                 )),
             )
 
@@ -231,18 +451,57 @@ class LocalProject:
             if not ans:
                 System.abort()
 
-        cptk.utils.soft_tree_copy(src, dst)
-        processor.parse_directory(dst)
+        plan.apply()
+        dst = plan.dst
 
         recipe = self.config.clone.recipe.preprocess(processor)
         prob = LocalProblem.init(dst, recipe)
+        prob.store_metadata(problem)
 
         if recipe.test is not None:
-            prob.store_tests(recipe.test.folder, problem.tests)
+            store = self.store if self.config.store.enabled else None
+            prob.store_tests(recipe.test.folder, problem.tests, store=store)
 
+        self.index.add(prob.location, self._recipe_names(dst), problem)
         self.update_last(prob)
         return prob
 
+    @staticmethod
+    def _recipe_names(location: str) -> list[str | None]:
+        path = os.path.join(location, cptk.constants.RECIPE_FILE)
+        return [recipe.name for recipe in RecipesConfig.load(path).recipes]
+
+    def _find_problems(
+        self,
+    ) -> Iterator[tuple[str, list[str | None], Problem | None]]:
+        """ Walks the project tree and yields the (location, recipe names,
+        scraped problem) records of all local problems. Hidden directories
+        (like '.cptk' and '.git') are skipped. """
+
+        for folder, dirs, files in os.walk(self.location):
+            dirs[:] = sorted(d for d in dirs if not d.startswith('.'))
+            if cptk.constants.RECIPE_FILE not in files:
+                continue
+
+            try:
+                names = self._recipe_names(folder)
+            except ConfigFileError:
+                continue
+
+            if names:
+                yield folder, names, LocalProblem(folder).metadata
+
+    def reindex(self) -> None:
+        """ Rebuilds the problem index from scratch, by walking the whole
+        project tree. """
+        self.index.rebuild(self._find_problems())
+
+    def record_test(self, prob: LocalProblem, passed: int, failed: int) -> None:
+        """ Records the result of the last test run of the given problem in
+        the project index. """
+        recipes = self._recipe_names(prob.location)
+        self.index.record_test(prob.location, recipes, passed, failed)
+
     def last(self) -> LocalProblem | None:
         try:
             with open(self.relative(cptk.constants.LAST_FILE)) as file:
@@ -277,21 +536,20 @@ class LocalProject:
         if not self._is_subpath(self.location, dst):
             raise InvalidMoveDest(dst)
 
-        for pat in cptk.constants.MOVE_SAFES:
-            # This is an ugly solution. I have tries to use fnmatch but
-            # it has some strange behavior and doesn't match directories
-            # if their name doesn't end with an '/'. I should rewrite this
-            # piece of code, but as long as it works and preforms ok-ish,
-            # I'm fine with it. (:
+        rel = os.path.relpath(src, self.location)
+        if any(
+            cptk.utils.path_matches(pattern, rel)
+            for pattern in cptk.constants.MOVE_SAFES
+        ):
+            raise InvalidMoveSource(src)
 
-            matches = (
-                os.path.normpath(g)
-                for g in iglob(self.relative(pat), recursive=True)
-            )
-            if os.path.normpath(src) in matches:
-                raise InvalidMoveSource(src)
+        # if the destination is an existing directory, the source is moved
+        # into it
+        target = dst
+        if os.path.isdir(dst):
+            target = os.path.join(dst, os.path.basename(src))
 
-        shutil.move(src, dst)
+        self.index.move(src, target, apply=lambda: shutil.move(src, dst))
         self._register_move(src, dst)
 
     def _register_move(self, src: str, dst: str) -> None:
@@ -299,8 +557,16 @@ class LocalProject:
         used by the 'move_relative' method to parse and generate the moved
         paths. """
 
+        table = self._move_table()
+        table.add(self.relative(src), self.relative(dst))
+
+        path = self.relative(cptk.constants.MOVE_FILE)
         src = os.path.relpath(src, self.location)
         dst = os.path.relpath(dst, self.location)
 
-        with open(self.relative(cptk.constants.MOVE_FILE), 'a') as file:
+        with open(path, 'a') as file:
             file.write(f'{src}{cptk.constants.MOVE_FILE_SEPERATOR}{dst}\n')
+
+        stamp = _file_stamp(path)
+        _move_tables[path] = (stamp, table)
+        self._save_move_table(stamp, table)
@@ -0,0 +1,116 @@
+""" Caches the project root that each directory belongs to, so finding the
+project of a directory doesn't require looking for the project file in each
+of its ancestors. The cache is kept in memory and in the user-wide cache
+directory. """
+from __future__ import annotations
+
+import json
+import os
+
+import cptk.constants
+import cptk.utils
+
+CACHE_NAME = 'roots.json'
+
+# The maximal amount of directories stored in the persistent cache. The oldest
+# entries are dropped first.
+CACHE_SIZE = 256
+
+
+def _project_stamp(root: str) -> list[int] | None:
+    try:
+        st = os.stat(os.path.join(root, cptk.constants.PROJECT_FILE))
+    except OSError:
+        return None
+    return [st.st_ino, st.st_mtime_ns]
+
+
+def _dir_stamp(location: str) -> list[int] | None:
+    try:
+        st = os.stat(location)
+    except OSError:
+        return None
+    return [st.st_dev, st.st_ino]
+
+
+class RootCache:
+    """ Maps absolute directory paths to the root of the project that contains
+    them. An entry is valid as long as the directory has the same inode, and
+    the project file of the root has the same inode and modification time.
+    Projects that are created inside existing projects by cptk invalidate the
+    relevant entries, but nested projects that are created manually are not
+    detected until the cache entry is invalidated. """
+
+    def __init__(self) -> None:
+        self._entries: dict[str, list] | None = None
+
+    @property
+    def _path(self) -> str:
+        return os.path.join(cptk.utils.cache_dir(), CACHE_NAME)
+
+    @property
+    def entries(self) -> dict[str, list]:
+        if self._entries is None:
+            try:
+                with open(self._path, encoding='utf8') as file:
+                    self._entries = json.load(file)
+            except (OSError, ValueError):
+                self._entries = dict()
+
+            if not isinstance(self._entries, dict):
+                self._entries = dict()
+
+        return self._entries
+
+    def _save(self) -> None:
+        while len(self.entries) > CACHE_SIZE:
+            del self.entries[next(iter(self.entries))]
+
+        try:
+            cptk.utils.atomic_write(self._path, json.dumps(self.entries))
+        except OSError:
+            pass  # The cache is just an optimization, it is ok to lose it.
+
+    def get(self, location: str) -> str | None:
+        """ Returns the cached root of the project that contains the given
+        absolute location, or None if it isn't cached or the cache entry is
+        no longer valid. """
+
+        entry = self.entries.get(location)
+        if not isinstance(entry, list) or len(entry) != 3:
+            return None
+
+        stamp, root, project_stamp = entry
+        if _dir_stamp(location) != stamp:
+            return None
+        if _project_stamp(root) != project_stamp:
+            return None
+        return root
+
+    def remember(self, location: str, root: str) -> None:
+        stamp = _dir_stamp(location)
+        project_stamp = _project_stamp(root)
+        if stamp is None or project_stamp is None:
+            return
+
+        self.entries.pop(location, None)  # move to the end (newest)
+        self.entries[location] = [stamp, root, project_stamp]
+        self._save()
+
+    def forget(self, location: str) -> None:
+        """ Drops the entries of the given location and all directories inside
+        it. Should be called when a new project is created. """
+
+        prefix = os.path.join(location, '')
+        stale = [
+            path for path in self.entries
+            if path == location or path.startswith(prefix)
+        ]
+
+        if stale:
+            for path in stale:
+                del self.entries[path]
+            self._save()
+
+
+roots = RootCache()
@@ -0,0 +1,219 @@
+""" A content-addressed store for test inputs and expected outputs. Each blob is
+stored once per project, under its SHA-256 digest, and is optionally
+compressed. Test folders reference blobs using small '.ref' files that
+contain the digest, so identical tests in different problems (or in the same
+problem) take the space of a single test. Refs can also reference entries in
+zip archives, which are read straight from the archive. """
+from __future__ import annotations
+
+import gzip
+import hashlib
+import io
+import os
+import tempfile
+import zipfile
+from typing import BinaryIO
+from typing import Callable
+from typing import IO
+
+import pydantic
+
+import cptk.constants
+from cptk.utils import cptkException
+
+# The size of the chunks that are read and written when streaming blobs.
+CHUNK_SIZE = 1 << 16
+
+NONE = 'none'
+GZIP = 'gzip'
+ZSTD = 'zstd'
+
+SUFFIXES = {ZSTD: '.zst', GZIP: '.gz', NONE: ''}
+
+# Refs that start with this prefix reference an entry in a zip archive.
+ARCHIVE_REF_PREFIX = 'zip:'
+
+
+class StoreError(cptkException):
+    pass
+
+
+class StoreSettings(pydantic.BaseModel):
+    """ Configures the test store of a project. If it is enabled, the tests of
+    cloned problems are stored in the store and referenced from the test
+    folders of the problems. Compression can be 'zstd' (requires the
+    'zstandard' package, and falls back to gzip without it), 'gzip' or
+    'none'. """
+
+    enabled: bool = False
+    compression: str = GZIP
+
+    @pydantic.validator('compression')
+    @classmethod
+    def valid_compression(cls, val: str) -> str:
+        if val not in SUFFIXES:
+            raise ValueError(f'must be one of {", ".join(SUFFIXES)}')
+        return val
+
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        return None
+    return zstandard
+
+
+def is_ref(path: str) -> bool:
+    return path.endswith(cptk.constants.REF_FILE_SUFFIX)
+
+
+def read_ref(path: str) -> str:
+    """ Returns the digest that is referenced by the given ref file. """
+    with open(path, encoding='utf8') as file:
+        return file.read().strip()
+
+
+def write_ref(path: str, digest: str) -> None:
+    with open(path, 'w', encoding='utf8') as file:
+        file.write(digest + '\n')
+
+
+def write_archive_ref(path: str, archive: str, entry: str) -> None:
+    """ Writes a reference to an entry in a zip archive, instead of a blob in
+    the store. The archive is referenced by its absolute path. """
+
+    with open(path, 'w', encoding='utf8') as file:
+        file.write(f'{ARCHIVE_REF_PREFIX}{os.path.abspath(archive)}\n{entry}\n')
+
+
+def open_ref(path: str, store: Callable[[], BlobStore]) -> BinaryIO:
+    """ Returns a binary stream of the data that is referenced by the given ref
+    file. 'store' is called to get the store of the project only if the
+    data is stored in it. """
+
+    ref = read_ref(path)
+    if not ref.startswith(ARCHIVE_REF_PREFIX):
+        return store().open(ref)
+
+    archive, _, entry = ref[len(ARCHIVE_REF_PREFIX):].partition('\n')
+    try:
+        with zipfile.ZipFile(archive) as file:
+            # The entry stays readable after the archive is closed.
+            return file.open(entry)
+    except (OSError, KeyError, zipfile.BadZipFile) as err:
+        raise StoreError(f'Failed to read {entry!r} from {archive!r}: {err}')
+
+
+class BlobStore:
+    """ The test store of the project in the given root. Blobs are written
+    with the given compression, but blobs with any compression can be read,
+    so the compression can be changed at any time. """
+
+    def __init__(self, root: str, compression: str = GZIP) -> None:
+        if compression == ZSTD and _zstandard() is None:
+            compression = GZIP
+
+        self.root = root
+        self.path = os.path.join(root, cptk.constants.STORE_DIR)
+        self.compression = compression
+
+    def _blob(self, digest: str, compression: str) -> str:
+        name = digest + SUFFIXES[compression]
+        return os.path.join(self.path, digest[:2], name)
+
+    def _find(self, digest: str) -> tuple[str, str] | None:
+        """ Returns the path and compression of the stored blob with the given
+        digest, or None if there is no such blob. """
+
+        for compression in SUFFIXES:
+            path = self._blob(digest, compression)
+            if os.path.isfile(path):
+                return path, compression
+        return None
+
+    def __contains__(self, digest: str) -> bool:
+        return self._find(digest) is not None
+
+    def _writer(self, file: BinaryIO) -> BinaryIO:
+        if self.compression == ZSTD:
+            compressor = _zstandard().ZstdCompressor()
+            return compressor.stream_writer(file, closefd=False)
+        if self.compression == GZIP:
+            return gzip.GzipFile(fileobj=file, mode='wb', mtime=0)
+        return _Unclosable(file)
+
+    def put(self, stream: IO[bytes]) -> str:
+        """ Stores the contents of the given binary stream, and returns their
+        digest. The stream is compressed while it is read, so it is never
+        fully loaded into memory. If a blob with the same contents is already
+        stored, it is kept as is. """
+
+        os.makedirs(self.path, exist_ok=True)
+        fd, temp = tempfile.mkstemp(dir=self.path, prefix='.tmp-')
+        digest = hashlib.sha256()
+
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                with self._writer(file) as writer:
+                    for chunk in iter(lambda: stream.read(CHUNK_SIZE), b''):
+                        digest.update(chunk)
+                        writer.write(chunk)
+
+            digest = digest.hexdigest()
+            if digest in self:
+                os.unlink(temp)
+            else:
+                path = self._blob(digest, self.compression)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(temp, path)
+
+        except BaseException:
+            os.unlink(temp)
+            raise
+
+        return digest
+
+    def put_bytes(self, data: bytes) -> str:
+        return self.put(io.BytesIO(data))
+
+    def open(self, digest: str) -> BinaryIO:
+        """ Returns a binary stream of the contents of the blob with the given
+        digest, that decompresses the blob while it is read. """
+
+        found = self._find(digest)
+        if found is None:
+            raise StoreError(f'Test {digest!r} is missing from the store')
+
+        path, compression = found
+        if compression == GZIP:
+            return gzip.open(path, 'rb')
+
+        if compression == ZSTD:
+            zstandard = _zstandard()
+            if zstandard is None:
+                raise StoreError(
+                    f'Reading test {digest!r} requires the zstandard package',
+                )
+            return zstandard.ZstdDecompressor().stream_reader(
+                open(path, 'rb'), closefd=True,
+            )
+
+        return open(path, 'rb')
+
+
+class _Unclosable:
+    """ Writes into a file without closing it, like the compressing writers
+    (which close only their own state). """
+
+    def __init__(self, file: BinaryIO) -> None:
+        self._file = file
+
+    def write(self, data: bytes) -> int:
+        return self._file.write(data)
+
+    def __enter__(self) -> _Unclosable:
+        return self
+
+    def __exit__(self, *_) -> None:
+        pass
@@ -0,0 +1,285 @@
+""" Tests of local problems. Unlike scraped tests, local tests don't hold their
+data: they hold the paths of their files, and open them only when the test
+runs, so suites of any size can be tested without loading them into memory. """
+from __future__ import annotations
+
+import io
+import os
+import posixpath
+import re
+import time
+from dataclasses import dataclass
+from dataclasses import field
+from fnmatch import fnmatchcase
+from functools import lru_cache
+from typing import Callable
+from typing import Iterator
+from typing import Sequence
+from typing import TextIO
+from typing import TYPE_CHECKING
+
+import cptk.constants
+from cptk.core.config import RACY_NS
+from cptk.local.diff import find_mismatch
+from cptk.local.store import is_ref
+from cptk.local.store import open_ref
+
+if TYPE_CHECKING:
+    from cptk.local.diff import Mismatch
+    from cptk.local.problem import TestGroup
+    from cptk.local.store import BlobStore
+
+# The default glob patterns of the inputs and the expected outputs of tests.
+INPUT_PATTERNS = ('*' + cptk.constants.INPUT_FILE_SUFFIX,)
+OUTPUT_PATTERNS = (
+    '*' + cptk.constants.OUTPUT_FILE_SUFFIX,
+    '*' + cptk.constants.ANSWER_FILE_SUFFIX,
+)
+
+
+def open_test_file(path: str, store: Callable[[], BlobStore]) -> TextIO:
+    """ Opens a test file for reading as text. Files that reference the test
+    store are decompressed while they are read, and files that reference an
+    archive are read straight from it. """
+
+    if is_ref(path):
+        stream = open_ref(path, store)
+    else:
+        stream = open(path, 'rb')
+    return io.TextIOWrapper(stream, encoding='utf8')
+
+
+@dataclass
+class LocalTest:
+    """ A test of a local problem. 'input' and 'output' are the paths of the
+    files that hold the input and the expected output of the test. Each file
+    is either a plain file, or a ref (see 'cptk.local.store'). """
+
+    name: str
+    input: str
+    output: str
+    store: Callable[[], BlobStore] = field(
+        default=None, repr=False, compare=False,
+    )
+
+    @property
+    def actual(self) -> str:
+        """ The path in which the actual output of the test is saved, next to
+        the input of the test. """
+
+        name = posixpath.basename(self.name)
+        return os.path.join(
+            os.path.dirname(self.input),
+            name + cptk.constants.ACTUAL_FILE_SUFFIX,
+        )
+
+    def open_input(self) -> TextIO:
+        return open_test_file(self.input, self.store)
+
+    def open_output(self) -> TextIO:
+        return open_test_file(self.output, self.store)
+
+    def compare(self, actual: str | TextIO) -> Mismatch | None:
+        """ Compares the given output (a string or a text stream) with the
+        expected output, and returns their first difference, or None if they
+        are equal. Both outputs are streamed, and never fully loaded. """
+
+        if isinstance(actual, str):
+            actual = io.StringIO(actual)
+
+        with self.open_output() as file:
+            return find_mismatch(file, actual)
+
+    def matches(self, actual: str | TextIO) -> bool:
+        """ Returns True if the given output equals the expected output. """
+        return self.compare(actual) is None
+
+
+def _translate(pattern: str) -> re.Pattern:
+    """ Translates a glob pattern of test files into a regular expression that
+    matches paths relative to the test folder. '*' and '?' don't match
+    directory separators, and '**' matches any amount of directories. """
+
+    parts, i = list(), 0
+    while i < len(pattern):
+        if pattern.startswith('**/', i):
+            parts.append('(?:.*/)?')
+            i += 3
+        elif pattern.startswith('**', i):
+            parts.append('.*')
+            i += 2
+        elif pattern[i] == '*':
+            parts.append('[^/]*')
+            i += 1
+        elif pattern[i] == '?':
+            parts.append('[^/]')
+            i += 1
+        else:
+            parts.append(re.escape(pattern[i]))
+            i += 1
+
+    return re.compile(''.join(parts) + r'\Z')
+
+
+@dataclass(frozen=True)
+class FilePattern:
+    """ A compiled glob pattern of test files. Files that match the pattern
+    are named by their path, without the part of the pattern that follows
+    its last wildcard (for example, the test 'secret/1' is matched by the
+    file 'secret/1.in' using the pattern '**/*.in'). Patterns without a
+    directory separator match files in any directory, by their names. """
+
+    regex: re.Pattern
+    suffix: str
+
+    @classmethod
+    def compile(cls, pattern: str) -> FilePattern:
+        if '/' not in pattern:
+            pattern = '**/' + pattern
+        wildcard = max(pattern.rfind('*'), pattern.rfind('?'))
+        return cls(_translate(pattern), pattern[wildcard + 1:])
+
+    def name(self, rel: str) -> str | None:
+        """ Returns the name of the test that the given file belongs to, or
+        None if the file doesn't match the pattern. """
+
+        if not self.regex.match(rel):
+            return None
+        return rel[:len(rel) - len(self.suffix)]
+
+
+@lru_cache(maxsize=None)
+def _compile(patterns: tuple[str, ...]) -> tuple[FilePattern, ...]:
+    return tuple(FilePattern.compile(pattern) for pattern in patterns)
+
+
+# Maps the absolute paths of scanned directories to their modification times
+# and entries. Adding, removing or renaming a file modifies the directory,
+# so the entries are scanned again only when they may have changed.
+_listings: dict[str, tuple[int, list[tuple[str, bool]]]] = dict()
+
+
+def _scan(path: str) -> list[tuple[str, bool]]:
+    """ Returns the names of the entries in the given directory, and whether
+    each of them is a directory, using a single 'os.scandir' pass. Listings
+    are cached until the directory is modified. """
+
+    mtime = os.stat(path).st_mtime_ns
+    cached = _listings.get(path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
+    with os.scandir(path) as it:
+        entries = [(item.name, item.is_dir()) for item in it]
+
+    # A directory that was just modified can be modified again without
+    # changing its modification time, so its listing can't be trusted yet.
+    if time.time_ns() - mtime >= RACY_NS:
+        _listings[path] = (mtime, entries)
+    return entries
+
+
+def _walk(folder: str, recursive: bool) -> Iterator[tuple[str, str]]:
+    """ Yields the paths of the files in the given folder, and their paths
+    relative to the folder (using forward slashes). Hidden directories are
+    skipped. """
+
+    stack = ['']
+    while stack:
+        rel_dir = stack.pop()
+        path = os.path.join(folder, rel_dir)
+        for name, is_dir in _scan(os.path.abspath(path)):
+            rel = f'{rel_dir}/{name}' if rel_dir else name
+            if not is_dir:
+                yield os.path.join(path, name), rel
+            elif recursive and not name.startswith('.'):
+                stack.append(rel)
+
+
+def _match(
+    patterns: tuple[FilePattern, ...],
+    rel: str,
+) -> tuple[int, str] | None:
+    """ Returns the index of the first pattern that matches the given file,
+    and the name of the test that the file belongs to. """
+
+    for index, pattern in enumerate(patterns):
+        name = pattern.name(rel)
+        if name is not None:
+            return index, name
+    return None
+
+
+def discover_tests(
+    folder: str,
+    store: Callable[[], BlobStore] = None,
+    inputs: Sequence[str] = INPUT_PATTERNS,
+    outputs: Sequence[str] = OUTPUT_PATTERNS,
+) -> list[LocalTest]:
+    """ Returns the tests in the given folder, sorted by their names. 'inputs'
+    and 'outputs' are glob patterns of the input files and of the expected
+    output files (plain files or refs), relative to the folder. An input and
+    an expected output belong to the same test if they have the same name
+    (see 'FilePattern'). If a test matches more than one pattern, the first
+    pattern is preferred. Nested directories are searched only if a pattern
+    contains a directory or '**'. No test data is read. """
+
+    if not os.path.isdir(folder):
+        return list()
+
+    recursive = any('/' in p or '**' in p for p in (*inputs, *outputs))
+    inputs, outputs = _compile(tuple(inputs)), _compile(tuple(outputs))
+
+    found_inputs, found_outputs = dict(), dict()
+    for path, rel in _walk(folder, recursive):
+        if is_ref(rel):
+            rel = rel[:-len(cptk.constants.REF_FILE_SUFFIX)]
+
+        # A file that matches an output pattern is never an input, so inputs
+        # can be matched by patterns without a suffix (like '*').
+        for patterns, found in (
+            (outputs, found_outputs),
+            (inputs, found_inputs),
+        ):
+            match = _match(patterns, rel)
+            if match is None:
+                continue
+
+            index, name = match
+            if name not in found or index < found[name][0]:
+                found[name] = (index, path)
+            break
+
+    return [
+        LocalTest(name, found_inputs[name][1], found_outputs[name][1], store)
+        for name in sorted(found_inputs.keys() & found_outputs.keys())
+    ]
+
+
+def group_tests(
+    tests: list[LocalTest],
+    groups: list[TestGroup],
+) -> list[tuple[TestGroup | None, list[LocalTest]]]:
+    """ Splits the tests into the given groups, in the order of the groups.
+    Each test belongs to the first group that has a pattern that matches its
+    name. Tests that don't belong to any group are returned first, under
+    None. Empty groups are returned too. """
+
+    members = {group.name: list() for group in groups}
+    ungrouped = list()
+
+    for test in tests:
+        group = next(
+            (
+                group for group in groups
+                if any(fnmatchcase(test.name, p) for p in group.tests)
+            ),
+            None,
+        )
+        if group is None:
+            ungrouped.append(test)
+        else:
+            members[group.name].append(test)
+
+    grouped = [(group, members[group.name]) for group in groups]
+    return [(None, ungrouped)] + grouped if ungrouped else grouped
@@ -1,14 +1,18 @@
 from __future__ import annotations
 
-from colorama import deinit
-from colorama import init
+from cptk.core import client
 
-import cptk.commands
-from cptk.core.system import System
-from cptk.utils import cptkException
 
+def run(args: list[str] | None = None) -> int:
+    """ Runs the given command line in the current process, and returns the
+    exit code. """
 
-def main(args: list[str] | None = None) -> int:
+    from colorama import deinit
+    from colorama import init
+
+    import cptk.commands
+    from cptk.core.system import System
+    from cptk.utils import cptkException
 
     code = 0  # os.EX_OK
 
@@ -32,7 +36,19 @@ def main(args: list[str] | None = None) -> int:
 
     finally:
         deinit()
-        raise SystemExit(code)
+
+    return code
+
+
+def main(args: list[str] | None = None) -> int:
+
+    # If a daemon is running, the command is executed by it, and we don't
+    # import anything beside the (tiny) client.
+    code = client.forward(args)
+    if code is None:
+        code = run(args)
+
+    raise SystemExit(code)
 
 
 if __name__ == '__main__':
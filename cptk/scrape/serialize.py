@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import json
+from dataclasses import fields
+from dataclasses import is_dataclass
+from datetime import datetime
+from functools import lru_cache
+from importlib import import_module
+from typing import Any
+
+from cptk.scrape.problem import Scraped
+from cptk.scrape.problem import Test
+from cptk.scrape.website import Website
+
+TYPE_KEY = '__type__'
+WEBSITE_KEY = '__website__'
+DATETIME_KEY = '__datetime__'
+
+
+def _path(cls: type) -> str:
+    return f'{cls.__module__}:{cls.__qualname__}'
+
+
+@lru_cache(maxsize=None)
+def _trusted_modules() -> frozenset[str]:
+    """ The modules that serialized types can be loaded from: the scraping
+    module itself, and the modules of the installed websites. """
+
+    from cptk.core.plugins import WebsiteRegistry
+
+    modules = {Scraped.__module__, Website.__module__}
+    for plugin in WebsiteRegistry().manifest:
+        modules.add(plugin['value'].partition(':')[0])
+    return frozenset(modules)
+
+
+def _resolve(path: str, base: type | tuple[type, ...]) -> type:
+    """ Returns the class in the given path, which must be a subclass of the
+    given base, defined in a trusted module. Serialized data can be written
+    by anyone, and the loaded classes are instantiated, so any other path is
+    refused without importing anything. """
+
+    module, _, name = path.partition(':')
+    attrs = name.split('.')
+    if module not in _trusted_modules() or any(
+        not attr or attr.startswith('_') for attr in attrs
+    ):
+        raise ValueError(f'Refusing to load untrusted type {path!r}')
+
+    obj = import_module(module)
+    for attr in attrs:
+        obj = getattr(obj, attr)
+
+    if not isinstance(obj, type) or not issubclass(obj, base):
+        raise ValueError(f'Refusing to load untrusted type {path!r}')
+    return obj
+
+
+def encode(obj: Any) -> Any:
+    """ Converts a scraped object (a 'Scraped' instance, or any of the values
+    it holds) into a structure of builtin types that can be dumped as JSON. """
+
+    if is_dataclass(obj):
+        data = {TYPE_KEY: _path(type(obj))}
+        for f in fields(obj):
+            data[f.name] = encode(getattr(obj, f.name))
+        return data
+
+    if isinstance(obj, Website):
+        return {WEBSITE_KEY: _path(type(obj))}
+
+    if isinstance(obj, datetime):
+        return {DATETIME_KEY: obj.isoformat()}
+
+    if isinstance(obj, (list, tuple)):
+        return [encode(item) for item in obj]
+
+    return obj
+
+
+def decode(data: Any) -> Any:
+    """ The inverse of 'encode'. Rebuilds the scraped objects, including the
+    original 'Problem' and 'Contest' subclasses and the website instances.
+    Only scraped classes and websites are loaded (see '_resolve'). """
+
+    if isinstance(data, list):
+        return [decode(item) for item in data]
+
+    if not isinstance(data, dict):
+        return data
+
+    if WEBSITE_KEY in data:
+        return _resolve(data[WEBSITE_KEY], Website)()
+
+    if DATETIME_KEY in data:
+        return datetime.fromisoformat(data[DATETIME_KEY])
+
+    cls = _resolve(data[TYPE_KEY], (Scraped, Test))
+    return cls(**{
+        key: decode(value)
+        for key, value in data.items()
+        if key != TYPE_KEY
+    })
+
+
+def dumps(obj: Any) -> str:
+    return json.dumps(encode(obj), separators=(',', ':'))
+
+
+def loads(string: str) -> Any:
+    return decode(json.loads(string))
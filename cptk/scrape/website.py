@@ -7,6 +7,7 @@ from dataclasses import field
 from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
+    from cptk.scrape import Contest
     from cptk.scrape import Problem
     from bs4 import BeautifulSoup
 
@@ -47,3 +48,21 @@ class Website(ABC):
         """ Constructs and a Problem instance that represents the problem that
         is displayed in the given page. If the given page doesn't display a
         single and unique problem, returns None. """
+
+    def is_contest(self, info: PageInfo) -> bool:
+        """ Returns True only if the given page information describes the main
+        page of a contest. Websites that don't support contest pages don't
+        need to override this method. """
+        return False
+
+    def to_contest(self, info: PageInfo) -> Contest | None:
+        """ Constructs a Contest instance that represents the contest that is
+        displayed in the given page. If the given page doesn't display a
+        contest, returns None. """
+        return None
+
+    def contest_problems(self, info: PageInfo) -> list[str]:
+        """ Returns the URLs of all problems that are listed in the given
+        contest page, in the order that they are displayed. Before the contest
+        starts, the list is usually empty. """
+        return list()
@@ -3,11 +3,17 @@ from __future__ import annotations
 import os
 import re
 import shutil
+import sys
 from argparse import ArgumentTypeError
+from dataclasses import dataclass
+from dataclasses import field
 from functools import lru_cache
 from typing import Callable
 from typing import Generator
 from typing import TypeVar
+
+import cptk.constants
+
 T = TypeVar('T')
 
 
@@ -25,6 +31,43 @@ def cached_property(f: Callable[..., T]) -> T:
     return property(lru_cache(None)(f))
 
 
+def cache_dir() -> str:
+    """ Returns the directory in which cptk stores its user-wide caches. Can be
+    overwritten using the 'CPTK_CACHE_DIR' environment variable. """
+
+    path = os.environ.get(cptk.constants.CACHE_DIR_ENV)
+    if path:
+        return path
+
+    if sys.platform == 'win32':
+        base = os.environ.get('LOCALAPPDATA', os.path.expanduser('~'))
+        return os.path.join(base, 'cptk', 'Cache')
+
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+    return os.path.join(base, 'cptk')
+
+
+def atomic_write(path: str, data: str | bytes) -> None:
+    """ Writes the given data into the file in the given path, such that other
+    processes never see a partially written file. """
+
+    import tempfile
+
+    folder = os.path.dirname(path) or os.curdir
+    os.makedirs(folder, exist_ok=True)
+    fd, temp = tempfile.mkstemp(dir=folder, prefix='.tmp-')
+
+    mode, encoding = ('wb', None) if isinstance(data, bytes) else ('w', 'utf8')
+
+    try:
+        with os.fdopen(fd, mode, encoding=encoding) as file:
+            file.write(data)
+        os.replace(temp, path)
+    except BaseException:
+        os.unlink(temp)
+        raise
+
+
 def find_tree_files(dir: str) -> Generator[str, None, None]:
     """ Yields all files in the directory as absolute paths. """
 
@@ -43,11 +86,190 @@ def find_common_files(a: str, b: str) -> list[str]:
     """ Returns a list of files that share the same relative path in both
     directories a and b. """
 
-    # To preserve the order of the files, we use the order of a_files
-    a_files = list(os.path.relpath(p, start=a) for p in find_tree_files(a))
-    b_files = (os.path.relpath(p, start=b) for p in find_tree_files(b))
-    commons = set(a_files).intersection(b_files)
-    return [p for p in a_files if p in commons]
+    if not os.path.isdir(a):
+        return list()
+    return plan_tree_copy(a, b).commons
+
+
+def _path_parts(path: str) -> list[str]:
+    path = path.replace(os.sep, '/')
+    return [part for part in path.split('/') if part not in ('', '.')]
+
+
+def path_matches(pattern: str, path: str) -> bool:
+    """ Returns True if the given relative path matches the given pattern,
+    without accessing the filesystem. Both are split into components. A '**'
+    component matches zero or more components, and any other component is
+    matched using fnmatch. Unlike glob, hidden names are matched by wildcards
+    too. """
+
+    from fnmatch import fnmatch
+
+    pattern_parts = _path_parts(pattern)
+    path_parts = _path_parts(os.path.normpath(path))
+
+    # The path prefixes that can be matched by the pattern parts seen so far,
+    # by their length.
+    prefixes = {0}
+    for part in pattern_parts:
+        if part == '**':
+            prefixes = set(range(min(prefixes), len(path_parts) + 1))
+        else:
+            prefixes = {
+                length + 1 for length in prefixes
+                if length < len(path_parts) and fnmatch(path_parts[length], part)
+            }
+        if not prefixes:
+            return False
+
+    return len(path_parts) in prefixes
+
+
+# The FICLONE ioctl of Linux, which creates a copy-on-write clone of a file on
+# filesystems that support it (like btrfs and xfs).
+FICLONE = 0x40049409
+
+
+def _reflink(src: int, dst: int) -> bool:
+    if not sys.platform.startswith('linux'):
+        return False
+
+    import fcntl
+    try:
+        fcntl.ioctl(dst, FICLONE, src)
+    except OSError:
+        return False
+    return True
+
+
+def _copy_range(src: int, dst: int) -> bool:
+    """ Copies the file using 'copy_file_range', which doesn't pass the data
+    through userspace (and can be offloaded to the filesystem or the server of
+    a network filesystem). Returns False if nothing was copied because the
+    system call isn't supported. """
+
+    if not hasattr(os, 'copy_file_range'):  # Python 3.8+, Linux only
+        return False
+
+    copied = 0
+    while True:
+        try:
+            count = os.copy_file_range(src, dst, 1 << 30)
+        except OSError:
+            if copied:
+                raise
+            return False
+
+        if not count:
+            return True
+        copied += count
+
+
+def copy_file(src: str, dst: str) -> None:
+    """ Copies the contents of the source file into the destination path,
+    replacing any existing file. Prefers a copy-on-write clone, and then an
+    in-kernel copy, before falling back to a regular copy. """
+
+    try:
+        os.unlink(dst)  # never write through an existing hard link
+    except FileNotFoundError:
+        pass
+
+    with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+        if _reflink(fsrc.fileno(), fdst.fileno()):
+            return
+        if _copy_range(fsrc.fileno(), fdst.fileno()):
+            return
+
+    shutil.copyfile(src, dst)
+
+
+def write_file(path: str, data: bytes) -> None:
+    """ Writes the data into a new file in the given path, replacing any
+    existing file. """
+
+    try:
+        os.unlink(path)  # never write through an existing hard link
+    except FileNotFoundError:
+        pass
+
+    with open(path, 'wb') as file:
+        file.write(data)
+
+
+def link_file(src: str, dst: str) -> None:
+    """ Creates a hard link to the source file in the destination path,
+    replacing any existing file. Falls back to a copy if the file can't be
+    linked (for example, if the paths are on different filesystems). """
+
+    try:
+        os.unlink(dst)
+    except FileNotFoundError:
+        pass
+
+    try:
+        os.link(src, dst)
+    except OSError:
+        copy_file(src, dst)
+
+
+@dataclass
+class TreeCopy:
+    """ A plan for copying all files from the source directory into the
+    destination directory. All paths are relative to the two directories. """
+
+    src: str
+    dst: str
+    dirs: list[str] = field(default_factory=list)
+    files: list[str] = field(default_factory=list)
+    links: list[str] = field(default_factory=list)
+
+    # Files that already exist in the destination, and will be overwritten.
+    commons: list[str] = field(default_factory=list)
+
+    def apply(self) -> None:
+        os.makedirs(self.dst, exist_ok=True)
+        for path in self.dirs:
+            os.makedirs(os.path.join(self.dst, path), exist_ok=True)
+
+        for path in self.files:
+            copy_file(os.path.join(self.src, path), os.path.join(self.dst, path))
+
+        for path in self.links:
+            link_file(os.path.join(self.src, path), os.path.join(self.dst, path))
+
+
+def plan_tree_copy(src: str, dst: str, static: list[str] = ()) -> TreeCopy:
+    """ Walks the source directory once, and returns a plan for copying it
+    into the destination directory. Files that match one of the 'static'
+    patterns (see 'path_matches') are hard linked instead of copied, and must
+    not be modified in the destination. """
+
+    plan = TreeCopy(src, dst)
+
+    def walk(rel: str, dst_exists: bool) -> None:
+        with os.scandir(os.path.join(src, rel)) as entries:
+            entries = sorted(entries, key=lambda entry: entry.name)
+
+        for entry in entries:
+            path = os.path.join(rel, entry.name)
+            target = os.path.join(dst, path)
+
+            if entry.is_dir():
+                plan.dirs.append(path)
+                walk(path, dst_exists and os.path.isdir(target))
+
+            elif entry.is_file():
+                if dst_exists and os.path.isfile(target):
+                    plan.commons.append(path)
+
+                if any(path_matches(pattern, path) for pattern in static):
+                    plan.links.append(path)
+                else:
+                    plan.files.append(path)
+
+    walk('', os.path.isdir(dst))
+    return plan
 
 
 def soft_tree_copy(src: str, dst: str) -> None:
@@ -57,16 +279,7 @@ def soft_tree_copy(src: str, dst: str) -> None:
     will be created in the destintation directory, even if there are no files
     inside it in the source directory. """
 
-    os.makedirs(dst, exist_ok=True)
-
-    for name in os.listdir(src):
-        item_src = os.path.join(src, name)
-        item_dst = os.path.join(dst, name)
-
-        if os.path.isdir(item_src):
-            soft_tree_copy(item_src, item_dst)
-        elif os.path.isfile(item_src):
-            shutil.copyfile(item_src, item_dst)
+    plan_tree_copy(src, dst).apply()
 
 
 @lru_cache(None)
@@ -111,3 +324,27 @@ def url_validator(url: str) -> str:
     if not valid_url(url):
         raise ArgumentTypeError(f'invalid url {url!r}')
     return url
+
+
+class InvalidURLFile(cptkException):
+    def __init__(self, path: str, lineno: int, line: str) -> None:
+        self.path = path
+        self.lineno = lineno
+        super().__init__(f'Invalid url {line!r} in {path!r} (line {lineno})')
+
+
+def read_urls(path: str) -> list[str]:
+    """ Reads a list of URLs from the given file, one URL per line. Empty lines
+    and lines that start with a '#' are ignored. """
+
+    urls = list()
+    with open(path, encoding='utf8') as file:
+        for lineno, line in enumerate(file, start=1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            if not valid_url(line):
+                raise InvalidURLFile(path, lineno, line)
+            urls.append(line)
+
+    return urls
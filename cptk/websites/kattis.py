@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import datetime
+import time
 from dataclasses import dataclass
 from dataclasses import field
 from typing import TYPE_CHECKING
@@ -15,6 +16,15 @@ if TYPE_CHECKING:
     from cptk.scrape import PageInfo
     from bs4 import BeautifulSoup
 
+# The UTC offsets (in hours) of common and unambiguous timezone abbreviations.
+TIMEZONES = {
+    'UTC': 0, 'GMT': 0, 'WET': 0, 'WEST': 1, 'BST': 1,
+    'CET': 1, 'CEST': 2, 'EET': 2, 'EEST': 3, 'IDT': 3, 'MSK': 3,
+    'EST': -5, 'EDT': -4, 'CST': -6, 'CDT': -5,
+    'MST': -7, 'MDT': -6, 'PST': -8, 'PDT': -7,
+    'JST': 9, 'KST': 9, 'AEST': 10, 'AEDT': 11,
+}
+
 
 @dataclass(unsafe_hash=True)
 class KattisProblem(Problem):
@@ -55,6 +65,34 @@ class Kattis(Website):
     def is_problem(self, info: PageInfo) -> bool:
         return info.data.find('div', {'class': 'problem-wrapper'}) is not None
 
+    @staticmethod
+    def _contest_path(info: PageInfo) -> list[str]:
+        return [p for p in parse.urlparse(info.url).path.split('/') if p]
+
+    def is_contest(self, info: PageInfo) -> bool:
+        path = self._contest_path(info)
+        if len(path) not in (2, 3) or path[0] != 'contests':
+            return False
+        if path[2:] not in ([], ['problems']):
+            return False
+        return info.data.find('div', {'class': 'info upper'}) is not None
+
+    def to_contest(self, info: PageInfo) -> KattisContest | None:
+        return self._parse_contest(info)
+
+    def contest_problems(self, info: PageInfo) -> list[str]:
+        uid = self._contest_path(info)[1]
+        res = list()
+
+        for link in info.data.find_all('a', href=True):
+            path = [p for p in link['href'].split('/') if p]
+            if path[:3] == ['contests', uid, 'problems'] and len(path) == 4:
+                url = parse.urljoin(info.url, link['href'])
+                if url not in res:
+                    res.append(url)
+
+        return res
+
     @staticmethod
     def _parse_code_text(soup: BeautifulSoup) -> None:
         text = soup.text.replace('<br>', '\n').replace('\r', '').strip()
@@ -80,14 +118,33 @@ class Kattis(Website):
 
         return res
 
+    @staticmethod
+    def _parse_timezone(name: str) -> datetime.tzinfo | None:
+        """ Returns the timezone with the given abbreviation, or None if it
+        is the local timezone (or if it is unknown). Kattis shows times in
+        the timezone of the user, so abbreviations that are ambiguous (like
+        'IST') are resolved using the local timezone first. """
+
+        if name in time.tzname or name not in TIMEZONES:
+            return None
+        return datetime.timezone(datetime.timedelta(hours=TIMEZONES[name]))
+
     def _parse_date(self, text: str) -> datetime.datetime:
-        items = text.split()[:-1]  # last element is the timezone
-        time = datetime.datetime.strptime(items.pop(), '%H:%M').time()
+        """ Parses a date like '2022-01-12 07:20 CET' (the date is omitted if
+        it is today) into a timezone aware datetime. """
+
+        *items, zone = text.split()
+        tz = self._parse_timezone(zone)
+        today = datetime.datetime.now(tz).date()
+
+        clock = datetime.datetime.strptime(items.pop(), '%H:%M').time()
         date = (
-            datetime.date.today() if not items
+            today if not items
             else datetime.datetime.strptime(items.pop(), '%Y-%m-%d').date()
         )
-        return datetime.datetime.combine(date, time)
+
+        moment = datetime.datetime.combine(date, clock)
+        return moment.astimezone() if tz is None else moment.replace(tzinfo=tz)
 
     def _parse_contest(self, info: PageInfo) -> KattisContest | None:
 
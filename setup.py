@@ -22,6 +22,9 @@ setup(
 
     python_requires=">=3.7,<4",
     install_requires=DEPENDENCIES,
+    extras_require={
+        "zstd": ["zstandard>=0.15"],
+    },
 
     long_description=README + '\n\n' + CHANGELOG,
     long_description_content_type="text/markdown",
@@ -33,9 +36,9 @@ setup(
 
     entry_points={
         "cptk_sites": [
-            "codeforces=cptk.websites:Codeforces",
-            "csesfi=cptk.websites:Cses",
-            "kattis=cptk.websites:Kattis",
+            "codeforces=cptk.websites.codeforces:Codeforces",
+            "csesfi=cptk.websites.cses:Cses",
+            "kattis=cptk.websites.kattis:Kattis",
         ],
         "console_scripts": [
             "cptk=cptk.main:main",
@@ -3,6 +3,8 @@ from __future__ import annotations
 import pytest
 from slugify import slugify
 
+import cptk.constants
+
 from .utils import Dummy
 from .utils import EasyDirectory
 
@@ -16,3 +18,11 @@ def tempdir(request, tmpdir_factory):
 @pytest.fixture
 def dummy():
     return Dummy()
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(monkeypatch, tmp_path_factory):
+    """ Keeps the user-wide caches of cptk isolated between tests. """
+    path = tmp_path_factory.mktemp('cache')
+    monkeypatch.setenv(cptk.constants.CACHE_DIR_ENV, str(path))
+    return path
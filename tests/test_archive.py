@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import json
+import os
+import shutil
+from typing import TYPE_CHECKING
+from unittest import mock
+
+import pytest
+
+import cptk.constants
+from cptk.core.archive import PageArchive
+from cptk.core.archive import RecordingTransport
+from cptk.core.archive import ReplayTransport
+from cptk.core.archive import transport_from_env
+from cptk.core.fetcher import Fetcher
+from cptk.core.transport import Transport
+from cptk.exceptions import FetchError
+from .test_pages import PAGES_BASEPATH
+from .test_pages import WEBSITES
+from .utils.pages import regenerate
+
+if TYPE_CHECKING:
+    from .utils import EasyDirectory
+
+CASE = os.path.join(PAGES_BASEPATH, 'kattis', 'hello.json')
+URL = 'https://open.kattis.com/problems/hello'
+
+
+def response(url: str, content: bytes) -> mock.Mock:
+    return mock.Mock(
+        url=url, status_code=200,
+        headers={'Content-Type': 'text/html'}, content=content,
+    )
+
+
+@pytest.fixture
+def archive(tempdir: EasyDirectory) -> PageArchive:
+    with open(CASE.replace('.json', '.html'), 'rb') as file:
+        page = file.read()
+
+    archive = PageArchive(tempdir.join('pages.zip'))
+    archive.store(URL, response(URL + '/', page))
+    return archive
+
+
+class TestPageArchive:
+
+    def test_roundtrip(self, archive: PageArchive):
+        res = archive.load(URL)
+        assert res.url == URL + '/'
+        assert res.status_code == 200
+        assert res.headers == {'Content-Type': 'text/html'}
+        assert 'Hello World!' in res.text
+        assert archive.urls() == [URL]
+
+    def test_latest_version_wins(self, archive: PageArchive):
+        archive.store(URL, response(URL, b'new'))
+        assert archive.load(URL).content == b'new'
+        assert archive.urls() == [URL]
+
+    def test_missing_page(self, archive: PageArchive):
+        with pytest.raises(FetchError):
+            archive.load('https://open.kattis.com/problems/missing')
+
+    def test_recording(self, tempdir: EasyDirectory):
+        archive = PageArchive(tempdir.join('record', 'pages.zip'))
+        transport = RecordingTransport(archive)
+        with mock.patch.object(
+            transport.session, 'get',
+            return_value=response(URL, b'page'),
+        ):
+            transport.get(URL)
+        assert archive.load(URL).content == b'page'
+
+    def test_replay_offline(self, archive: PageArchive):
+        fetcher = Fetcher(ReplayTransport(archive))
+        with mock.patch('requests.Session.request') as request:
+            problem = fetcher.page_to_problem(fetcher.to_page(URL))
+        request.assert_not_called()
+        assert problem.name == 'Hello World!'
+
+    def test_transport_from_env(self, tempdir: EasyDirectory):
+        path = tempdir.join('pages.zip')
+        env = {
+            cptk.constants.RECORD_ENV: '',
+            cptk.constants.REPLAY_ENV: '',
+        }
+
+        with mock.patch.dict(os.environ, env):
+            assert type(transport_from_env()) is Transport
+            os.environ[cptk.constants.RECORD_ENV] = path
+            assert isinstance(transport_from_env(), RecordingTransport)
+            os.environ[cptk.constants.REPLAY_ENV] = path
+            assert isinstance(transport_from_env(), ReplayTransport)
+
+    def test_regenerate_pages(self, archive: PageArchive, tempdir: EasyDirectory):
+        basepath = tempdir.join('pages')
+        shutil.copytree(
+            os.path.join(PAGES_BASEPATH, 'kattis'),
+            os.path.join(basepath, 'kattis'),
+        )
+
+        with open(CASE, encoding='utf8') as file:
+            expected = json.load(file)['expected']
+
+        updated = regenerate(archive, WEBSITES, basepath)
+        assert updated == [os.path.join(basepath, 'kattis', 'hello.json')]
+
+        with open(updated[0], encoding='utf8') as file:
+            assert json.load(file)['expected'] == expected
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import os
+from dataclasses import replace
 from typing import TYPE_CHECKING
 from unittest import mock
 
@@ -18,6 +19,9 @@ from cptk.local.project import LocalProject
 from cptk.local.problem import LocalProblem
 from cptk.core.templates import DEFAULT_TEMPLATES
 from cptk.core.templates import Template
+from cptk.exceptions import FetchError
+from cptk.exceptions import PreprocessFileError
+from cptk.exceptions import PreprocessFilesError
 
 
 HERE = os.path.dirname(__file__)
@@ -54,6 +58,123 @@ class TestProblemClone:
             data = file.read()
         assert data == f'{slugify(problem.website.name)}\n{problem.name}'
 
+    def test_clone_static_files(self, tempdir: EasyDirectory, dummy: Dummy):
+        proj = LocalProject.init(tempdir.path, TEMPLATE)
+        proj.config.clone.path = 'clone'
+        proj.config.clone.template = tempdir.join('template')
+        proj.config.clone.static = ['lib/**']
+
+        lib = tempdir.create('{{ not rendered }}', 'template', 'lib', 'a.h')
+        tempdir.create('{{ problem.name }}', 'template', 'main.txt')
+
+        prob = proj.clone_problem(dummy.get_dummy_problem())
+
+        cloned = os.path.join(prob.location, 'lib', 'a.h')
+        assert os.path.samefile(lib, cloned)
+        with open(cloned) as file:
+            assert file.read() == '{{ not rendered }}'
+
+        main = os.path.join(prob.location, 'main.txt')
+        assert not os.path.samefile(tempdir.join('template', 'main.txt'), main)
+        with open(main) as file:
+            assert file.read() == dummy.get_dummy_problem().name
+
+    @pytest.fixture
+    def templated(self, tempdir: EasyDirectory) -> LocalProject:
+        proj = LocalProject.init(tempdir.path, TEMPLATE)
+        proj.config.clone.path = 'clone'
+        proj.config.clone.template = tempdir.join('template')
+        tempdir.create('{{ problem.name }}', 'template', '{{ user }}.txt')
+        tempdir.create('plain', 'template', 'plain.txt')
+        tempdir.create('static', 'template', 'new.txt')
+        return proj
+
+    def test_plan_clone(
+        self,
+        templated: LocalProject,
+        tempdir: EasyDirectory,
+        dummy: Dummy,
+    ):
+        tempdir.create('old', 'clone', 'User.txt')
+        tempdir.create('plain', 'clone', 'plain.txt')
+
+        plan = templated.plan_clone(dummy.get_dummy_problem())
+        assert plan.dst == tempdir.join('clone')
+        assert plan.new == ['new.txt']
+        assert plan.overwritten == ['User.txt']
+        assert plan.unchanged == ['plain.txt']
+
+        # Nothing is written by the plan.
+        assert sorted(os.listdir(tempdir.join('clone'))) == [
+            'User.txt', 'plain.txt',
+        ]
+
+    def test_clone_unchanged(
+        self,
+        templated: LocalProject,
+        tempdir: EasyDirectory,
+        dummy: Dummy,
+    ):
+        templated.clone_problem(dummy.get_dummy_problem())
+        os.utime(tempdir.join('clone', 'User.txt'), ns=(0, 0))
+
+        with mock.patch('cptk.core.system.System.confirm') as confirm:
+            templated.clone_problem(dummy.get_dummy_problem())
+
+        confirm.assert_not_called()
+        assert os.stat(tempdir.join('clone', 'User.txt')).st_mtime_ns == 0
+
+    def test_clone_overwrite(
+        self,
+        templated: LocalProject,
+        tempdir: EasyDirectory,
+        dummy: Dummy,
+    ):
+        tempdir.create('old', 'clone', 'User.txt')
+
+        with mock.patch(
+            'cptk.core.system.System.confirm',
+            return_value=True,
+        ) as confirm:
+            templated.clone_problem(dummy.get_dummy_problem())
+
+        confirm.assert_called_once()
+        with open(tempdir.join('clone', 'User.txt')) as file:
+            assert file.read() == dummy.get_dummy_problem().name
+
+    def test_clone_error_writes_nothing(
+        self,
+        templated: LocalProject,
+        tempdir: EasyDirectory,
+        dummy: Dummy,
+    ):
+        tempdir.create('{{ invalid }}', 'template', 'invalid.txt')
+
+        with pytest.raises(PreprocessFileError):
+            templated.clone_problem(dummy.get_dummy_problem())
+
+        assert not os.path.exists(tempdir.join('clone'))
+
+    def test_clone_name_errors_collected(
+        self,
+        templated: LocalProject,
+        tempdir: EasyDirectory,
+        dummy: Dummy,
+    ):
+        tempdir.create('', 'template', '{{ invalid }}', 'a.txt')
+        tempdir.create('', 'template', '{{ other }}.txt')
+        tempdir.create('{{ third }}', 'template', 'b.txt')
+
+        with pytest.raises(PreprocessFilesError) as info:
+            templated.clone_problem(dummy.get_dummy_problem())
+
+        assert [str(err).split(':')[0] for err in info.value.errors] == [
+            'In ' + tempdir.join('template', '{{ invalid }}'),
+            'In ' + tempdir.join('template', '{{ other }}.txt'),
+            'In ' + tempdir.join('template', 'b.txt'),
+        ]
+        assert not os.path.exists(tempdir.join('clone'))
+
     @classmethod
     def _compare_files(cls, src: str, dst: str) -> None:
         with open(src) as file:
@@ -131,3 +252,96 @@ class TestProblemClone:
         prob = proj.clone_problem(dummy.get_dummy_problem())
         self._assert_equal_dirs(tempdir.join('clone'), expected)
         self._assert_valid_problem(prob.location)
+
+
+class TestBatchClone:
+
+    @staticmethod
+    def _problems(dummy: Dummy) -> dict[str, cptk.scrape.Problem]:
+        problem = dummy.get_dummy_problem()
+        return {
+            f'{problem.url}/{i}': replace(problem, name=f'Problem {i}')
+            for i in range(5)
+        }
+
+    def test_clone_urls(self, tempdir: EasyDirectory, dummy: Dummy):
+        problems = self._problems(dummy)
+        proj = LocalProject.init(tempdir.path, TEMPLATE)
+        proj.config.clone.path = '{{problem.name|slug}}'
+
+        with mock.patch.object(
+            LocalProject, '_fetch_problem',
+            side_effect=problems.get,
+        ):
+            cloned = proj.clone_urls(list(problems) * 2, jobs=3)
+
+        assert len(cloned) == len(problems)
+        for problem in problems.values():
+            assert LocalProblem.is_problem(tempdir.join(slugify(problem.name)))
+
+    def test_skip_cloned(self, tempdir: EasyDirectory, dummy: Dummy):
+        problems = self._problems(dummy)
+        proj = LocalProject.init(tempdir.path, TEMPLATE)
+        proj.config.clone.path = '{{problem.name|slug}}'
+
+        with mock.patch.object(
+            LocalProject, '_fetch_problem',
+            side_effect=problems.get,
+        ):
+            proj.clone_urls(list(problems)[:2])
+            with mock.patch('cptk.core.system.System.confirm') as confirm:
+                cloned = proj.clone_urls(list(problems))
+
+        confirm.assert_not_called()
+        assert len(cloned) == len(problems) - 2
+
+    def test_failures_are_reported(self, tempdir: EasyDirectory, dummy: Dummy):
+        problems = self._problems(dummy)
+        proj = LocalProject.init(tempdir.path, TEMPLATE)
+        proj.config.clone.path = '{{problem.name|slug}}'
+
+        def fetch(url: str) -> cptk.scrape.Problem:
+            if url.endswith('/0'):
+                raise FetchError(url, 'status code 503')
+            return problems[url]
+
+        with mock.patch.object(LocalProject, '_fetch_problem', side_effect=fetch):
+            cloned = proj.clone_urls(list(problems))
+
+        assert len(cloned) == len(problems) - 1
+
+    def test_unexpected_errors_are_reported(
+        self,
+        tempdir: EasyDirectory,
+        dummy: Dummy,
+    ):
+        problems = self._problems(dummy)
+        proj = LocalProject.init(tempdir.path, TEMPLATE)
+        proj.config.clone.path = '{{problem.name|slug}}'
+
+        def fetch(url: str) -> cptk.scrape.Problem:
+            if url.endswith('/0'):
+                raise ValueError('unexpected page')
+            return problems[url]
+
+        with mock.patch.object(
+            LocalProject, '_fetch_problem', side_effect=fetch,
+        ), mock.patch('cptk.core.system.System.unexpected_error') as error:
+            cloned = proj.clone_urls(list(problems))
+
+        error.assert_called_once()
+        assert len(cloned) == len(problems) - 1
+
+
+def test_clone_stores_metadata(tempdir: EasyDirectory, dummy: Dummy):
+    problem = dummy.get_dummy_problem()
+    proj = LocalProject.init(tempdir.path, TEMPLATE)
+    prob = proj.clone_problem(problem)
+
+    metadata = prob.metadata
+    assert metadata.url == problem.url
+    assert metadata.time_limit == problem.time_limit
+    assert metadata.contest.name == problem.contest.name
+    assert metadata.tests == []
+
+    assert LocalProblem(tempdir.join('missing')).metadata is None
@@ -1,10 +1,13 @@
 from __future__ import annotations
 
 import os
+import time
 from typing import Optional
+from unittest import mock
 
 import pytest
 
+import cptk.core.config
 from cptk.core.config import Configuration
 from cptk.exceptions import ConfigFileNotFound
 from cptk.exceptions import ConfigFileParsingError
@@ -94,6 +97,31 @@ class TestConfiguration:
         with pytest.raises(ConfigFileParsingError):
             Pet.load(path)
 
+    @pytest.mark.parametrize('libyaml', (True, False))
+    def test_yaml_parse_error_position(
+        self,
+        tempdir,
+        monkeypatch,
+        libyaml: bool,
+    ) -> None:
+        if not libyaml:
+            monkeypatch.delattr('yaml.CSafeLoader', raising=False)
+
+        path = tempdir.create('name: doggo\ntype: -: -:\n', 'broken.yaml')
+        with pytest.raises(ConfigFileParsingError) as err:
+            Pet.load(path)
+
+        assert err.value.position == (2, 8)
+        assert 'line 2, column 8' in str(err.value)
+
+    def test_yaml_unprintable_character(self, tempdir) -> None:
+        path = tempdir.create('name: \x07\n', 'broken.yaml')
+
+        with pytest.raises(ConfigFileParsingError) as err:
+            Pet.load(path)
+
+        assert err.value.position is None
+
     @pytest.mark.parametrize(
         'pet', (
             Pet(name='Boogo', age=123, type='Dog'),
@@ -109,3 +137,72 @@ class TestConfiguration:
 
         newpet = Pet.load(path)
         assert pet == newpet
+
+    def test_dump_without_libyaml(self, tempdir, monkeypatch) -> None:
+        pet = Pet(name='Boogo', age=123, type='Dog')
+        expected = pet.yaml()
+
+        monkeypatch.delattr('yaml.CSafeDumper', raising=False)
+        assert pet.yaml() == expected
+
+
+class TestConfigurationCache:
+
+    @staticmethod
+    def create(tempdir, yaml: str, age: int = 10) -> str:
+        """ Creates a configuration file that was modified 'age' seconds ago. """
+
+        path = tempdir.create(yaml, 'pet.yaml')
+        mtime = time.time_ns() - age * 1_000_000_000
+        os.utime(path, ns=(mtime, mtime))
+        return path
+
+    @staticmethod
+    def load_without_parsing(path: str) -> Pet:
+        with mock.patch(
+            'cptk.core.config.load_yaml',
+            side_effect=AssertionError,
+        ) as load:
+            pet = Pet.load(path)
+        assert not load.called
+        return pet
+
+    def test_memory_cache(self, tempdir) -> None:
+        path = self.create(tempdir, 'name: Shocko\nage: 4\n')
+
+        first = Pet.load(path)
+        second = self.load_without_parsing(path)
+        assert first == second
+
+        # Each load returns a copy that can be modified.
+        second.age = 5
+        assert self.load_without_parsing(path).age == 4
+
+    def test_persistent_cache(self, tempdir) -> None:
+        path = self.create(tempdir, 'name: Shocko\nage: 4\n')
+
+        first = Pet.load(path)
+        cptk.core.config._cache.clear()
+        assert self.load_without_parsing(path) == first
+
+    def test_modified_file(self, tempdir) -> None:
+        path = self.create(tempdir, 'name: Shocko\nage: 4\n', age=20)
+        assert Pet.load(path).age == 4
+
+        path = self.create(tempdir, 'name: Shocko\nage: 5\n', age=10)
+        assert Pet.load(path).age == 5
+
+    def test_racy_file(self, tempdir) -> None:
+        path = self.create(tempdir, 'name: Shocko\nage: 4\n', age=0)
+        Pet.load(path)
+
+        data = {'name': 'a', 'age': 1}
+        with mock.patch('cptk.core.config.load_yaml', return_value=data):
+            assert Pet.load(path).age == 1
+
+    def test_dump_invalidates(self, tempdir) -> None:
+        path = self.create(tempdir, 'name: Shocko\nage: 4\n')
+        Pet.load(path)
+
+        Pet(name='Shocko', age=5).dump(path)
+        assert Pet.load(path).age == 5
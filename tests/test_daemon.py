@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import os
+import socket
+import stat
+import subprocess
+import sys
+import threading
+import time
+from typing import TYPE_CHECKING
+from unittest import mock
+
+import pytest
+
+import cptk.constants
+from cptk.core import client
+from cptk.core.daemon import Daemon
+from cptk.core.templates import DEFAULT_TEMPLATES
+
+if TYPE_CHECKING:
+    from .utils import EasyDirectory
+
+
+pytestmark = pytest.mark.skipif(
+    not client.supported(),
+    reason='Requires Unix domain sockets',
+)
+
+
+def run_cptk(*args: str, cwd: str, env: dict) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, '-m', 'cptk', *args],
+        cwd=cwd, env=env, encoding='utf8',
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        check=False, timeout=5,
+    )
+
+
+class DaemonProcess:
+    """ A daemon that listens on a temporary socket. """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.env = dict(os.environ)
+        self.env.pop(cptk.constants.NO_DAEMON_ENV, None)
+        self.env[cptk.constants.DAEMON_SOCKET_ENV] = path
+
+        self.proc = subprocess.Popen(
+            [sys.executable, '-m', 'cptk', '-v', 'daemon', '--idle', '30'],
+            env=self.env, encoding='utf8',
+            stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+        )
+
+        deadline = time.monotonic() + 5
+        while not os.path.exists(path):
+            assert self.proc.poll() is None and time.monotonic() < deadline
+            time.sleep(0.05)
+
+    def stop(self) -> str:
+        """ Stops the daemon and returns its log. """
+
+        res = run_cptk('daemon', '--stop', cwd=os.getcwd(), env=self.env)
+        assert res.returncode == 0
+
+        log, _ = self.proc.communicate(timeout=5)
+        assert self.proc.returncode == 0
+        assert not os.path.exists(self.path)
+        return log
+
+
+@pytest.fixture
+def daemon(tmp_path_factory):
+    path = os.path.join(tmp_path_factory.mktemp('daemon'), 'cptk.sock')
+    daemon = DaemonProcess(path)
+    yield daemon
+
+    if daemon.proc.poll() is None:
+        daemon.proc.kill()
+        daemon.proc.communicate()
+
+
+class TestDaemon:
+
+    def test_forwards_command(self, tempdir: EasyDirectory, daemon):
+        template = DEFAULT_TEMPLATES[0].uid
+        res = run_cptk('init', template, cwd=tempdir.path, env=daemon.env)
+
+        assert res.returncode == 0
+        assert os.path.isfile(tempdir.join(cptk.constants.PROJECT_FILE))
+        assert f"Running 'init {template}'" in daemon.stop()
+
+    def test_forwards_output_and_code(self, tempdir: EasyDirectory, daemon):
+        res = run_cptk('--version', cwd=tempdir.path, env=daemon.env)
+        assert res.returncode == 0
+        assert cptk.__version__ in res.stdout
+
+        res = run_cptk('move', cwd=tempdir.path, env=daemon.env)
+        assert res.returncode == 2
+        assert 'usage' in res.stderr
+
+        log = daemon.stop()
+        assert "Running '--version'" in log
+        assert "Running 'move'" in log
+        assert 'usage' not in log
+
+    def test_falls_back_without_daemon(self, tempdir: EasyDirectory):
+        env = dict(os.environ)
+        env[cptk.constants.DAEMON_SOCKET_ENV] = tempdir.join('missing.sock')
+
+        res = run_cptk('--version', cwd=tempdir.path, env=env)
+        assert res.returncode == 0
+        assert cptk.__version__ in res.stdout
+
+
+class TestClient:
+
+    @pytest.fixture
+    def server(self, tempdir: EasyDirectory):
+        path = tempdir.join('private', 'cptk.sock')
+        assert client.private_dir(path)
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(path)
+        server.listen()
+        yield server
+        server.close()
+
+    @pytest.fixture
+    def listening(self, server: socket.socket) -> str:
+        return server.getsockname()
+
+    def test_default_path(self, monkeypatch, tempdir: EasyDirectory):
+        monkeypatch.delenv(cptk.constants.DAEMON_SOCKET_ENV, raising=False)
+        monkeypatch.setenv('XDG_RUNTIME_DIR', str(tempdir.path))
+
+        path = client.socket_path()
+        assert os.path.dirname(path) == tempdir.join(f'cptk-{os.getuid()}')
+
+        assert client.private_dir(path)
+        assert stat.S_IMODE(os.stat(os.path.dirname(path)).st_mode) == 0o700
+
+    def test_connects(self, listening: str):
+        sock = client.connect(listening)
+        assert sock is not None
+        sock.close()
+
+    def test_shared_directory(self, listening: str):
+        os.chmod(os.path.dirname(listening), 0o777)
+        assert client.connect(listening) is None
+        assert not client.private_dir(listening)
+
+    def test_other_owner(self, listening: str):
+        with mock.patch('os.getuid', return_value=os.getuid() + 1):
+            assert client.connect(listening) is None
+
+    def test_other_peer(self, listening: str):
+        with mock.patch.object(client, 'peer_uid', return_value=-1):
+            assert client.connect(listening) is None
+
+    def test_busy_runs_locally(
+        self,
+        monkeypatch,
+        server: socket.socket,
+        listening: str,
+    ):
+        monkeypatch.delenv(cptk.constants.NO_DAEMON_ENV, raising=False)
+        monkeypatch.setenv(cptk.constants.DAEMON_SOCKET_ENV, listening)
+
+        daemon = Daemon(listening)
+        daemon._running = True
+        daemon._busy.acquire()  # another command is running
+
+        def serve():
+            conn, _ = server.accept()
+            with conn:
+                daemon._handle(conn)
+
+        thread = threading.Thread(target=serve)
+        thread.start()
+        assert client.forward(['--version']) is None
+        thread.join(timeout=5)
+        assert daemon._requests.empty()
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import io
+from unittest import mock
+
+import pytest
+
+from cptk.local.diff import find_mismatch
+
+
+def mismatch(expected: str, actual: str):
+    return find_mismatch(io.StringIO(expected), io.StringIO(actual))
+
+
+@pytest.mark.parametrize('output', ('', '1\n', '1 2 3\n4 5 6\n', 'no newline'))
+def test_equal(output: str):
+    assert mismatch(output, output) is None
+
+
+@pytest.mark.parametrize(
+    'expected, actual, message', (
+        (
+            '1 2 3\n4 5 6\n', '1 2 3\n4 7 6\n',
+            "line 2, token 2: expected '5', got '7'",
+        ),
+        (
+            'abc\n', 'abd\n',
+            "line 1, token 1: expected 'abc', got 'abd'",
+        ),
+        (
+            '1 2\n3\n', '1 2\n',
+            "line 2, token 1: expected '3', got the end of the output",
+        ),
+        (
+            '1 2\n', '1 2\n3\n',
+            "line 2, token 1: expected the end of the output, got '3'",
+        ),
+        (
+            '1 2\n', '1 2 \n',
+            "line 1, token 2: expected the end of the line, got ' '",
+        ),
+        (
+            'a b\n', 'a b',
+            'line 1, token 2: expected the end of the line, '
+            'got the end of the output',
+        ),
+    ),
+)
+def test_mismatch(expected: str, actual: str, message: str):
+    assert str(mismatch(expected, actual)) == message
+
+
+def test_position():
+    found = mismatch('1\n10 20 30\n', '1\n10 20 31\n')
+    assert (found.line, found.column, found.token) == (2, 8, 3)
+    assert found.context == ('10 20 30', '10 20 31')
+
+
+def test_segments():
+    """ Long lines are compared in segments, but positions are still
+    relative to the whole line. """
+
+    with mock.patch('cptk.local.diff.SEGMENT_SIZE', 4):
+        found = mismatch('10 20 30 40\n', '10 20 30 41\n')
+
+    assert (found.line, found.column, found.token) == (1, 11, 4)
+    assert found.expected == "'40'"
+
+
+def test_context():
+    line = ' '.join(str(n) for n in range(100))
+    found = mismatch(line + '\n', line.replace(' 50 ', ' x ') + '\n')
+
+    expected, actual = found.context
+    assert expected.startswith('...') and expected.endswith('...')
+    assert ' 50 ' in expected and ' x ' in actual
+    assert len(expected) < 80
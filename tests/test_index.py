@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import os
+from dataclasses import replace
+from typing import TYPE_CHECKING
+
+import pytest
+
+import cptk.constants
+from cptk.core.templates import DEFAULT_TEMPLATES
+from cptk.local.index import FAILED
+from cptk.local.index import PASSED
+from cptk.local.index import ProblemIndex
+from cptk.local.project import LocalProject
+
+if TYPE_CHECKING:
+    from .utils import EasyDirectory, Dummy
+
+TEMPLATE = DEFAULT_TEMPLATES[0].uid
+
+
+@pytest.fixture
+def proj(tempdir: EasyDirectory) -> LocalProject:
+    proj = LocalProject.init(tempdir.path, TEMPLATE)
+    proj.config.clone.path = '{{problem.website.name}}/{{problem.name}}'
+    return proj
+
+
+class TestProblemIndex:
+
+    def test_clone_indexed(self, proj: LocalProject, dummy: Dummy):
+        problem = dummy.get_dummy_problem()
+        prob = proj.clone_problem(problem)
+
+        indexed, = proj.index.query()
+        assert indexed.location == prob.location
+        assert indexed.name == problem.name
+        assert indexed.url == problem.url
+        assert indexed.website == problem.website.name
+        assert indexed.contest == problem.contest.name
+        assert indexed.time_limit == problem.time_limit
+        assert indexed.recipes == [prob.name]
+        assert indexed.status is None
+
+    def test_move(self, proj: LocalProject, dummy: Dummy):
+        prob = proj.clone_problem(dummy.get_dummy_problem())
+        other = proj.clone_problem(
+            replace(dummy.get_dummy_problem(), name='Other'),
+        )
+
+        src = os.path.dirname(prob.location)
+        dst = proj.relative('moved')
+        proj.move(src, dst)
+
+        assert [p.location for p in proj.index.query()] == sorted([
+            os.path.join(dst, os.path.basename(prob.location)),
+            os.path.join(dst, os.path.basename(other.location)),
+        ])
+
+    def test_move_prefix(self, tempdir: EasyDirectory):
+        index = ProblemIndex(tempdir.path)
+        index.add(tempdir.join('a'), [None])
+        index.add(tempdir.join('a', 'b'), [None])
+        index.add(tempdir.join('ab'), [None])
+
+        index.move(tempdir.join('a'), tempdir.join('c'))
+        assert [p.location for p in index.query()] == [
+            tempdir.join('ab'),
+            tempdir.join('c'),
+            tempdir.join('c', 'b'),
+        ]
+
+    def test_move_conflict(self, tempdir: EasyDirectory):
+        index = ProblemIndex(tempdir.path)
+        index.add(tempdir.join('a'), ['a'])
+        index.add(tempdir.join('b'), ['b'])  # left from a removed problem
+
+        index.move(tempdir.join('a'), tempdir.join('b'))
+        indexed, = index.query()
+        assert (indexed.location, indexed.recipes) == (tempdir.join('b'), ['a'])
+
+    def test_move_failed(self, tempdir: EasyDirectory):
+        index = ProblemIndex(tempdir.path)
+        index.add(tempdir.join('a'), [None])
+
+        def apply():
+            raise OSError
+
+        with pytest.raises(OSError):
+            index.move(tempdir.join('a'), tempdir.join('b'), apply=apply)
+        assert [p.location for p in index.query()] == [tempdir.join('a')]
+
+    def test_move_into(self, proj: LocalProject, dummy: Dummy):
+        prob = proj.clone_problem(dummy.get_dummy_problem())
+        os.makedirs(proj.relative('moved'))
+
+        proj.move(prob.location, proj.relative('moved'))
+        indexed, = proj.index.query()
+        name = os.path.basename(prob.location)
+        assert indexed.location == proj.relative(os.path.join('moved', name))
+
+    def test_record_test(self, proj: LocalProject, dummy: Dummy):
+        prob = proj.clone_problem(dummy.get_dummy_problem())
+
+        proj.record_test(prob, passed=1, failed=1)
+        indexed, = proj.index.query(status=FAILED)
+        assert (indexed.passed, indexed.failed) == (1, 1)
+
+        proj.record_test(prob, passed=2, failed=0)
+        assert not proj.index.query(status=FAILED)
+        assert proj.index.query(status=PASSED)
+
+    def test_record_unindexed(self, proj: LocalProject, dummy: Dummy):
+        prob = proj.clone_problem(dummy.get_dummy_problem())
+        os.remove(proj.relative(cptk.constants.INDEX_FILE))
+
+        proj.record_test(prob, passed=0, failed=1)
+        indexed, = proj.index.query(status=FAILED)
+        assert indexed.location == prob.location
+        assert indexed.recipes == [prob.name]
+
+    @pytest.mark.parametrize(
+        'text, found', (
+            ('test prob', True),
+            ('codeforces.com/problemset/problem/1', True),
+            ('Test Contest', True),
+            ('test_prob', False),
+            ('%', False),
+        ),
+    )
+    def test_find(self, proj: LocalProject, dummy: Dummy, text, found):
+        proj.clone_problem(dummy.get_dummy_problem())
+        assert bool(proj.index.query(text)) == found
+
+    def test_query_filters(self, proj: LocalProject, dummy: Dummy):
+        proj.clone_problem(dummy.get_dummy_problem())
+
+        assert proj.index.query(website='codeforces')
+        assert not proj.index.query(website='cses')
+        assert proj.index.query(contest='test contest')
+        assert not proj.index.query(contest='other')
+
+    def test_reindex(self, proj: LocalProject, dummy: Dummy):
+        prob = proj.clone_problem(dummy.get_dummy_problem())
+        proj.record_test(prob, passed=2, failed=0)
+        expected = proj.index.query()
+
+        os.remove(proj.relative(cptk.constants.INDEX_FILE))
+        proj.index.add(proj.relative('removed'), [None])
+        proj.index.record_test(proj.relative('removed'), [None], 0, 1)
+        proj.reindex()
+
+        indexed, = proj.index.query()
+        assert indexed.location == prob.location
+        assert indexed.name == expected[0].name
+        assert indexed.status is None
+
+    def test_reindex_keeps_status(self, proj: LocalProject, dummy: Dummy):
+        prob = proj.clone_problem(dummy.get_dummy_problem())
+        proj.record_test(prob, passed=2, failed=0)
+        expected = proj.index.query()
+
+        proj.reindex()
+        assert proj.index.query() == expected
@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import os
+from typing import TYPE_CHECKING
+from unittest import mock
+
+import pytest
+
+from cptk.core.manifest import get_manifest
+from cptk.core.manifest import inspect_file
+from cptk.core.manifest import ManifestEntry
+from cptk.core.manifest import TemplateManifest
+
+if TYPE_CHECKING:
+    from .utils import EasyDirectory
+
+
+def create_binary(tempdir: EasyDirectory, *path: str) -> str:
+    path = tempdir.create('', *path)
+    with open(path, 'wb') as file:
+        file.write(b'\x7fELF\0\xff\xfe{{')
+    return path
+
+
+class TestTemplateManifest:
+
+    @pytest.mark.parametrize(
+        'data, expected', (
+            ('{{ problem.name }}\n', ManifestEntry(False, markers=True)),
+            ('{% if x %}{% endif %}', ManifestEntry(False, markers=True)),
+            ('{# comment #}', ManifestEntry(False, markers=True)),
+            ('int main() {}', ManifestEntry(False, verbatim=True)),
+            ('int main() {}\n', ManifestEntry(False)),
+        ),
+    )
+    def test_inspect(self, tempdir: EasyDirectory, data, expected):
+        assert inspect_file(tempdir.create(data, 'file.cpp')) == expected
+
+    def test_inspect_name(self, tempdir: EasyDirectory):
+        path = tempdir.create('', '{{ problem.name }}.cpp')
+        assert inspect_file(path) == ManifestEntry(True, verbatim=True)
+
+    def test_inspect_binary(self, tempdir: EasyDirectory):
+        path = create_binary(tempdir, 'lib.a')
+        assert inspect_file(path) == ManifestEntry(False, verbatim=True)
+
+    def test_entries(self, tempdir: EasyDirectory):
+        tempdir.create('{{ x }}', 'template', 'a.txt')
+        tempdir.create('', 'template', 'lib', 'b.h')
+
+        manifest = TemplateManifest(tempdir.join('template'))
+        manifest.update()
+
+        assert set(manifest.entries) == {'a.txt', os.path.join('lib', 'b.h')}
+        assert manifest.get('a.txt').markers
+        assert manifest.get('missing') is None
+
+    def test_updated(self, tempdir: EasyDirectory):
+        path = tempdir.create('plain', 'template', 'a.txt')
+        manifest = TemplateManifest(tempdir.join('template'))
+        manifest.update()
+        assert not manifest.get('a.txt').markers
+
+        tempdir.create('{{ x }}', 'template', 'a.txt')
+        os.utime(path, ns=(0, 0))
+        tempdir.create('', 'template', 'b.txt')
+        manifest.update()
+
+        assert manifest.get('a.txt').markers
+        assert manifest.get('b.txt') is not None
+
+        os.remove(path)
+        manifest.update()
+        assert manifest.get('a.txt') is None
+
+    def test_racy(self, tempdir: EasyDirectory):
+        """ Files that were modified very recently can be modified again
+        without changing their stamp, so they are inspected on every
+        update. """
+
+        path = tempdir.create('plain', 'template', 'a.txt')
+        manifest = TemplateManifest(tempdir.join('template'))
+        manifest.update()
+
+        stat = os.stat(path)
+        tempdir.create('{{x}}', 'template', 'a.txt')
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        manifest.update()
+        assert manifest.get('a.txt').markers
+
+    def test_persistent(self, tempdir: EasyDirectory):
+        path = tempdir.create('{{ x }}', 'template', 'a.txt')
+        os.utime(path, ns=(0, 0))
+        cache = tempdir.join('cache', 'manifest.json')
+
+        TemplateManifest(tempdir.join('template'), cache).update()
+        assert os.path.isfile(cache)
+
+        manifest = TemplateManifest(tempdir.join('template'), cache)
+        with mock.patch('cptk.core.manifest.inspect_file') as inspect:
+            manifest.update()
+
+        inspect.assert_not_called()
+        assert manifest.get('a.txt').markers
+
+    def test_corrupted_cache(self, tempdir: EasyDirectory):
+        tempdir.create('{{ x }}', 'template', 'a.txt')
+        cache = tempdir.create('{"version": 1, "entries": 5}', 'manifest.json')
+
+        manifest = TemplateManifest(tempdir.join('template'), cache)
+        manifest.update()
+        assert manifest.get('a.txt').markers
+
+    def test_shared(self, tempdir: EasyDirectory):
+        tempdir.create('', 'template', 'a.txt')
+        first = get_manifest(tempdir.join('template'), tempdir.join('cache'))
+        second = get_manifest(tempdir.join('template'), tempdir.join('cache'))
+        assert first is second
@@ -1,7 +1,9 @@
 from __future__ import annotations
 
 import os
+import random
 from typing import TYPE_CHECKING
+from unittest import mock
 
 
 if TYPE_CHECKING:
@@ -10,6 +12,7 @@ if TYPE_CHECKING:
 import pytest
 
 import cptk.constants
+from cptk.local.moves import MoveTable
 from cptk.local.project import LocalProject
 from cptk.exceptions import InvalidMoveDest
 from cptk.local.project import InvalidMoveSource
@@ -18,6 +21,15 @@ from cptk.core.templates import DEFAULT_TEMPLATES
 TEMPLATE = DEFAULT_TEMPLATES[0].uid
 
 
+def apply_sequentially(path: str, moves: list[tuple[str, str]]) -> str:
+    """ The reference implementation of a sequence of moves. """
+
+    for src, dst in moves:
+        if os.path.commonpath([src, path]) == src:
+            path = os.path.normpath(os.path.join(dst, os.path.relpath(path, src)))
+    return path
+
+
 class TestMove:
 
     @pytest.mark.parametrize(
@@ -121,3 +133,106 @@ class TestMove:
 
         with pytest.raises(InvalidMoveSource):
             proj.move(src, dst)
+
+    def test_move_root_itself(self, tempdir: EasyDirectory):
+        proj = LocalProject.init(tempdir.join('project'), TEMPLATE)
+
+        with pytest.raises(InvalidMoveSource):
+            proj.move(proj.location, proj.relative('inner'))
+
+    def test_protected_check_doesnt_walk(
+        self,
+        tempdir: EasyDirectory,
+        dummy: Dummy,
+    ):
+        proj = LocalProject.init(tempdir.path, TEMPLATE)
+        proj.config.clone.path = 'clone'
+        prob = proj.clone_problem(dummy.get_dummy_problem())
+
+        with mock.patch('os.walk') as walk, mock.patch('os.scandir') as scan:
+            proj.move(prob.location, proj.relative('moved'))
+        walk.assert_not_called()
+        scan.assert_not_called()
+
+
+class TestMoveTable:
+
+    @staticmethod
+    def random_path(rand: random.Random, root: str) -> str:
+        depth = rand.randint(1, 3)
+        return os.path.join(root, *(rand.choice('abc') for _ in range(depth)))
+
+    @pytest.mark.parametrize('seed', range(20))
+    def test_matches_sequential_moves(self, seed: int, tempdir: EasyDirectory):
+        rand = random.Random(seed)
+        moves = [
+            (
+                self.random_path(rand, tempdir.path),
+                self.random_path(rand, tempdir.path),
+            )
+            for _ in range(rand.randint(1, 10))
+        ]
+        table = MoveTable(moves)
+
+        for _ in range(100):
+            path = os.path.join(self.random_path(rand, tempdir.path), 'x')
+            assert table.apply(path) == apply_sequentially(path, moves)
+
+    def test_unaffected_path(self, tempdir: EasyDirectory):
+        table = MoveTable([(tempdir.join('a'), tempdir.join('b'))])
+        path = tempdir.join('ab', '..', 'c')
+        assert table.apply(path) == path
+
+    def test_compacted(self, tempdir: EasyDirectory):
+        moves = [(tempdir.join('a'), tempdir.join('b'))]
+        moves += [(tempdir.join('b'), tempdir.join('a'))] * 1000
+        table = MoveTable(moves)
+
+        assert len(table) == 2
+        assert table.apply(tempdir.join('a', 'x')) == tempdir.join('a', 'x')
+        assert table.apply(tempdir.join('b', 'x')) == tempdir.join('a', 'x')
+
+    def test_cached(self, tempdir: EasyDirectory, dummy: Dummy):
+        proj = LocalProject.init(tempdir.path, TEMPLATE)
+        proj.config.clone.path = 'clone'
+        proj.clone_problem(dummy.get_dummy_problem())
+
+        proj.move(proj.relative('clone'), proj.relative('moved'))
+        with mock.patch.object(LocalProject, '_load_moves') as load:
+            assert proj.move_relative('clone') == proj.relative('moved')
+        load.assert_not_called()
+
+        # The moves file is modified by another process
+        with open(proj.relative(cptk.constants.MOVE_FILE), 'a') as file:
+            file.write('moved::other\n')
+        assert proj.move_relative('clone') == proj.relative('other')
+
+    def test_cached_on_disk(self, tempdir: EasyDirectory, dummy: Dummy):
+        proj = LocalProject.init(tempdir.path, TEMPLATE)
+        proj.config.clone.path = 'clone'
+        proj.clone_problem(dummy.get_dummy_problem())
+        proj.move(proj.relative('clone'), proj.relative('moved'))
+
+        # Another process doesn't compile the moves again
+        with mock.patch.dict('cptk.local.project._move_tables', clear=True), \
+                mock.patch.object(LocalProject, '_load_moves') as load:
+            assert proj.move_relative('clone') == proj.relative('moved')
+        load.assert_not_called()
+
+        with open(proj.relative(cptk.constants.MOVE_FILE), 'a') as file:
+            file.write('moved::other\n')
+        with mock.patch.dict('cptk.local.project._move_tables', clear=True):
+            assert proj.move_relative('clone') == proj.relative('other')
+
+    def test_compose_many(self, tempdir: EasyDirectory):
+        moves = [
+            (tempdir.join('problems', str(n)), tempdir.join('archive', str(n)))
+            for n in range(3000)
+        ]
+        with mock.patch.object(MoveTable, '_trie') as trie:
+            table = MoveTable(moves)
+        trie.assert_not_called()
+
+        assert len(table) == 3000
+        assert table.apply(tempdir.join('problems', '7', 'x')) == \
+            tempdir.join('archive', '7', 'x')
@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import os
+import sys
+import zipfile
+from typing import TYPE_CHECKING
+
+import pytest
+
+import cptk.constants
+import cptk.local.problem
+from cptk.core.chef import Chef
+from cptk.core.templates import DEFAULT_TEMPLATES
+from cptk.exceptions import InvalidTestPackage
+from cptk.local.packages import find_tests
+from cptk.local.packages import import_tests
+from cptk.local.packages import PackagedTest
+from cptk.local.project import LocalProject
+from cptk.local.store import BlobStore
+
+if TYPE_CHECKING:
+    from .utils import EasyDirectory
+
+TEMPLATE = DEFAULT_TEMPLATES[0].uid
+REF = cptk.constants.REF_FILE_SUFFIX
+
+
+def create_package(path: str, entries: dict[str, str]) -> str:
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, data in entries.items():
+            archive.writestr(name, data)
+    return path
+
+
+@pytest.mark.parametrize(
+    'names, expected', (
+        (
+            ['data/sample/1.in', 'data/sample/1.ans',
+             'data/secret/a.in', 'data/secret/a.ans'],
+            [PackagedTest('sample-1', 'data/sample/1.in', 'data/sample/1.ans'),
+             PackagedTest('secret-a', 'data/secret/a.in', 'data/secret/a.ans')],
+        ),
+        (
+            ['tests/', 'tests/01', 'tests/01.a', 'tests/02', 'problem.xml'],
+            [PackagedTest('01', 'tests/01', 'tests/01.a')],
+        ),
+        (
+            ['1.in', '1.out', '2.in', '__MACOSX/1.in', '__MACOSX/1.out'],
+            [PackagedTest('1', '1.in', '1.out')],
+        ),
+        (
+            ['statement.pdf'],
+            [],
+        ),
+    ),
+)
+def test_find_tests(names: list[str], expected: list[PackagedTest]):
+    assert find_tests(names) == expected
+
+
+class TestImportTests:
+
+    ENTRIES = {
+        'tests/01': '1 2\n',
+        'tests/01.a': '3\n',
+        'tests/02': '1 1\n',
+        'tests/02.a': '3\n',
+    }
+
+    def _read(self, path: str) -> str:
+        with open(path) as file:
+            return file.read()
+
+    def test_import(self, tempdir: EasyDirectory):
+        package = create_package(tempdir.join('package.zip'), self.ENTRIES)
+        import_tests(package, tempdir.join('tests'))
+
+        assert sorted(os.listdir(tempdir.join('tests'))) == [
+            '01.in', '01.out', '02.in', '02.out',
+        ]
+        assert self._read(tempdir.join('tests', '01.in')) == '1 2\n'
+        assert self._read(tempdir.join('tests', '02.out')) == '3\n'
+
+    def test_import_into_store(self, tempdir: EasyDirectory):
+        package = create_package(tempdir.join('package.zip'), self.ENTRIES)
+        store = BlobStore(tempdir.path)
+        import_tests(package, tempdir.join('tests'), store=store)
+
+        assert sorted(os.listdir(tempdir.join('tests'))) == [
+            '01.in' + REF, '01.out' + REF, '02.in' + REF, '02.out' + REF,
+        ]
+
+        # Both expected outputs are the same blob.
+        assert self._read(tempdir.join('tests', '01.out' + REF)) == \
+            self._read(tempdir.join('tests', '02.out' + REF))
+
+    def test_import_replaces_old(self, tempdir: EasyDirectory):
+        package = create_package(tempdir.join('package.zip'), self.ENTRIES)
+        tempdir.create('old', 'tests', '01.in' + REF)
+        import_tests(package, tempdir.join('tests'))
+
+        assert not os.path.exists(tempdir.join('tests', '01.in' + REF))
+        assert self._read(tempdir.join('tests', '01.in')) == '1 2\n'
+
+    @pytest.mark.parametrize('entries', ({'a.txt': ''}, None))
+    def test_invalid_package(self, tempdir: EasyDirectory, entries):
+        if entries is None:
+            package = tempdir.create('not a zip', 'package.zip')
+        else:
+            package = create_package(tempdir.join('package.zip'), entries)
+
+        with pytest.raises(InvalidTestPackage):
+            import_tests(package, tempdir.join('tests'))
+
+    @pytest.mark.parametrize('link', (True, False))
+    def test_run_imported(self, tempdir: EasyDirectory, link: bool):
+        proj = LocalProject.init(tempdir.path, TEMPLATE)
+        prob = cptk.local.problem.LocalProblem.init(
+            proj.relative('problem'),
+            cptk.local.problem.Recipe(
+                serve=f'{sys.executable} solution.py',
+                test=cptk.local.problem.TestRecipe(folder='tests'),
+            ),
+        )
+        tempdir.create(
+            'print(sum(map(int, input().split())))',
+            'problem', 'solution.py',
+        )
+
+        package = create_package(tempdir.join('package.zip'), self.ENTRIES)
+        import_tests(package, tempdir.join('problem', 'tests'), link=link)
+
+        assert Chef(prob).run_tests() == (1, 1)
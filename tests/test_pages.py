@@ -19,6 +19,7 @@ if TYPE_CHECKING:
     from typing import Iterator
 
 
+from .utils.pages import saved_timezone
 from cptk.scrape import PageInfo
 from cptk.websites import (
     Codeforces,
@@ -82,6 +83,12 @@ def cases_generator() -> Iterator[PageTestCase]:
             )
 
 
+@pytest.fixture(autouse=True)
+def israel_timezone():
+    with saved_timezone():
+        yield
+
+
 class TestPages:
 
     @pytest.mark.parametrize(
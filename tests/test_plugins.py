@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import os
+import subprocess
+import sys
+from unittest import mock
+
+from cptk.core.plugins import MANIFEST_NAME
+from cptk.core.plugins import WebsiteRegistry
+from cptk.websites import Codeforces
+from cptk.websites import Cses
+from cptk.websites import Kattis
+
+
+class TestWebsiteRegistry:
+
+    def test_for_host(self):
+        registry = WebsiteRegistry()
+        assert isinstance(registry.for_host('codeforces.com'), Codeforces)
+        assert isinstance(registry.for_host('www.codeforces.com'), Codeforces)
+        assert isinstance(registry.for_host('cses.fi'), Cses)
+        assert isinstance(registry.for_host('open.kattis.com'), Kattis)
+        assert registry.for_host('notcodeforces.com') is None
+        assert registry.for_host('example.com') is None
+
+    def test_all(self):
+        websites = WebsiteRegistry().all()
+        assert {type(w) for w in websites} >= {Codeforces, Cses, Kattis}
+
+    def test_manifest_is_cached(self, cache_dir):
+        WebsiteRegistry().manifest
+        assert os.path.isfile(os.path.join(cache_dir, MANIFEST_NAME))
+
+        with mock.patch('cptk.core.plugins._entry_points') as entry_points:
+            registry = WebsiteRegistry()
+            assert isinstance(registry.for_host('cses.fi'), Cses)
+        entry_points.assert_not_called()
+
+    def test_invalid_manifest(self, cache_dir):
+        with open(os.path.join(cache_dir, MANIFEST_NAME), 'w') as file:
+            file.write('{not json')
+        assert isinstance(WebsiteRegistry().for_host('cses.fi'), Cses)
+
+
+def test_commands_do_not_import_scrapers():
+    """ Local commands shouldn't pay for importing the scraping machinery. """
+
+    code = '\n'.join((
+        'import sys',
+        'import cptk.commands, cptk.core.chef, cptk.local.project',
+        'print(sorted(sys.modules))',
+    ))
+
+    res = subprocess.run(
+        [sys.executable, '-c', code],
+        stdout=subprocess.PIPE, check=True, encoding='utf8',
+    )
+
+    for module in ('bs4', 'lxml', 'requests', 'pkg_resources'):
+        assert f"'{module}'" not in res.stdout
+    assert "'cptk.websites" not in res.stdout
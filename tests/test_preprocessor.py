@@ -1,13 +1,19 @@
 from __future__ import annotations
 
 import os
+from dataclasses import replace
 from typing import TYPE_CHECKING
 from unittest import mock
 
 from cptk.core.preprocessor import Preprocessor
+from cptk.core.preprocessor import TemplateCompiler
+from cptk.core.preprocessor import templates_cache_dir
+from cptk.core.templates import DEFAULT_TEMPLATES
 from cptk.exceptions import PreprocessError
 from cptk.exceptions import PreprocessFileError
+from cptk.exceptions import PreprocessFilesError
 from cptk.exceptions import PreprocessNameError
+from cptk.local.project import LocalProject
 
 if TYPE_CHECKING:
     from .utils import Dummy, EasyDirectory
@@ -99,6 +105,132 @@ class TestPreprocessor:
 
         assert actual == template
 
+    @pytest.mark.parametrize(
+        'template, expected', (
+            ('no markers', 'no markers'),
+            ('no markers\n', 'no markers'),
+            ('a\r\nb', 'a\nb'),
+            ('{{ user }}\n', 'User'),
+        ),
+    )
+    def test_files_without_markers(
+        self,
+        template: str,
+        expected: str,
+        tempdir: EasyDirectory,
+        dummy: Dummy,
+    ):
+        """ Files without markers are not rendered, but end up exactly as if
+        they were. """
+
+        path = tempdir.create('', 'file.txt')
+        with open(path, 'wb') as file:
+            file.write(template.encode('utf8'))
+
+        pre = Preprocessor(dummy.get_dummy_problem())
+        with mock.patch.object(pre, 'parse_string', wraps=pre.parse_string) \
+                as parse:
+            pre.parse_file_contents(path)
+
+        assert parse.called == ('{{' in template)
+        with open(path) as file:
+            assert file.read() == expected
+
+    def test_unchanged_not_written(self, tempdir: EasyDirectory, dummy: Dummy):
+        path = tempdir.create('no markers', 'file.txt')
+        os.utime(path, ns=(0, 0))
+
+        Preprocessor(dummy.get_dummy_problem()).parse_file_contents(path)
+        assert os.stat(path).st_mtime_ns == 0
+
+    def test_binary_files(self, tempdir: EasyDirectory, dummy: Dummy):
+        path = tempdir.create('', 'lib.a')
+        with open(path, 'wb') as file:
+            file.write(b'\x7fELF\0\xff{{ user }}')
+
+        pre = Preprocessor(dummy.get_dummy_problem())
+        pre.parse_directory(tempdir.path)
+
+        with open(path, 'rb') as file:
+            assert file.read() == b'\x7fELF\0\xff{{ user }}'
+
+    def test_parse_with_manifest(self, tempdir: EasyDirectory, dummy: Dummy):
+        tempdir.create('{{ user }}', 'template', '{{ user }}.txt')
+        tempdir.create('plain', 'template', 'folder', 'plain.txt')
+
+        pre = Preprocessor(dummy.get_dummy_problem())
+        with mock.patch('cptk.core.preprocessor.open', create=True,
+                        side_effect=open) as opened:
+            plan = pre.plan_directory(
+                tempdir.join('template'), tempdir.join('dst'),
+            )
+
+        # Verbatim files are not opened at all.
+        opened_paths = [call.args[0] for call in opened.call_args_list]
+        assert opened_paths == [tempdir.join('template', '{{ user }}.txt')]
+
+        plan.apply()
+        with open(tempdir.join('dst', 'User.txt')) as file:
+            assert file.read() == 'User'
+        with open(tempdir.join('dst', 'folder', 'plain.txt')) as file:
+            assert file.read() == 'plain'
+
+    @pytest.mark.parametrize('jobs', (1, 4))
+    def test_parse_many_files(
+        self,
+        jobs: int,
+        tempdir: EasyDirectory,
+        dummy: Dummy,
+    ):
+        for n in range(20):
+            tempdir.create(f'{n} {{{{ user }}}}', f'folder{n % 3}', f'{n}.txt')
+
+        pre = Preprocessor(dummy.get_dummy_problem())
+        pre.parse_directory(tempdir.path, jobs=jobs)
+
+        for n in range(20):
+            with open(tempdir.join(f'folder{n % 3}', f'{n}.txt')) as file:
+                assert file.read() == f'{n} User'
+
+    @pytest.mark.parametrize('jobs', (1, 4))
+    def test_errors_collected(
+        self,
+        jobs: int,
+        tempdir: EasyDirectory,
+        dummy: Dummy,
+    ):
+        for n in range(10):
+            tempdir.create('{{ user }}', f'{n}.txt')
+        tempdir.create('{{ invalid }}', 'a.txt')
+        tempdir.create('{{ other }}', 'b.txt')
+
+        pre = Preprocessor(dummy.get_dummy_problem())
+        with pytest.raises(PreprocessFileError) as info:
+            pre.parse_directory(tempdir.path, jobs=jobs)
+
+        assert isinstance(info.value, PreprocessFilesError)
+        assert [err.path for err in info.value.errors] == [
+            tempdir.join('a.txt'),
+            tempdir.join('b.txt'),
+        ]
+        assert "'invalid' is undefined" in str(info.value)
+        assert "'other' is undefined" in str(info.value)
+
+        # Other files are rendered regardless of the errors.
+        with open(tempdir.join('9.txt')) as file:
+            assert file.read() == 'User'
+
+    def test_single_error(self, tempdir: EasyDirectory, dummy: Dummy):
+        tempdir.create('{{ user }}', 'a.txt')
+        tempdir.create('{{ invalid }}', 'b.txt')
+
+        pre = Preprocessor(dummy.get_dummy_problem())
+        with pytest.raises(PreprocessFileError) as info:
+            pre.parse_directory(tempdir.path)
+
+        assert not isinstance(info.value, PreprocessFilesError)
+        assert info.value.path == tempdir.join('b.txt')
+
     @pytest.mark.parametrize(
         'name', (
             '{{ invalid }}',
@@ -114,3 +246,74 @@ class TestPreprocessor:
         tempdir.create('', name)
         with pytest.raises(PreprocessNameError):
             pre.parse_directory(tempdir.path)
+
+    def test_name_errors_collected(self, tempdir: EasyDirectory, dummy: Dummy):
+        tempdir.create('', '{{ invalid }}', 'a.txt')
+        tempdir.create('', '{{ other }}.txt')
+        tempdir.create('{{ third }}', 'b.txt')
+        tempdir.create('{{ user }}', 'c.txt')
+
+        pre = Preprocessor(dummy.get_dummy_problem())
+        with pytest.raises(PreprocessFilesError) as info:
+            pre.parse_directory(tempdir.path)
+
+        names, path = info.value.errors[:2], info.value.errors[2].path
+        assert all(isinstance(err, PreprocessNameError) for err in names)
+        assert [err.name for err in names] == [
+            tempdir.join('{{ invalid }}'),
+            tempdir.join('{{ other }}.txt'),
+        ]
+        assert path == tempdir.join('b.txt')
+
+        with open(tempdir.join('c.txt')) as file:
+            assert file.read() == 'User'
+
+
+class TestTemplateCompiler:
+
+    def test_compiled_once(self):
+        compiler = TemplateCompiler()
+        with mock.patch.object(
+            compiler.env, 'compile', wraps=compiler.env.compile,
+        ) as compile:
+            first = compiler.compile('{{ problem.name }}')
+            second = compiler.compile('{{ problem.name }}')
+
+        assert first is second
+        compile.assert_called_once()
+
+    def test_shared_between_problems(self, dummy: Dummy):
+        problem = dummy.get_dummy_problem()
+        other = replace(problem, name='Other Problem')
+
+        first = Preprocessor(problem)
+        second = Preprocessor(other)
+        assert first._compiler is second._compiler
+
+        assert first.parse_string('{{ problem.name }}') == problem.name
+        assert second.parse_string('{{ problem.name }}') == 'Other Problem'
+
+    def test_bytecode_cache(self, tempdir: EasyDirectory):
+        TemplateCompiler(tempdir.path).compile('{{ "a b" | slug }}')
+        assert os.listdir(tempdir.path)
+
+        compiler = TemplateCompiler(tempdir.path)
+        with mock.patch.object(compiler.env, 'compile') as compile:
+            template = compiler.compile('{{ "a b" | slug }}')
+
+        compile.assert_not_called()
+        assert template.render() == 'a-b'
+
+    def test_corrupted_bytecode_cache(self, tempdir: EasyDirectory):
+        TemplateCompiler(tempdir.path).compile('{{ 1 + 1 }}')
+        for name in os.listdir(tempdir.path):
+            tempdir.create('corrupted', name)
+
+        template = TemplateCompiler(tempdir.path).compile('{{ 1 + 1 }}')
+        assert template.render() == '2'
+
+    def test_project_cache(self, tempdir: EasyDirectory, dummy: Dummy):
+        proj = LocalProject.init(tempdir.path, DEFAULT_TEMPLATES[0].uid)
+        proj.clone_problem(dummy.get_dummy_problem())
+        assert os.listdir(templates_cache_dir())
+        assert not os.path.exists(proj.relative('.cptk/stayaway/templates'))
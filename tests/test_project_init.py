@@ -69,3 +69,67 @@ def test_overwrite_existing_project(
     ) as res:
         LocalProject.init(tempdir.path, template=new_template_uid)
     res.assert_called_once()
+
+
+class TestFindProject:
+
+    @pytest.fixture
+    def proj(self, tempdir: EasyDirectory) -> LocalProject:
+        os.makedirs(tempdir.join('a', 'b'))
+        return LocalProject.init(tempdir.path, 'py')
+
+    def test_cached(self, tempdir: EasyDirectory, proj: LocalProject):
+        location = tempdir.join('a', 'b')
+        assert LocalProject.find(location) == proj
+
+        with mock.patch.object(LocalProject, '_search') as search:
+            assert LocalProject.find(location) == proj
+        search.assert_not_called()
+
+    def test_cache_invalidated(self, tempdir: EasyDirectory, proj: LocalProject):
+        location = tempdir.join('a', 'b')
+        assert LocalProject.find(location) == proj
+
+        os.remove(tempdir.join(cptk.constants.PROJECT_FILE))
+        with pytest.raises(ProjectNotFound):
+            LocalProject.find(location)
+
+    def test_nested_project(self, tempdir: EasyDirectory, proj: LocalProject):
+        location = tempdir.join('a', 'b')
+        assert LocalProject.find(location) == proj
+
+        nested = LocalProject.init(tempdir.join('a'), 'py')
+        assert LocalProject.find(location) == nested
+
+    def test_environment_variable(
+        self,
+        tempdir: EasyDirectory,
+        proj: LocalProject,
+        monkeypatch,
+    ):
+        monkeypatch.setenv(cptk.constants.PROJECT_ENV, tempdir.path)
+        with mock.patch.object(LocalProject, '_search') as search:
+            assert LocalProject.find(tempdir.join('a', 'b')) == proj
+        search.assert_not_called()
+
+    def test_filesystem_boundary(
+        self,
+        tempdir: EasyDirectory,
+        proj: LocalProject,
+    ):
+        mount = tempdir.join('a')
+        real_stat = os.stat
+
+        def stat(path, *args, **kwargs):
+            res = real_stat(path, *args, **kwargs)
+            if os.path.commonpath([mount, os.path.abspath(path)]) != mount:
+                return res
+
+            # Pretend that 'a' is a mount point of another filesystem
+            values = list(res)
+            values[2] = res.st_dev + 1  # st_dev
+            return os.stat_result(values)
+
+        with mock.patch('os.stat', stat):
+            with pytest.raises(ProjectNotFound):
+                LocalProject.find(tempdir.join('a', 'b'))
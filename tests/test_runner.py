@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import io
 import sys
 from dataclasses import dataclass
 from typing import TYPE_CHECKING
@@ -92,3 +93,48 @@ class TestRunner:
         assert result.code != 0
         assert result.timed_out
         self._compare_results(case, result)
+
+    @pytest.mark.parametrize('stream', (True, False))
+    def test_large_input(self, stream: bool, tempdir: EasyDirectory) -> None:
+        """ The input is written while the process runs, and is closed when
+        it ends, so processes can read it until EOF. """
+
+        data = 'x' * (1 << 20)
+        code = 'import sys\nprint(len(sys.stdin.read()))'
+        filepath = tempdir.create(code, 'file.py')
+
+        result = Runner().exec(
+            f'{sys.executable} {filepath}',
+            input=io.StringIO(data) if stream else data,
+            timeout=10,
+        )
+
+        assert not result.timed_out
+        assert result.outs == f'{len(data)}\n'
+
+    def test_large_output(self, tempdir: EasyDirectory) -> None:
+        """ Outputs that are larger than the pipe buffer are read while the
+        process runs. """
+
+        code = (
+            'import sys\n'
+            'sys.stderr.write("e" * (1 << 20))\n'
+            'sys.stdout.write("o" * (1 << 20))'
+        )
+        filepath = tempdir.create(code, 'file.py')
+        result = Runner().exec(f'{sys.executable} {filepath}', timeout=10)
+
+        assert not result.timed_out
+        assert result.outs == 'o' * (1 << 20)
+        assert result.errs == 'e' * (1 << 20)
+
+    def test_output_file(self, tempdir: EasyDirectory) -> None:
+        filepath = tempdir.create('print("Hello")', 'file.py')
+        with open(tempdir.join('output'), 'w+b') as output:
+            result = Runner().exec(
+                f'{sys.executable} {filepath}', output=output,
+            )
+
+        assert result.outs is None
+        with open(tempdir.join('output'), encoding='utf8') as file:
+            assert file.read() == 'Hello\n'
@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+from unittest import mock
+
+import pytest
+from bs4 import BeautifulSoup
+from freezegun import freeze_time
+
+from cptk.core.scheduler import ContestScheduler
+from cptk.exceptions import NoContestProblems
+from cptk.scrape import Contest
+from cptk.scrape import PageInfo
+from cptk.websites import Kattis
+
+CONTEST_URL = 'https://open.kattis.com/contests/vw4uz9'
+CONTEST_PAGE = """
+<div class="info upper">
+    <div><h4>Start</h4> 2022-01-12 07:20 CET</div>
+    <div><h2 class="title">testt</h2></div>
+    <div><h4>End</h4> 2022-01-12 09:00 CET</div>
+</div>
+<table>
+    <tr><td><a href="/contests/vw4uz9/problems/carpool">Carpool</a></td></tr>
+    <tr><td><a href="/contests/vw4uz9/problems/carpool/submit">Submit</a></td></tr>
+    <tr><td><a href="/contests/vw4uz9/problems/hello">Hello</a></td></tr>
+    <tr><td><a href="/contests/other/problems/hello">Other</a></td></tr>
+</table>
+"""
+
+
+def contest_page(url: str = CONTEST_URL, data: str = CONTEST_PAGE) -> PageInfo:
+    return PageInfo(url, BeautifulSoup(data, 'lxml'))
+
+
+class TestKattisContest:
+
+    def test_is_contest(self):
+        kattis = Kattis()
+        assert kattis.is_contest(contest_page())
+        assert kattis.is_contest(contest_page(CONTEST_URL + '/problems'))
+        assert not kattis.is_contest(contest_page(CONTEST_URL + '/standings'))
+        assert not kattis.is_contest(contest_page(data='<div></div>'))
+
+    def test_to_contest(self):
+        with mock.patch('time.tzname', ('UTC', 'UTC')):
+            contest = Kattis().to_contest(contest_page())
+
+        assert contest._uid == 'vw4uz9'
+        assert contest.name == 'testt'
+        assert contest.start_time == datetime(
+            2022, 1, 12, 6, 20, tzinfo=timezone.utc,
+        )
+
+    @pytest.mark.parametrize(
+        'name, offset', (
+            ('CET', 1),
+            ('PDT', -7),
+            ('IST', None),  # local
+            ('XYZ', None),  # unknown
+        ),
+    )
+    def test_parse_timezone(self, name: str, offset: int | None):
+        with mock.patch('time.tzname', ('IST', 'IDT')):
+            tz = Kattis._parse_timezone(name)
+
+        if offset is None:
+            assert tz is None
+        else:
+            assert tz.utcoffset(None) == timedelta(hours=offset)
+
+    def test_local_timezone(self):
+        """ Abbreviations of the local timezone (which may be ambiguous, like
+        'IST') are resolved using the local timezone. """
+
+        with mock.patch('time.tzname', ('IST', 'IDT')):
+            moment = Kattis()._parse_date('2022-01-12 07:20 IST')
+        assert moment == datetime(2022, 1, 12, 7, 20).astimezone()
+
+    def test_contest_problems(self):
+        assert Kattis().contest_problems(contest_page()) == [
+            CONTEST_URL + '/problems/carpool',
+            CONTEST_URL + '/problems/hello',
+        ]
+
+
+class TestContestScheduler:
+
+    @staticmethod
+    def _contest(start: datetime) -> Contest:
+        return Contest(
+            _uid=1, website=None, name='Test Contest',
+            url=CONTEST_URL, start_time=start,
+        )
+
+    def test_waits_and_warms_up(self):
+        fetcher = mock.Mock()
+        start = datetime(2022, 1, 1, 14, 10, tzinfo=timezone(timedelta(hours=2)))
+
+        with freeze_time('2022-01-01 12:00:00') as frozen:
+            def sleep(seconds: float) -> None:
+                if fetcher.transport.warm.called:
+                    # After the warm up, we should sleep only for the margin
+                    now = datetime.now(timezone.utc)
+                    assert now >= start - timedelta(seconds=30)
+                frozen.tick(timedelta(seconds=seconds))
+
+            with mock.patch('time.sleep', side_effect=sleep):
+                ContestScheduler(fetcher, warmup=30).wait(self._contest(start))
+
+            assert datetime.now(timezone.utc) >= start
+
+        fetcher.transport.warm.assert_called_once_with(CONTEST_URL)
+
+    def test_started_contest_does_not_wait(self):
+        fetcher = mock.Mock()
+        contest = self._contest(datetime.now() - timedelta(hours=1))
+        with mock.patch('time.sleep') as sleep:
+            ContestScheduler(fetcher).wait(contest)
+        sleep.assert_not_called()
+
+    def test_polls_until_published(self):
+        fetcher = mock.Mock()
+        fetcher.contest_problems.side_effect = [[], [], ['a', 'b']]
+
+        with mock.patch('time.sleep') as sleep:
+            urls = ContestScheduler(fetcher, poll=1).problems(CONTEST_URL)
+
+        assert urls == ['a', 'b']
+        assert [c[0][0] for c in sleep.call_args_list] == [1, 1.5]
+
+    def test_gives_up(self):
+        fetcher = mock.Mock()
+        fetcher.contest_problems.return_value = []
+
+        with freeze_time('2022-01-01') as frozen:
+            with mock.patch('time.sleep', side_effect=frozen.tick):
+                with pytest.raises(NoContestProblems):
+                    ContestScheduler(fetcher, give_up=60).problems(CONTEST_URL)
@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import json
+from contextlib import nullcontext
+from unittest import mock
+
+import pytest
+from freezegun import freeze_time
+
+from .test_pages import cases_generator
+from .test_pages import PageTestCase
+import cptk.scrape
+from cptk.scrape.serialize import dumps
+from cptk.scrape.serialize import encode
+from cptk.scrape.serialize import loads
+
+
+@pytest.mark.parametrize(
+    'case', (
+        pytest.param(case, id=case.info.url)
+        for case in cases_generator()
+    ),
+)
+def test_roundtrip(case: PageTestCase):
+    with freeze_time(case.time) if case.time else nullcontext():
+        problem = case.website.to_problem(case.info)
+
+    restored = loads(dumps(problem))
+
+    assert isinstance(restored, type(problem))
+    assert isinstance(restored.contest, type(problem.contest))
+    assert isinstance(restored.website, type(problem.website))
+    assert encode(restored) == encode(problem)
+
+
+@pytest.mark.parametrize(
+    'data', (
+        {'__type__': 'os:system', 'command': 'exit 1'},
+        {'__website__': 'subprocess:Popen'},
+        {'__type__': 'cptk.scrape.problem:field'},
+        {'__type__': 'cptk.scrape.website:Website'},
+        {'__website__': 'cptk.scrape.problem:Test'},
+        {'__type__': 'cptk.scrape.problem:Test.__init__.__globals__'},
+    ),
+)
+def test_untrusted(data: dict):
+    with mock.patch('os.system') as system, pytest.raises(ValueError):
+        loads(json.dumps(data))
+    system.assert_not_called()
+
+
+def test_trusted():
+    data = {'__type__': 'cptk.scrape.problem:Test', 'input': '1\n'}
+    assert loads(json.dumps(data)) == cptk.scrape.Test("1\n")
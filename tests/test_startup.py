@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+import subprocess
+import sys
+
+import pytest
+
+
+def imported_modules(*modules: str) -> set[str]:
+    """ Imports the given modules in a fresh interpreter, and returns the names
+    of all modules that were imported as a result. """
+
+    code = '\n'.join((
+        'import sys',
+        *(f'import {module}' for module in modules),
+        'print("\\n".join(sys.modules))',
+    ))
+
+    res = subprocess.run(
+        [sys.executable, '-c', code],
+        stdout=subprocess.PIPE, check=True, encoding='utf8',
+    )
+    return set(res.stdout.splitlines())
+
+
+@pytest.mark.parametrize(
+    'modules, forbidden', (
+        pytest.param(
+            ('cptk.core.client',),
+            ('colorama', 'pydantic', 'cptk.commands', 'cptk.core.system'),
+            id='client',
+        ),
+        pytest.param(
+            ('cptk.main',),
+            ('pydantic', 'yaml', 'jinja2', 'slugify', 'requests', 'bs4'),
+            id='main',
+        ),
+        pytest.param(
+            ('cptk.main', 'cptk.local.project', 'cptk.core.chef'),
+            ('yaml', 'jinja2', 'slugify', 'concurrent.futures'),
+            id='local-commands',
+        ),
+    ),
+)
+def test_lazy_imports(modules: tuple[str], forbidden: tuple[str]):
+    imported = imported_modules(*modules)
+    assert not imported.intersection(forbidden)
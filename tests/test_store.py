@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import io
+import os
+import sys
+from typing import TYPE_CHECKING
+from unittest import mock
+
+import pytest
+
+import cptk.constants
+import cptk.local.problem
+import cptk.scrape
+from cptk.core.chef import Chef
+from cptk.core.templates import DEFAULT_TEMPLATES
+from cptk.exceptions import StoreError
+from cptk.local.problem import LocalProblem
+from cptk.local.problem import Recipe
+from cptk.local.project import LocalProject
+from cptk.local.store import BlobStore
+from cptk.local.store import read_ref
+
+if TYPE_CHECKING:
+    from .utils import Dummy, EasyDirectory
+
+TEMPLATE = DEFAULT_TEMPLATES[0].uid
+
+
+def blobs(store: BlobStore) -> list[str]:
+    return [
+        name for _, _, files in os.walk(store.path) for name in files
+    ]
+
+
+class TestBlobStore:
+
+    @pytest.mark.parametrize('compression', ('gzip', 'none'))
+    def test_put_and_open(self, tempdir: EasyDirectory, compression: str):
+        store = BlobStore(tempdir.path, compression)
+        data = b'1 2 3\n' * 1000
+
+        digest = store.put(io.BytesIO(data))
+        assert digest in store
+        with store.open(digest) as file:
+            assert file.read() == data
+
+    def test_deduplicated(self, tempdir: EasyDirectory):
+        store = BlobStore(tempdir.path)
+        first = store.put_bytes(b'same')
+        second = store.put_bytes(b'same')
+
+        assert first == second
+        assert len(blobs(store)) == 1
+
+    def test_compressed(self, tempdir: EasyDirectory):
+        store = BlobStore(tempdir.path, 'gzip')
+        data = b'1000000000 ' * 100000
+        store.put_bytes(data)
+
+        blob, = blobs(store)
+        assert blob.endswith('.gz')
+        size = os.path.getsize(os.path.join(store.path, blob[:2], blob))
+        assert size * 10 < len(data)
+
+    def test_read_other_compression(self, tempdir: EasyDirectory):
+        digest = BlobStore(tempdir.path, 'none').put_bytes(b'data')
+        with BlobStore(tempdir.path, 'gzip').open(digest) as file:
+            assert file.read() == b'data'
+
+    def test_zstd_fallback(self, tempdir: EasyDirectory):
+        with mock.patch('cptk.local.store._zstandard', return_value=None):
+            store = BlobStore(tempdir.path, 'zstd')
+        assert store.compression == 'gzip'
+
+    def test_missing(self, tempdir: EasyDirectory):
+        with pytest.raises(StoreError):
+            BlobStore(tempdir.path).open('0' * 64)
+
+
+class TestStoredTests:
+
+    @pytest.fixture
+    def proj(self, tempdir: EasyDirectory) -> LocalProject:
+        proj = LocalProject.init(tempdir.path, TEMPLATE)
+        proj.config.store.enabled = True
+        proj.config.clone.path = '{{ problem.name | slug }}'
+        return proj
+
+    def test_clone_references(self, proj: LocalProject, dummy: Dummy):
+        problem = dummy.get_dummy_problem()
+        prob = proj.clone_problem(problem)
+
+        folder = os.path.join(prob.location, prob.recipe.test.folder)
+        ref = os.path.join(folder, 'sample01.in' + cptk.constants.REF_FILE_SUFFIX)
+        assert not os.path.exists(os.path.join(folder, 'sample01.in'))
+
+        with proj.store.open(read_ref(ref)) as file:
+            assert file.read().decode('utf8') == problem.tests[0].input
+
+    def test_shared_between_problems(self, proj: LocalProject, dummy: Dummy):
+        proj.config.clone.path = 'first'
+        proj.clone_problem(dummy.get_dummy_problem())
+        count = len(blobs(proj.store))
+
+        proj.config.clone.path = 'second'
+        proj.clone_problem(dummy.get_dummy_problem())
+        assert len(blobs(proj.store)) == count
+
+    @pytest.mark.parametrize('stored', (True, False))
+    def test_run_tests(self, proj: LocalProject, stored: bool):
+        prob = LocalProblem.init(
+            proj.relative('problem'),
+            Recipe(
+                serve=f'{sys.executable} solution.py',
+                test=cptk.local.problem.TestRecipe(folder='tests'),
+            ),
+        )
+
+        with open(os.path.join(prob.location, 'solution.py'), 'w') as file:
+            file.write(
+                'import sys\n'
+                'print(sum(map(int, sys.stdin.read().split())))',
+            )
+
+        big = ' '.join(['1'] * 100000) + '\n'
+        prob.store_tests(
+            'tests',
+            [
+                cptk.scrape.Test('1 2\n', '3\n'),
+                cptk.scrape.Test(big, '100000\n'),
+                cptk.scrape.Test('1', '2\n'),
+            ],
+            store=proj.store if stored else None,
+        )
+
+        assert Chef(prob).run_tests() == (2, 1)
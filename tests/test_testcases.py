@@ -0,0 +1,344 @@
+from __future__ import annotations
+
+import os
+import sys
+import threading
+import time
+from typing import TYPE_CHECKING
+from unittest import mock
+
+import pydantic
+import pytest
+
+import cptk.constants
+import cptk.local.problem
+import cptk.scrape
+from cptk.core.chef import Chef
+from cptk.core.chef import Verdict
+from cptk.local.store import BlobStore
+from cptk.local.testcases import discover_tests
+from cptk.local.testcases import group_tests
+from cptk.local.testcases import LocalTest
+
+if TYPE_CHECKING:
+    from .utils import EasyDirectory
+
+REF = cptk.constants.REF_FILE_SUFFIX
+
+
+def test_discover(tempdir: EasyDirectory):
+    tempdir.create('', 'tests', 'b.in')
+    tempdir.create('', 'tests', 'b.out')
+    tempdir.create('', 'tests', 'a.in' + REF)
+    tempdir.create('', 'tests', 'a.out')
+    tempdir.create('', 'tests', 'unpaired.in')
+    tempdir.create('', 'tests', 'folder.in', 'c.out')
+
+    with mock.patch('cptk.local.testcases.open_test_file') as opened:
+        tests = discover_tests(tempdir.join('tests'))
+
+    opened.assert_not_called()
+    assert tests == [
+        LocalTest('a', tempdir.join('tests', 'a.in' + REF),
+                  tempdir.join('tests', 'a.out')),
+        LocalTest('b', tempdir.join('tests', 'b.in'),
+                  tempdir.join('tests', 'b.out')),
+    ]
+
+
+def test_discover_missing(tempdir: EasyDirectory):
+    assert discover_tests(tempdir.join('missing')) == []
+
+
+def names(tests: list[LocalTest]) -> list[str]:
+    return [test.name for test in tests]
+
+
+def test_discover_nested(tempdir: EasyDirectory):
+    for name in ('sample/1', 'secret/g1/1', 'secret/g1/2', 'top', '.git/x'):
+        tempdir.create('', 'tests', *f'{name}.in'.split('/'))
+        tempdir.create('', 'tests', *f'{name}.ans'.split('/'))
+
+    folder = tempdir.join('tests')
+    assert names(discover_tests(folder)) == ['top']
+    assert names(discover_tests(folder, inputs=['**/*.in'])) == [
+        'sample/1', 'secret/g1/1', 'secret/g1/2', 'top',
+    ]
+    assert names(discover_tests(folder, inputs=['secret/**/*.in'])) == [
+        'secret/g1/1', 'secret/g1/2',
+    ]
+
+
+def test_discover_preferred_output(tempdir: EasyDirectory):
+    tempdir.create('', 'tests', '1.in')
+    tempdir.create('', 'tests', '1.ans')
+    tempdir.create('', 'tests', '1.out')
+
+    test, = discover_tests(tempdir.join('tests'))
+    assert test.output == tempdir.join('tests', '1.out')
+
+    test, = discover_tests(tempdir.join('tests'), outputs=['*.ans', '*.out'])
+    assert test.output == tempdir.join('tests', '1.ans')
+
+
+def test_discover_without_suffix(tempdir: EasyDirectory):
+    tempdir.create('', 'tests', '01')
+    tempdir.create('', 'tests', '01.a')
+    tempdir.create('', 'tests', '02' + REF)
+    tempdir.create('', 'tests', '02.a')
+
+    tests = discover_tests(tempdir.join('tests'), inputs='*', outputs=['*.a'])
+    assert names(tests) == ['01', '02']
+    assert tests[1].input == tempdir.join('tests', '02' + REF)
+
+
+def test_discover_cached(tempdir: EasyDirectory):
+    tempdir.create('', 'tests', '1.in')
+    tempdir.create('', 'tests', '1.out')
+    os.utime(tempdir.join('tests'), (0, 0))
+
+    with mock.patch('os.scandir', wraps=os.scandir) as scandir:
+        discover_tests(tempdir.join('tests'))
+        discover_tests(tempdir.join('tests'))
+    assert scandir.call_count == 1
+
+    tempdir.create('', 'tests', '2.in')
+    tempdir.create('', 'tests', '2.out')
+    assert names(discover_tests(tempdir.join('tests'))) == ['1', '2']
+
+
+class TestRecipePatterns:
+
+    def test_defaults(self):
+        recipe = cptk.local.problem.TestRecipe(folder='tests')
+        assert recipe.inputs == ['*.in']
+        assert recipe.outputs == ['*.out', '*.ans']
+
+    def test_string(self):
+        recipe = cptk.local.problem.TestRecipe(folder='tests', inputs='**/*')
+        assert recipe.inputs == ['**/*']
+
+    def test_preprocess(self):
+        processor = mock.Mock(parse_string=lambda s: s.upper())
+        recipe = cptk.local.problem.TestRecipe(folder='tests')
+        assert recipe.preprocess(processor).__fields_set__ == {
+            'folder', 'timeout',
+        }
+
+        recipe = cptk.local.problem.TestRecipe(folder='t', inputs='*.in')
+        assert recipe.preprocess(processor).inputs == ['*.IN']
+
+    def test_empty(self):
+        with pytest.raises(pydantic.ValidationError):
+            cptk.local.problem.TestRecipe(folder='tests', outputs=[])
+
+
+@pytest.mark.parametrize(
+    'expected, actual, matches', (
+        ('1 2 3\n', '1 2 3\n', True),
+        ('1 2 3\n', '1 2 3', False),
+        ('1 2 3', '1 2 3\n', False),
+        ('1 2 3\n', '1 2 4\n', False),
+        ('', '', True),
+    ),
+)
+def test_matches(tempdir: EasyDirectory, expected, actual, matches):
+    test = LocalTest(
+        'test',
+        tempdir.create('', 'test.in'),
+        tempdir.create(expected, 'test.out'),
+    )
+
+    with mock.patch('cptk.local.diff.SEGMENT_SIZE', 2):
+        assert test.matches(actual) == matches
+
+
+def test_matches_stored(tempdir: EasyDirectory):
+    store = BlobStore(tempdir.path)
+    ref = tempdir.create(store.put_bytes(b'out\n'), 'test.out' + REF)
+    test = LocalTest('test', '', ref, store=lambda: store)
+    assert test.matches('out\n')
+
+
+class TestParallel:
+
+    @pytest.fixture
+    def prob(self, tempdir: EasyDirectory) -> cptk.local.problem.LocalProblem:
+        prob = cptk.local.problem.LocalProblem.init(
+            tempdir.join('problem'),
+            cptk.local.problem.Recipe(
+                serve=f'{sys.executable} solution.py',
+                test=cptk.local.problem.TestRecipe(folder='tests'),
+            ),
+        )
+        tempdir.create(
+            'print(sum(map(int, input().split())))',
+            'problem', 'solution.py',
+        )
+        prob.store_tests('tests', [
+            cptk.scrape.Test(f'{n} {n}\n', f'{2 * n + n % 2}\n')
+            for n in range(8)
+        ])
+        return prob
+
+    @pytest.mark.parametrize('jobs', (1, 3))
+    def test_results(self, prob, jobs: int):
+        with mock.patch('cptk.core.system.System.success') as success, \
+                mock.patch('cptk.core.system.System.error') as error:
+            assert Chef(prob).run_tests(jobs) == (4, 4)
+
+        names = [f'sample{n:02d}' for n in range(1, 9)]
+        assert [c.kwargs['title'] for c in success.call_args_list] == \
+            names[::2]
+        assert [c.kwargs['title'] for c in error.call_args_list] == \
+            names[1::2]
+
+    def test_bounded(self, prob):
+        running = max_running = 0
+        lock = threading.Lock()
+
+        def run(*_):
+            nonlocal running, max_running
+            with lock:
+                running += 1
+                max_running = max(max_running, running)
+            time.sleep(0.01)
+            with lock:
+                running -= 1
+            return Verdict(True, 'passed')
+
+        with mock.patch.object(Chef, '_run_test', side_effect=run):
+            assert Chef(prob).run_tests(jobs=3) == (8, 0)
+
+        assert 1 < max_running <= 3
+
+
+def test_group_tests():
+    tests = [
+        LocalTest(name, '', '')
+        for name in ('a/1', 'a/2', 'b/1', 'c/1', 'sample')
+    ]
+    groups = [
+        cptk.local.problem.TestGroup(name='a'),
+        cptk.local.problem.TestGroup(name='bc', tests=['b/*', 'c/*']),
+        cptk.local.problem.TestGroup(name='empty'),
+    ]
+
+    assert [
+        (group and group.name, names(members))
+        for group, members in group_tests(tests, groups)
+    ] == [
+        (None, ['sample']),
+        ('a', ['a/1', 'a/2']),
+        ('bc', ['b/1', 'c/1']),
+        ('empty', []),
+    ]
+
+
+class TestGroups:
+
+    @pytest.fixture
+    def prob(self, tempdir: EasyDirectory) -> cptk.local.problem.LocalProblem:
+        groups = [
+            cptk.local.problem.TestGroup(name='a', points=30),
+            cptk.local.problem.TestGroup(name='b', points=30),
+            cptk.local.problem.TestGroup(name='c', points=10, depends='b'),
+            cptk.local.problem.TestGroup(name='d', points=30, depends='a'),
+        ]
+        prob = cptk.local.problem.LocalProblem.init(
+            tempdir.join('problem'),
+            cptk.local.problem.Recipe(
+                serve=f'{sys.executable} solution.py',
+                test=cptk.local.problem.TestRecipe(
+                    folder='tests', inputs='**/*.in', groups=groups,
+                ),
+            ),
+        )
+        tempdir.create('print(int(input()) * 2)', 'problem', 'solution.py')
+
+        for name, inp, out in (
+            ('a/1', 1, 2), ('a/2', 2, 4),
+            ('b/1', 3, 6), ('b/2', 4, 0), ('b/3', 5, 10),
+            ('c/1', 6, 12),
+            ('d/1', 7, 14),
+        ):
+            path = ('problem', 'tests', *name.split('/'))
+            *dirs, base = path
+            tempdir.create(f'{inp}\n', *dirs, base + '.in')
+            tempdir.create(f'{out}\n', *dirs, base + '.out')
+
+        return prob
+
+    @pytest.mark.parametrize('jobs', (1, 3))
+    def test_skipped(self, prob, jobs: int):
+        chef = Chef(prob)
+        with mock.patch.object(Chef, '_run_test', wraps=chef._run_test) as run, \
+                mock.patch('cptk.core.system.System.title') as title:
+            assert chef.run_tests(jobs) == (4, 3)
+
+        ran = {c.args[0].name for c in run.call_args_list}
+        assert 'c/1' not in ran
+        if jobs == 1:
+            assert 'b/3' not in ran
+
+        titles = [c.args[0] for c in title.call_args_list]
+        assert titles[-2].startswith('4 passed, 1 failed and 2 skipped')
+        assert titles[-1] == 'Score: 60/100'
+
+    def test_empty_group(self, prob):
+        recipe = prob.recipe
+        recipe.test.groups.append(
+            cptk.local.problem.TestGroup(name='e', points=20),
+        )
+
+        with mock.patch.object(
+            cptk.local.problem.LocalProblem, 'recipe', recipe,
+        ), mock.patch('cptk.core.system.System.title') as title, \
+                mock.patch('cptk.core.system.System.warn') as warn:
+            Chef(prob).run_tests()
+
+        assert title.call_args_list[-1].args[0] == 'Score: 60/120'
+        warnings = [c.args[0] for c in warn.call_args_list]
+        assert "No tests in group 'e'" in warnings
+
+
+class TestOutputs:
+
+    @pytest.fixture
+    def prob(self, tempdir: EasyDirectory) -> cptk.local.problem.LocalProblem:
+        prob = cptk.local.problem.LocalProblem.init(
+            tempdir.join('problem'),
+            cptk.local.problem.Recipe(
+                serve=f'{sys.executable} solution.py',
+                test=cptk.local.problem.TestRecipe(folder='tests'),
+            ),
+        )
+        tempdir.create('print(input())', 'problem', 'solution.py')
+        prob.store_tests('tests', [cptk.scrape.Test('1 2 3\n', '1 2 4\n')])
+        return prob
+
+    def test_mismatch(self, prob):
+        with mock.patch('cptk.core.system.System.error') as error, \
+                mock.patch('cptk.core.system.System.echo') as echo:
+            assert Chef(prob).run_tests() == (0, 1)
+
+        error.assert_called_once_with(
+            "Output differs from expectation in line 1, token 3: "
+            "expected '4', got '3'",
+            title='sample01',
+        )
+        assert any('1 2 4' in c.args[0] for c in echo.call_args_list)
+
+    def test_save(self, prob, tempdir: EasyDirectory):
+        actual = tempdir.join('problem', 'tests', 'sample01.actual')
+
+        Chef(prob).run_tests()
+        assert not os.path.exists(actual)
+
+        Chef(prob).run_tests(save=True)
+        with open(actual, encoding='utf8') as file:
+            assert file.read() == '1 2 3\n'
+
+        tempdir.create('1 2 3\n', 'problem', 'tests', 'sample01.out')
+        assert Chef(prob).run_tests(save=True) == (1, 0)
+        assert not os.path.exists(actual)
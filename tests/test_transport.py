@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+from unittest import mock
+
+import pydantic
+import pytest
+import requests
+
+from cptk.core.transport import TokenBucket
+from cptk.core.transport import Transport
+from cptk.core.transport import TransportSettings
+from cptk.exceptions import FetchError
+
+URL = 'https://codeforces.com/problemset/problem/1/A'
+
+
+def response(code: int, headers: dict = None) -> mock.Mock:
+    return mock.Mock(status_code=code, headers=headers or dict())
+
+
+@pytest.fixture
+def transport() -> Transport:
+    return Transport(TransportSettings(retries=3, backoff=0, rate=0))
+
+
+class TestTransport:
+
+    def test_success(self, transport: Transport):
+        with mock.patch.object(
+            transport.session, 'get',
+            return_value=response(200),
+        ) as get:
+            assert transport.get(URL).status_code == 200
+        get.assert_called_once()
+        assert get.call_args[1]['timeout'] == transport.settings.timeout
+
+    def test_client_errors_not_retried(self, transport: Transport):
+        with mock.patch.object(
+            transport.session, 'get',
+            return_value=response(404),
+        ) as get:
+            assert transport.get(URL).status_code == 404
+        get.assert_called_once()
+
+    def test_retries_until_success(self, transport: Transport):
+        results = [
+            response(503),
+            requests.ConnectionError(),
+            response(429, {'Retry-After': '0'}),
+            response(200),
+        ]
+
+        with mock.patch.object(
+            transport.session, 'get',
+            side_effect=results,
+        ) as get:
+            assert transport.get(URL).status_code == 200
+        assert get.call_count == len(results)
+
+    def test_gives_up(self, transport: Transport):
+        with mock.patch.object(
+            transport.session, 'get',
+            return_value=response(503),
+        ) as get:
+            with pytest.raises(FetchError):
+                transport.get(URL)
+        assert get.call_count == transport.settings.retries + 1
+
+    def test_negative_retries(self):
+        with pytest.raises(pydantic.ValidationError):
+            TransportSettings(retries=-1)
+
+    def test_backoff_is_capped(self):
+        transport = Transport(TransportSettings(backoff=1, max_backoff=5))
+        for attempt in range(10):
+            assert 0 <= transport._delay(attempt, None) <= 5
+        assert transport._delay(0, response(429, {'Retry-After': '60'})) == 5
+
+
+class TestTokenBucket:
+
+    def test_burst_does_not_wait(self):
+        bucket = TokenBucket(rate=1, capacity=3)
+        with mock.patch('time.sleep') as sleep:
+            for _ in range(3):
+                bucket.acquire()
+        sleep.assert_not_called()
+
+    def test_waits_when_empty(self):
+        now = [0.0]
+
+        def sleep(seconds: float) -> None:
+            now[0] += seconds
+
+        with mock.patch('time.monotonic', lambda: now[0]), \
+                mock.patch('time.sleep', side_effect=sleep):
+            bucket = TokenBucket(rate=2, capacity=1)
+            bucket.acquire()
+            bucket.acquire()
+            bucket.acquire()
+
+        assert now[0] == pytest.approx(1)
@@ -2,6 +2,8 @@ from __future__ import annotations
 
 import os
 
+import pytest
+
 from .utils import EasyDirectory
 
 
@@ -38,3 +40,93 @@ def test_find_common_files(tempdir: EasyDirectory):
 
     res = set(find_common_files(tempdir.join('a'), tempdir.join('b')))
     assert res == {os.path.join('b', 'c.txt'), 't.txt'}
+
+
+def test_plan_tree_copy(tempdir: EasyDirectory):
+    from cptk.utils import plan_tree_copy
+
+    tempdir.create('a', 'src', 'a.txt')
+    tempdir.create('b', 'src', 'lib', 'b.h')
+    os.makedirs(tempdir.join('src', 'empty'))
+    tempdir.create('old', 'dst', 'a.txt')
+
+    plan = plan_tree_copy(tempdir.join('src'), tempdir.join('dst'), ['lib/*'])
+    assert plan.commons == ['a.txt']
+    assert plan.files == ['a.txt']
+    assert plan.links == [os.path.join('lib', 'b.h')]
+    assert sorted(plan.dirs) == ['empty', 'lib']
+
+    plan.apply()
+    with open(tempdir.join('dst', 'a.txt')) as file:
+        assert file.read() == 'a'
+    assert os.path.isdir(tempdir.join('dst', 'empty'))
+    assert os.path.samefile(
+        tempdir.join('src', 'lib', 'b.h'),
+        tempdir.join('dst', 'lib', 'b.h'),
+    )
+
+
+@pytest.mark.parametrize('fast', (True, False))
+def test_copy_file_replaces_links(tempdir: EasyDirectory, fast: bool):
+    from unittest import mock
+    from cptk.utils import copy_file
+
+    src = tempdir.create('new', 'src.txt')
+    original = tempdir.create('original', 'original.txt')
+    dst = tempdir.join('dst.txt')
+    os.link(original, dst)
+
+    if fast:
+        copy_file(src, dst)
+    else:
+        with mock.patch('cptk.utils._reflink', return_value=False), \
+                mock.patch('cptk.utils._copy_range', return_value=False):
+            copy_file(src, dst)
+
+    with open(dst) as file:
+        assert file.read() == 'new'
+    with open(original) as file:
+        assert file.read() == 'original'
+
+
+def test_read_urls(tempdir: EasyDirectory):
+    from cptk.utils import read_urls
+    from cptk.exceptions import InvalidURLFile
+
+    path = tempdir.create(
+        '# CSES introductory problems\n'
+        'https://cses.fi/problemset/task/1068\n'
+        '\n'
+        '  cses.fi/problemset/task/1083  \n',
+        'urls.txt',
+    )
+
+    assert read_urls(path) == [
+        'https://cses.fi/problemset/task/1068',
+        'cses.fi/problemset/task/1083',
+    ]
+
+    tempdir.create('https://cses.fi\nnot a url\n', 'urls.txt')
+    with pytest.raises(InvalidURLFile) as err:
+        read_urls(path)
+    assert err.value.lineno == 2
+
+
+@pytest.mark.parametrize(
+    'pattern, path, expected', (
+        ('./', '.', True),
+        ('./', 'a', False),
+        ('**/.cptk/**', '.cptk', True),
+        ('**/.cptk/**', 'a/b/.cptk', True),
+        ('**/.cptk/**', os.path.join('a', '.cptk', 'stayaway', '.x'), True),
+        ('**/.cptk/**', 'a/.cptk-old', False),
+        ('**/.cptk/**', 'a/b', False),
+        ('a/*/c', 'a/.b/c', True),
+        ('a/*/c', 'a/b/d/c', False),
+        ('**/c', 'a/b/../c', True),
+    ),
+)
+def test_path_matches(pattern: str, path: str, expected: bool):
+    from cptk.utils import path_matches
+
+    assert path_matches(pattern, path) == expected
@@ -0,0 +1,106 @@
+""" Regenerates the page test cases in 'tests/pages' from a page archive that
+was recorded by cptk. Record the archive by cloning the relevant pages with the
+'CPTK_RECORD' environment variable set, and then run:
+
+    python -m tests.utils.pages ARCHIVE
+"""
+from __future__ import annotations
+
+import json
+import sys
+from contextlib import contextmanager
+from contextlib import nullcontext
+from dataclasses import fields
+from dataclasses import is_dataclass
+from datetime import datetime
+from glob import glob
+from os import path
+from typing import Iterator
+from unittest import mock
+
+from bs4 import BeautifulSoup
+from dateutil.parser import parse as parse_date
+from freezegun import freeze_time
+
+from cptk.core.archive import PageArchive
+from cptk.scrape import PageInfo
+from cptk.scrape import Website
+from cptk.websites.kattis import TIMEZONES
+
+
+@contextmanager
+def saved_timezone() -> Iterator[None]:
+    """ Kattis shows times in the timezone of the user, and the pages were
+    saved in Israel, where 'IST' stands for Israel Standard Time. """
+
+    with mock.patch.dict(TIMEZONES, {'IST': 2}), \
+            mock.patch('time.tzname', ('UTC', 'UTC')):
+        yield
+
+
+def to_expected(obj):
+    """ Converts a scraped object into the format of the 'expected' field of
+    the page test case configuration files. """
+
+    if is_dataclass(obj):
+        return {f.name: to_expected(getattr(obj, f.name)) for f in fields(obj)}
+    if isinstance(obj, Website):
+        return obj.name
+    if isinstance(obj, datetime):
+        return obj.isoformat(sep=' ', timespec='minutes')
+    if isinstance(obj, (list, tuple)):
+        return [to_expected(item) for item in obj]
+    return obj
+
+
+def regenerate(
+    archive: PageArchive,
+    websites: dict[str, Website],
+    basepath: str,
+) -> list[str]:
+    """ Updates the page and the expected result of every test case whose URL
+    is found in the given archive. Returns the paths of the updated test case
+    configuration files. """
+
+    urls = set(archive.urls())
+    updated = list()
+
+    for website_name, website in websites.items():
+        pattern = path.join(basepath, website_name, '**', '*.json')
+        for case_config in glob(pattern, recursive=True):
+            with open(case_config, encoding='utf8') as f:
+                case = json.load(f)
+
+            url = case['info']['url']
+            if url not in urls:
+                continue
+
+            page = archive.load(url).text
+            data_path = path.join(
+                path.dirname(case_config),
+                case['info']['data'],
+            )
+            with open(data_path, 'w', encoding='utf8') as f:
+                f.write(page)
+
+            info = PageInfo(url, BeautifulSoup(page, 'lxml'))
+            timestr = case['info'].get('time')
+            frozen = freeze_time(parse_date(timestr)) if timestr else nullcontext()
+            with frozen, saved_timezone():
+                case['expected'] = to_expected(website.to_problem(info))
+
+            with open(case_config, 'w', encoding='utf8') as f:
+                json.dump(case, f, indent=4, ensure_ascii=False)
+                f.write('\n')
+
+            updated.append(case_config)
+
+    return updated
+
+
+if __name__ == '__main__':
+    from tests.test_pages import PAGES_BASEPATH
+    from tests.test_pages import WEBSITES
+
+    for updated in regenerate(PageArchive(sys.argv[1]), WEBSITES, PAGES_BASEPATH):
+        print(updated)  # noqa: T001